@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Approval daemon - one process approving permission prompts in every Claude session
+
+Usage: python3 approval_daemon.py [cooldown_seconds]
+"""
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from approval_engine import ApprovalEngine
+from event_bus import event_bus
+from tmux_client import TmuxError, tmux_client
+from voice_logging import get_logger, setup_logging
+
+log = get_logger('approver')
+
+ORCHESTRATOR_DB = Path("orchestrator_data.db")
+SESSION_EVENTS = ('session_created', 'session_closed')
+SESSION_MARKER = 'claude'  # Orchestrator sessions are claude_<id>; the legacy scripts used claude
+
+
+class ApprovalDaemon:
+    """
+    Watches every Claude tmux session from a single thread.
+
+    Sessions come from the orchestrator's database (active rows) and from
+    tmux itself (any session with 'claude' in its name, as the old approver
+    scripts assumed). Each gets an ApprovalEngine subscribed to the shared
+    control connection, so prompt scanning happens as output arrives on the
+    one tmux reader thread and an idle session costs nothing. The daemon's
+    own loop only rescans for sessions, woken early by orchestrator session
+    events (from other processes when the event bus is on Redis), and polls
+    screens when control mode is not.
+    """
+
+    def __init__(self, cooldown: float = 3.0, rescan_interval: float = 5.0, poll_interval: float = 0.3,
+                 db_path: Path = ORCHESTRATOR_DB):
+        self.cooldown = cooldown
+        self.rescan_interval = rescan_interval
+        self.poll_interval = poll_interval
+        self.db_path = db_path
+        self.engines: Dict[str, ApprovalEngine] = {}  # tmux session -> engine
+        self.labels: Dict[str, str] = {}  # tmux session -> tab id, when the orchestrator knows it
+        self.stop_event = threading.Event()
+        self.events = event_bus.subscribe(types=SESSION_EVENTS)
+        if event_bus.backend == 'memory':
+            log.info("Orchestrator events are in-process only, rescanning every %.0fs", self.rescan_interval)
+
+    def _orchestrator_sessions(self) -> Dict[str, str]:
+        """tmux session -> tab id for sessions the orchestrator marks active"""
+        if not self.db_path.exists():
+            return {}
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=1)
+            try:
+                rows = conn.execute('SELECT tmux_session, tab_id FROM sessions WHERE is_active = 1').fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log.warning("Cannot read %s: %s", self.db_path, e)
+            return {}
+        return {tmux_session: tab_id for tmux_session, tab_id in rows if tmux_session}
+
+    def discover(self) -> Dict[str, str]:
+        """Live Claude sessions, as tmux session -> label"""
+        try:
+            live = tmux_client.command('list-sessions', '-F', '#{session_name}')
+        except TmuxError:
+            return {}  # No server, no sessions
+        known = self._orchestrator_sessions()
+        return {name: known.get(name, name) for name in live
+                if name != tmux_client.control_session
+                and (name in known or SESSION_MARKER in name.lower())}
+
+    def sync(self):
+        """Start engines for new sessions and stop those whose session is gone"""
+        sessions = self.discover()
+        for name in list(self.engines):
+            if name not in sessions:
+                engine = self.engines.pop(name)
+                engine.stop()
+                log.info("Stopped watching %s: %s", self.labels.pop(name, name), engine.get_stats())
+        for name, label in sessions.items():
+            if name in self.engines:
+                continue
+            engine = ApprovalEngine(f'{name}:0', self.cooldown, self.poll_interval)
+            if engine.start(poll_thread=False):
+                self.engines[name] = engine
+                self.labels[name] = label
+                log.info("Watching %s (tab %s)", name, label)
+
+    def _wait(self, timeout: float) -> bool:
+        """Sleep up to timeout; True if an orchestrator session event arrived"""
+        if self.stop_event.is_set():
+            return False
+        if self.events.get(timeout) is None:
+            return False
+        self.events.drain()  # One rescan covers a burst of events
+        return True
+
+    def run(self):
+        """Run until stop() or Ctrl+C"""
+        next_scan = 0.0
+        try:
+            while not self.stop_event.is_set():
+                now = time.monotonic()
+                if now >= next_scan:
+                    self.sync()
+                    next_scan = now + self.rescan_interval
+
+                polled = [engine for engine in self.engines.values() if engine.stats['mode'] == 'polling']
+                for engine in polled:
+                    engine.poll_once()
+
+                timeout = self.poll_interval if polled else max(0.0, next_scan - time.monotonic())
+                if self._wait(timeout):
+                    next_scan = 0.0  # A tab opened or closed - rescan now
+        finally:
+            for engine in self.engines.values():
+                engine.stop()
+            self.engines.clear()
+            self.events.close()
+
+    def stop(self):
+        self.stop_event.set()
+        self.events.deliver({'type': 'stop'})  # Wake _wait
+
+    def get_stats(self) -> Dict[str, dict]:
+        return {self.labels.get(name, name): engine.get_stats() for name, engine in self.engines.items()}
+
+
+def main(cooldown: Optional[float] = None):
+    setup_logging()
+    daemon = ApprovalDaemon(cooldown if cooldown is not None else 3.0)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        log.info("Approval daemon stopped")
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Approval engine - detects Claude permission prompts in pane output and approves them
+
+Usage: python3 approval_engine.py [target] [cooldown_seconds]
+"""
+import re
+import sys
+import threading
+import time
+from typing import Callable, Optional, Tuple
+from claude_output_parser import ANSI_ESCAPE
+from tmux_client import tmux_client
+from voice_logging import get_logger, setup_logging
+
+log = get_logger('approver')
+
+# Every prompt signature the approver scripts looked for, as one alternation
+# anchored at the start of each (border-stripped) line, so a line that is not
+# part of a prompt fails after a character or two. A prompt is a question
+# followed within a few lines by a "1. Yes" option; "Press Enter to
+# continue" stands on its own.
+PROMPT_PATTERN = re.compile(r'''
+    (?P<question>
+        Do\ you\ want\ to\ .*\? | Would\ you\ like\ to\ .*
+      | (?:Execute|Run)\b.*\b(?:command|bash)\b.*\? | Allow\ .*\? | Bash\ command\b
+    )
+  | (?P<option>❯?\s*1\.\s*Yes\b)
+  | (?P<standalone>Press\ Enter\ to\ continue)
+  | [●⏺]\s*(?P<tool>Bash\(.*)
+''', re.VERBOSE | re.IGNORECASE)
+
+# Box borders around a line ("│ Do you want to proceed? │")
+BORDER_CHARS = ' \t│'
+
+OPTION_WINDOW = 6  # Lines after a question in which its options must appear
+
+
+class PromptScanner:
+    """
+    Incremental prompt detector over raw pane output.
+
+    Output is split into lines as it arrives and each line is ANSI-stripped
+    and matched once; only the still-growing last line is re-checked when
+    more of it arrives. feed() returns the question line when a prompt
+    completes, otherwise None.
+    """
+
+    def __init__(self):
+        self.partial = ''
+        self.scanned_partial = ''  # Partial line already matched, skipped when it completes
+        self.question: Optional[str] = None
+        self.lines_since_question = 0
+        self.last_command = ''  # Most recent Bash(...) tool line, for logging
+        self.tool_calls = 0  # Bash(...) lines seen; a redrawn prompt does not add one
+        self.lines_scanned = 0
+
+    def feed(self, text: str) -> Optional[str]:
+        parts = (self.partial + text).replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        self.partial = parts.pop()
+        found = None
+        for line in parts:
+            if line == self.scanned_partial:
+                self.scanned_partial = ''
+                continue
+            found = self._scan(line) or found
+        if self.partial and self.partial != self.scanned_partial:
+            # Prompts are drawn last and may sit unterminated until the next redraw
+            self.scanned_partial = self.partial
+            found = self._scan(self.partial) or found
+        return found
+
+    def _scan(self, raw: str) -> Optional[str]:
+        self.lines_scanned += 1
+        line = (ANSI_ESCAPE.sub('', raw) if '\x1b' in raw else raw).strip(BORDER_CHARS)
+        if not line:
+            return None
+        if self.question is not None:
+            self.lines_since_question += 1
+            if self.lines_since_question > OPTION_WINDOW:
+                self.question = None
+
+        match = PROMPT_PATTERN.match(line)
+        if match is None:
+            return None
+        if match.group('question') is not None:
+            self.question, self.lines_since_question = line, 0
+        elif match.group('option') is not None and self.question is not None:
+            question, self.question = self.question, None
+            return question
+        elif match.group('standalone') is not None:
+            return line
+        elif match.group('tool') is not None:
+            self.last_command = match.group('tool')
+            self.tool_calls += 1
+        return None
+
+    def reset(self):
+        self.partial = self.scanned_partial = ''
+        self.question = None
+
+
+def find_prompt(text: str) -> Optional[str]:
+    """One-shot check of a captured screen: the question line of a waiting prompt, or None"""
+    return PromptScanner().feed(text + '\n')
+
+
+class ApprovalEngine:
+    """
+    Approves permission prompts in one tmux target as soon as they are drawn.
+
+    Output arrives as %output events from the shared tmux control connection,
+    so nothing runs while the pane is quiet. Without control mode it falls
+    back to polling capture-pane and only scans a screen when it changed.
+    """
+
+    def __init__(self, target: str = 'claude:0', cooldown: float = 3.0, poll_interval: float = 0.3,
+                 on_approve: Optional[Callable[[str, str], None]] = None, dedup_window: float = 30.0):
+        self.target = target
+        self.cooldown = cooldown  # A redraw of the prompt just answered must not be approved again
+        # The same prompt for the same tool call is approved once, however
+        # often it is redrawn, unless it is still up after dedup_window
+        self.dedup_window = dedup_window
+        self.last_prompt: Optional[Tuple[int, str]] = None
+        self.poll_interval = poll_interval
+        self.on_approve = on_approve  # Called with (target, question) after keys are sent
+        self.scanner = PromptScanner()
+        self.pane_id: Optional[str] = None
+        self.poll_thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.last_approval = 0.0
+        self.lock = threading.Lock()
+        self.last_screen: Optional[str] = None
+        self.stats = {'prompts': 0, 'approvals': 0, 'suppressed': 0, 'duplicates': 0, 'bytes_scanned': 0,
+                      'last_detect_ms': 0.0, 'mode': None}
+
+    def start(self, poll_thread: bool = True) -> bool:
+        """Start watching the target; False if it does not exist.
+
+        Without control mode a polling thread is started, unless poll_thread
+        is False and the caller drives poll_once() itself.
+        """
+        self.stop_event.clear()
+        try:
+            self.pane_id = tmux_client.subscribe(self.target, self._on_output)
+        except Exception as e:
+            log.warning("Cannot subscribe to %s: %s", self.target, e)
+            return False
+        if self.pane_id:
+            self.stats['mode'] = 'events'
+            # A prompt drawn before the subscription would otherwise wait forever
+            if not self.poll_once():
+                self.stop()
+                return False
+        else:
+            if tmux_client.capture_pane(self.target) is None:
+                return False
+            self.stats['mode'] = 'polling'
+            if poll_thread:
+                self.poll_thread = threading.Thread(target=self._poll_loop, daemon=True)
+                self.poll_thread.start()
+        log.info("Watching %s for permission prompts (%s)", self.target, self.stats['mode'])
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+        if self.pane_id:
+            tmux_client.unsubscribe(self.pane_id, self._on_output)
+            self.pane_id = None
+
+    def feed(self, text: str):
+        """Scan new output; approves if it completes a prompt"""
+        start = time.perf_counter()
+        with self.lock:
+            self.stats['bytes_scanned'] += len(text)
+            question = self.scanner.feed(text)
+        if question is None:
+            return
+        self.stats['prompts'] += 1
+        self.stats['last_detect_ms'] = (time.perf_counter() - start) * 1000
+
+        now = time.time()
+        if now - self.last_approval < self.cooldown:
+            self.stats['suppressed'] += 1
+            return
+        prompt = (self.scanner.tool_calls, question)
+        if prompt == self.last_prompt and now - self.last_approval < self.dedup_window:
+            self.stats['duplicates'] += 1
+            return
+        self.last_prompt = prompt
+        self.last_approval = now
+        # %output callbacks run on the tmux reader thread, which must not block on a command reply
+        threading.Thread(target=self._approve, args=(question, self.scanner.last_command), daemon=True).start()
+
+    def _on_output(self, pane_id: str, text: str):
+        self.feed(text)
+
+    def _approve(self, question: str, command: str):
+        log.info("Prompt in %s: %s%s", self.target, question[:60], f" ({command[:60]})" if command else '')
+        try:
+            tmux_client.send_keys(self.target, '1')
+            time.sleep(0.1)
+            tmux_client.send_keys(self.target, 'Enter')
+        except Exception as e:
+            log.error("Approval for %s failed: %s", self.target, e)
+            return
+        self.stats['approvals'] += 1
+        if self.on_approve:
+            self.on_approve(self.target, question)
+
+    def poll_once(self) -> bool:
+        """Capture and scan the screen if it changed; False once the target is gone"""
+        screen = tmux_client.capture_pane(self.target, start=-15)
+        if screen is None:
+            return False
+        if screen != self.last_screen:
+            self.last_screen = screen
+            # A changed screen is scanned from scratch; it is only 15 lines
+            with self.lock:
+                self.scanner.reset()
+            self.feed(screen)
+        return True
+
+    def _poll_loop(self):
+        while not self.stop_event.wait(self.poll_interval):
+            self.poll_once()
+
+    def get_stats(self) -> dict:
+        return {'target': self.target, **self.stats, 'lines_scanned': self.scanner.lines_scanned}
+
+
+def run(target: str = 'claude:0', cooldown: float = 3.0):
+    """Approve prompts in target until interrupted"""
+    setup_logging()
+    engine = ApprovalEngine(target, cooldown)
+    if not engine.start():
+        log.error("tmux target %s not found", target)
+        return
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        log.info("Approver stopped: %s", engine.get_stats())
+    finally:
+        engine.stop()
+
+
+if __name__ == '__main__':
+    run(sys.argv[1] if len(sys.argv) > 1 else 'claude:0',
+        float(sys.argv[2]) if len(sys.argv) > 2 else 3.0)
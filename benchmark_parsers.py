@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Parser benchmark suite - replays the transcript corpus through every stats extractor and approver detector
+
+Nothing talks to tmux or Claude. Detectors are lifted out of their scripts
+with ast (several of them start polling tmux at import), so the benchmark
+measures exactly the code that ships. Three suites:
+    stats       extract_stats_from_output variants vs classify_line, per line
+    permission  approver prompt detectors polled against a simulated pane,
+                with latency-to-detect after each prompt appears
+    response    legacy buffer rescans vs ClaudeOutputParser (benchmark_response_parser)
+Usage: python3 benchmark_parsers.py [--suite NAME] [--turns N] [--chunk BYTES] [transcript ...]
+"""
+import argparse
+import ast
+import codecs
+import re
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+import benchmark_response_parser
+from approval_engine import PromptScanner, find_prompt
+from claude_output_parser import ClaudeOutputParser, PERMISSION, PROMPT, classify_line, strip_ansi
+from transcript_corpus import NEGATIVE_SNIPPETS, PROMPT_MARKER, PaneSimulator, Transcript, load_corpus
+
+PANE_ROWS = 50  # What the approvers capture: `tmux capture-pane -S -50`
+PROMPT_TEXT = PROMPT_MARKER.decode()
+
+# One poll: feed a chunk, return (detected, seconds spent detecting, prompt visible)
+Step = Callable[[bytes], Tuple[bool, float, bool]]
+
+STATS_SOURCES = [
+    'companion_voice_advanced.py', 'companion_voice_bot.py', 'multi_tab_voice_exact_replica.py',
+    'multi_tab_voice_http.py', 'multi_tab_voice_stats.py', 'voice_edge_tts.py', 'voice_premium_tts.py',
+    'voice_tts_advanced.py', 'voice_tts_final.py', 'voice_tts_continuous.py', 'voice_tts_realtime.py',
+    'voice_realistic_enhanced.py', 'multi_tab_voice_simple.py',
+]
+
+
+def _module_definitions(tree: ast.Module) -> Dict[str, ast.stmt]:
+    definitions = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            definitions[node.name] = node
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    definitions[target.id] = node
+    return definitions
+
+
+def load_definitions(path: str, *names: str) -> Optional[dict]:
+    """
+    Exec the named top-level functions/constants of a script, plus the
+    module-level definitions they reference, without running the rest of it.
+    Returns the namespace, or None if the file or a name is missing.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError):
+        return None
+    definitions = _module_definitions(tree)
+    if any(name not in definitions for name in names):
+        return None
+
+    needed: List[ast.stmt] = []
+    pending = list(names)
+    while pending:
+        node = definitions.get(pending.pop())
+        if node is None or node in needed:
+            continue
+        needed.append(node)
+        pending.extend(n.id for n in ast.walk(node) if isinstance(n, ast.Name) and n.id in definitions)
+
+    namespace = {'re': re, 'time': time}
+    ordered = [node for node in tree.body if node in needed]
+    exec(compile(ast.Module(body=ordered, type_ignores=[]), path, 'exec'), namespace)
+    return namespace
+
+
+def stats_variants() -> List[Tuple[str, Callable[[str], dict]]]:
+    """Each distinct extract_stats_from_output in the tree, labelled with the files that carry it"""
+    groups: Dict[str, Tuple[Callable, List[str]]] = {}
+    for path in STATS_SOURCES:
+        namespace = load_definitions(path, 'extract_stats_from_output')
+        if namespace is None:
+            continue
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        node = _module_definitions(tree)['extract_stats_from_output']
+        if ast.get_docstring(node):
+            node.body = node.body[1:]
+        key = ast.unparse(node)
+        groups.setdefault(key, (namespace['extract_stats_from_output'], []))[1].append(path)
+    variants = []
+    for function, paths in groups.values():
+        label = paths[0] if len(paths) == 1 else f'{paths[0]} (+{len(paths) - 1})'
+        variants.append((label, function))
+    return variants
+
+
+def permission_detectors() -> List[Tuple[str, Callable[[str], bool]]]:
+    """Screen-polling prompt detectors from the approver scripts, normalized to text -> bool"""
+    detectors = []
+    detectors.append(('approval_engine.find_prompt', lambda text: find_prompt(text) is not None))
+    namespace = load_definitions('enter_only_approver.py', 'has_bash_prompt')
+    if namespace:
+        detectors.append(('enter_only_approver', namespace['has_bash_prompt']))
+    namespace = load_definitions('fixed_auto_approve.py', 'find_bash_prompt')
+    if namespace:
+        find_bash_prompt = namespace['find_bash_prompt']
+        detectors.append(('fixed_auto_approve', lambda text: find_bash_prompt(text)[0]))
+    namespace = load_definitions('auto_approve_precise.py', 'PERMISSION_PATTERNS', 'EXCLUDE_PATTERNS')
+    if namespace:
+        # Its check is inline in the polling loop; this mirrors it minus the cooldown
+        patterns, excludes = namespace['PERMISSION_PATTERNS'], namespace['EXCLUDE_PATTERNS']
+
+        def auto_approve_precise(text: str) -> bool:
+            if any(exclude in text for exclude in excludes):
+                return False
+            if not any(re.search(p, text, re.IGNORECASE | re.MULTILINE | re.DOTALL) for p in patterns):
+                return False
+            lines = text.split('\n')
+            return any('❯' in line and i + 1 < len(lines) and ('1.' in line or '1.' in lines[i + 1])
+                       for i, line in enumerate(lines))
+        detectors.append(('auto_approve_precise', auto_approve_precise))
+    return detectors
+
+
+@dataclass
+class Result:
+    label: str
+    calls: int = 0
+    seconds: float = 0.0
+    detections: int = 0
+    peak_kb: float = 0.0
+    latencies: List[int] = field(default_factory=list)  # Bytes from prompt start to first detection
+    latency_polls: List[int] = field(default_factory=list)
+    false_positives: int = 0
+
+    def row(self, unit: str) -> str:
+        rate = self.calls / self.seconds if self.seconds else 0.0
+        per_call = self.seconds / self.calls * 1e6 if self.calls else 0.0
+        return (f"  {self.label:<36} {rate:12,.0f} {unit}/s {per_call:8.2f} µs/call "
+                f"{self.peak_kb:9.0f} KB peak {self.detections:8} hits")
+
+
+def peak_kb(run: Callable[[], object]) -> float:
+    """Peak traced allocation of a second, untimed run (tracemalloc skews timing)"""
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def bench_stats(transcript: Transcript) -> List[Result]:
+    lines = strip_ansi(transcript.data.decode('utf-8', errors='replace')).replace('\r', '\n').split('\n')
+    candidates = [(label, lambda line, fn=fn: bool(fn(line).get('tokens')))
+                  for label, fn in stats_variants()]
+    candidates.append(('claude_output_parser.classify_line',
+                       lambda line: classify_line(line).tokens is not None))
+
+    results = []
+    for label, detect in candidates:
+        result = Result(label, calls=len(lines))
+        start = time.perf_counter()
+        result.detections = sum(1 for line in lines if detect(line))
+        result.seconds = time.perf_counter() - start
+        result.peak_kb = peak_kb(lambda: sum(1 for line in lines if detect(line)))
+        results.append(result)
+    return results
+
+
+def pane_poller(detect: Callable[[str], bool]) -> Callable[[], Step]:
+    """A fresh poll step that renders the pane and times only the detector call"""
+    def make() -> Step:
+        pane = PaneSimulator(PANE_ROWS)
+
+        def step(data: bytes) -> Tuple[bool, float, bool]:
+            pane.feed(data)
+            screen = pane.screen()
+            start = time.perf_counter()
+            hit = detect(screen)
+            return hit, time.perf_counter() - start, PROMPT_TEXT in screen
+        return step
+    return make
+
+
+def make_parser_step() -> Step:
+    """The parser reads the stream itself rather than polling a rendered pane"""
+    parser = ClaudeOutputParser()
+
+    def step(data: bytes) -> Tuple[bool, float, bool]:
+        start = time.perf_counter()
+        hit = any(event.kind == PERMISSION for event in parser.feed(data))
+        return hit, time.perf_counter() - start, True
+    return step
+
+
+def make_scanner_step() -> Step:
+    """The approval engine's own mode: scan %output chunks as they arrive"""
+    scanner = PromptScanner()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def step(data: bytes) -> Tuple[bool, float, bool]:
+        text = decoder.decode(data)
+        start = time.perf_counter()
+        hit = scanner.feed(text) is not None
+        return hit, time.perf_counter() - start, True
+    return step
+
+
+def replay(transcript: Transcript, step: Step, chunk: int, result: Result):
+    """Feed the transcript a chunk at a time, tracking how long each prompt waits to be detected"""
+    prompts = transcript.prompt_offsets
+    next_prompt, waiting_since, polls_waiting, fed = 0, None, 0, 0
+    for data in transcript.chunks(chunk):
+        fed += len(data)
+        hit, elapsed, visible = step(data)
+        result.seconds += elapsed
+        result.calls += 1
+
+        while next_prompt < len(prompts) and prompts[next_prompt] < fed:
+            if waiting_since is None:
+                waiting_since, polls_waiting = prompts[next_prompt], 0
+            next_prompt += 1
+        if waiting_since is not None:
+            polls_waiting += 1
+        if not hit:
+            continue
+        result.detections += 1
+        if waiting_since is not None:
+            result.latencies.append(fed - waiting_since)
+            result.latency_polls.append(polls_waiting)
+            waiting_since = None
+        elif not visible:
+            result.false_positives += 1
+
+
+def bench_permission(transcript: Transcript, chunk: int) -> List[Result]:
+    steps: List[Tuple[str, Callable[[], Step]]] = [
+        (label, pane_poller(detect)) for label, detect in permission_detectors()]
+    steps.append(('ClaudeOutputParser (stream)', make_parser_step))
+    steps.append(('approval_engine.PromptScanner (stream)', make_scanner_step))
+    results = []
+    for label, make_step in steps:
+        result = Result(label)
+        replay(transcript, make_step(), chunk, result)
+        result.peak_kb = peak_kb(lambda: replay(transcript, make_step(), chunk, Result(label)))
+        results.append(result)
+    return results
+
+
+def check_negatives() -> List[Tuple[str, int]]:
+    """How many NEGATIVE_SNIPPETS each detector mistakes for a prompt, each fed on its own"""
+    def parser_hit(snippet: str) -> bool:
+        return any(event.kind in (PERMISSION, PROMPT) for event in ClaudeOutputParser().parse(snippet))
+
+    candidates = list(permission_detectors())
+    candidates.append(('ClaudeOutputParser (stream)', parser_hit))
+    candidates.append(('approval_engine.PromptScanner (stream)',
+                       lambda snippet: PromptScanner().feed(snippet) is not None))
+    return [(label, sum(1 for snippet in NEGATIVE_SNIPPETS if detect(snippet)))
+            for label, detect in candidates]
+
+
+def report_latency(result: Result, prompts: int):
+    if not result.latencies:
+        print(f"  {'':<36} detected 0/{prompts} prompts, {result.false_positives} false positive polls")
+        return
+    latencies = sorted(result.latencies)
+    print(f"  {'':<36} detected {len(latencies)}/{prompts} prompts; latency median "
+          f"{latencies[len(latencies) // 2]} B / max {latencies[-1]} B, "
+          f"max {max(result.latency_polls)} polls; {result.false_positives} false positive polls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay transcripts through every parser and detector')
+    parser.add_argument('transcripts', nargs='*', help='Raw transcripts (default: transcripts/*.raw)')
+    parser.add_argument('--suite', choices=('stats', 'permission', 'response', 'all'), default='all')
+    parser.add_argument('--turns', type=int, default=2000, help='Synthetic transcript size (0 to skip)')
+    parser.add_argument('--chunk', type=int, default=benchmark_response_parser.CHUNK_SIZE,
+                        help='Bytes per simulated read/poll')
+    args = parser.parse_args()
+
+    if args.transcripts:
+        corpus = []
+        for path in args.transcripts:
+            with open(path, 'rb') as f:
+                corpus.append(Transcript(path, f.read()))
+    else:
+        corpus = load_corpus(synthetic_turns=args.turns or None)
+
+    if args.suite in ('permission', 'all'):
+        print(f"False positives on {len(NEGATIVE_SNIPPETS)} prompt-like response snippets")
+        for label, hits in check_negatives():
+            print(f"  {label:<36} {hits}")
+        print()
+
+    for transcript in corpus:
+        prompts = len(transcript.prompt_offsets)
+        print(f"{transcript.name}: {len(transcript.data) / 1024:.0f} KB, {transcript.line_count} lines, "
+              f"{prompts} permission prompts\n")
+        if args.suite in ('stats', 'all'):
+            print("Stats extraction (per line)")
+            for result in bench_stats(transcript):
+                print(result.row('lines'))
+            print()
+        if args.suite in ('permission', 'all'):
+            print(f"Permission prompt detection ({args.chunk}-byte chunks, {PANE_ROWS}-row pane)")
+            for result in bench_permission(transcript, args.chunk):
+                print(result.row('polls'))
+                report_latency(result, prompts)
+            print()
+        if args.suite in ('response', 'all'):
+            print("Response extraction")
+            benchmark_response_parser.bench('legacy rescan', benchmark_response_parser.run_legacy,
+                                            transcript.data[:2 * 1024 * 1024])
+            benchmark_response_parser.bench('ClaudeOutputParser', benchmark_response_parser.run_parser,
+                                            transcript.data)
+            print()
+
+
+if __name__ == '__main__':
+    main()
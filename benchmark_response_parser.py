@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ad hoc response extraction vs the shared incremental ClaudeOutputParser
+
+Replays transcripts in small chunks, the way a capture loop sees them. The
+legacy path re-scans the whole accumulated buffer on every poll, as the
+capture loops did; the parser sees each byte once. Pass recorded raw
+transcripts as arguments, otherwise a synthetic one is generated.
+Usage: python3 benchmark_response_parser.py [transcript ...]
+"""
+import re
+import sys
+import time
+from claude_output_parser import ClaudeOutputParser, RESPONSE_COMPLETE
+from transcript_corpus import synthetic_transcript
+
+CHUNK_SIZE = 512  # Bytes per simulated read
+POLL_EVERY = 8  # Legacy loop re-captures the buffer every N chunks
+
+TOOL_START_PATTERNS = [
+    'List(.', 'Call(', 'Read(', 'Edit(', 'Write(',
+    'Bash(', 'MultiEdit(', 'Grep(', 'Glob(', 'LS(',
+    'WebFetch(', 'WebSearch(', 'NotebookRead(', 'NotebookEdit(',
+]
+LEGACY_ANSI = re.compile(r'\x1b\[[0-9;]*[mGKHJ]')
+LEGACY_STATS = re.compile(r'(\d+s)\s*·\s*[⚒↑↓]\s*(\d+)\s*tokens')
+
+
+def legacy_scan(content: str, seen: set) -> int:
+    """The capture-loop approach: strip, split and re-check every line of the buffer"""
+    found = 0
+    for line in LEGACY_ANSI.sub('', content).split('\n'):
+        line_hash = hash(line)
+        if line_hash in seen:
+            continue
+        cleaned = line.strip()
+        LEGACY_STATS.search(cleaned)
+        if cleaned.startswith('●'):
+            text = cleaned[1:].strip()
+        elif cleaned.startswith('Claude:'):
+            text = cleaned[7:].strip()
+        elif cleaned.startswith('Assistant:'):
+            text = cleaned[10:].strip()
+        else:
+            continue
+        if any(text.startswith(p) for p in TOOL_START_PATTERNS) or len(text) < 3:
+            continue
+        seen.add(line_hash)
+        found += 1
+    return found
+
+
+def run_legacy(data: bytes) -> int:
+    seen = set()
+    found = 0
+    for end in range(CHUNK_SIZE * POLL_EVERY, len(data) + CHUNK_SIZE * POLL_EVERY, CHUNK_SIZE * POLL_EVERY):
+        found += legacy_scan(data[:end].decode('utf-8', errors='replace'), seen)
+    return found
+
+
+def run_parser(data: bytes) -> int:
+    parser = ClaudeOutputParser()
+    found = 0
+    for start in range(0, len(data), CHUNK_SIZE):
+        found += sum(1 for e in parser.feed(data[start:start + CHUNK_SIZE]) if e.kind == RESPONSE_COMPLETE)
+    found += sum(1 for e in parser.flush() if e.kind == RESPONSE_COMPLETE)
+    return found
+
+
+def bench(label: str, fn, data: bytes):
+    lines = data.count(b'\n') + data.count(b'\r')
+    start = time.perf_counter()
+    found = fn(data)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<24} {elapsed * 1000:9.1f} ms   {len(data) / elapsed / 1e6:7.2f} MB/s   "
+          f"{lines / elapsed:11,.0f} lines/s   {found} responses")
+
+
+def main():
+    transcripts = []
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as f:
+            transcripts.append((path, f.read()))
+    if not transcripts:
+        transcripts.append(('synthetic (2000 turns)', synthetic_transcript()))
+
+    for name, data in transcripts:
+        print(f"{name}: {len(data) / 1024:.0f} KB, {CHUNK_SIZE}-byte chunks\n")
+        # Whole-buffer rescans grow quadratically; cap the legacy run on big inputs
+        legacy_data = data[:2 * 1024 * 1024]
+        if len(legacy_data) < len(data):
+            print(f"  (legacy run limited to the first {len(legacy_data) // 1024} KB)")
+        bench('legacy rescan', run_legacy, legacy_data)
+        bench('ClaudeOutputParser', run_parser, data)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-call tmux subprocess vs the shared control-mode TmuxClient
+
+Creates a scratch tmux session, then times send-keys and capture-pane both
+ways. Usage: python3 benchmark_tmux_client.py [iterations]
+"""
+import statistics
+import subprocess
+import sys
+import time
+from tmux_client import TmuxClient
+
+SESSION = 'tmux_bench'
+TARGET = f'{SESSION}:0'
+
+
+def time_calls(fn, iterations):
+    """Return per-call latencies in milliseconds"""
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"  {label:<32} mean {statistics.mean(samples):7.3f} ms   "
+          f"p50 {statistics.median(samples):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    subprocess.run(['tmux', 'kill-session', '-t', SESSION], capture_output=True)
+    subprocess.run(['tmux', 'new-session', '-d', '-s', SESSION, '-x', '120', '-y', '40', 'cat'], check=True)
+    client = TmuxClient(control_session='tmux_bench_ctl')
+
+    try:
+        print(f"tmux benchmark - {iterations} iterations per case\n")
+
+        print("send-keys (C-u, text, Enter)")
+        report('subprocess (3 forks)', time_calls(lambda i: [
+            subprocess.run(['tmux', 'send-keys', '-t', TARGET, 'C-u']),
+            subprocess.run(['tmux', 'send-keys', '-t', TARGET, '-l', f'message {i}']),
+            subprocess.run(['tmux', 'send-keys', '-t', TARGET, 'Enter']),
+        ], iterations))
+        client.start()
+        report('TmuxClient.send_text', time_calls(
+            lambda i: client.send_text(TARGET, f'message {i}', clear_line=True), iterations))
+
+        print("\ncapture-pane -S -500")
+        report('subprocess', time_calls(lambda i: subprocess.run(
+            ['tmux', 'capture-pane', '-p', '-t', TARGET, '-S', '-500'],
+            capture_output=True, text=True), iterations))
+        report('TmuxClient.capture_pane', time_calls(
+            lambda i: client.capture_pane(TARGET, start=-500), iterations))
+
+        print("\ndisplay-message (cursor poll)")
+        fmt = '#{history_size} #{cursor_y}'
+        report('subprocess', time_calls(lambda i: subprocess.run(
+            ['tmux', 'display-message', '-p', '-t', TARGET, fmt],
+            capture_output=True, text=True), iterations))
+        report('TmuxClient.command', time_calls(
+            lambda i: client.command('display-message', '-p', '-t', TARGET, fmt), iterations))
+
+        print(f"\nclient stats: {client.stats}")
+    finally:
+        client.close()
+        subprocess.run(['tmux', 'kill-session', '-t', SESSION], capture_output=True)
+
+
+if __name__ == '__main__':
+    main()
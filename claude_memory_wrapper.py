@@ -2,13 +2,19 @@
 """
 Claude wrapper with memory - maintains conversation context
 """
+import codecs
 import subprocess
+from concurrent.futures import CancelledError
+import threading
 import uuid
 import time
 import json
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List
 from datetime import datetime
 from terminal_monitor import terminal_monitor
+from claude_worker_pool import claude_worker_pool, WorkerError
+from context_builder import ContextWindow, context_budget_from_env
+from retry_policy import CircuitOpenError, classify_result, retry_engine
 
 class ClaudeMemorySession:
     """Session that maintains conversation history"""
@@ -17,151 +23,209 @@ class ClaudeMemorySession:
         self.session_id = session_id
         self.tab_id = tab_id
         self.message_count = 0
-        self.conversation_history: List[Dict[str, str]] = []
-        self.max_context_messages = 10  # Keep last 10 exchanges
+        # Recent exchanges within a token budget; older ones are summarized
+        self.context = ContextWindow(budget_tokens=context_budget_from_env())
+        self.use_worker_pool = True  # Falls back to one-shot `claude --print` if the pool is unavailable
+        
+        # Cancellation of the in-flight turn (see cancel())
+        self.cancel_event = threading.Event()
+        self.current_worker = None
+        self.current_process: Optional[subprocess.Popen] = None
         
         # Initialize terminal monitor for this tab
         if self.tab_id:
             terminal_monitor.initialize_buffer(self.tab_id)
         
-    def send_message(self, message: str, retry_count: int = 0) -> str:
-        """Send a message to Claude with conversation context and retry mechanism"""
-        max_retries = 2
+    def send_message(self, message: str,
+                     on_chunk: Optional[Callable[[str], None]] = None,
+                     cancel_event: Optional[threading.Event] = None,
+                     on_retry: Optional[Callable[[int, str, float], None]] = None) -> str:
+        """Send a message to Claude with conversation context, retried per retry_engine's policy.
+        
+        If on_chunk is given it receives response text incrementally as Claude
+        writes it; the complete response is still returned. Setting
+        cancel_event (or calling cancel()) aborts the request, which then
+        returns ''. on_retry(attempt, error_class, delay) hears about each
+        retry before it is scheduled.
+        """
+        self.cancel_event = cancel_event or threading.Event()
+        if self.cancel_event.is_set():
+            return ''
+        
+        self.message_count += 1
+        start_time = time.time()
+        print(f"[SESSION {self.session_id[:8]}] Sending message #{self.message_count}: {message}")
+        
+        # Add command to terminal monitor
+        if self.tab_id:
+            terminal_monitor.add_command(self.tab_id, f"claude {message[:50]}...")
         
         try:
-            self.message_count += 1
-            start_time = time.time()
-            print(f"[SESSION {self.session_id[:8]}] Sending message #{self.message_count}: {message}")
-            if retry_count > 0:
-                print(f"[SESSION {self.session_id[:8]}] Retry attempt {retry_count}")
-            
-            # Build context from conversation history
-            context_prompt = self._build_context_prompt(message)
+            # Call Claude (warm pooled worker, or a one-shot process as fallback)
+            result = retry_engine.call(self.session_id, lambda attempt: self._attempt(message, on_chunk, attempt),
+                                       classify_result, on_retry=on_retry)
+        except CancelledError:
+            result = None
+        except CircuitOpenError as e:
+            print(f"[SESSION {self.session_id[:8]}] {e}")
+            return f"Sorry, Claude keeps failing right now. I'll try again in about {e.retry_after:.0f} seconds."
+        except Exception as e:
+            print(f"[SESSION {self.session_id[:8]}] Exception: {e}")
+            if self.cancel_event.is_set():
+                return ''
+            return f"Sorry, an error occurred after multiple attempts: {str(e)}"
+        
+        elapsed_time = time.time() - start_time
+        print(f"[SESSION {self.session_id[:8]}] Request took {elapsed_time:.1f} seconds")
+        
+        if result is None or self.cancel_event.is_set():
+            print(f"[SESSION {self.session_id[:8]}] Request cancelled after {elapsed_time:.1f} seconds")
+            return ''
+        
+        if result.returncode == 0 and result.stdout.strip():
+            response = result.stdout.strip()
             
-            # Add command to terminal monitor
+            # Add output to terminal monitor
             if self.tab_id:
-                terminal_monitor.add_command(self.tab_id, f"claude {message[:50]}...")
-            
-            # Call Claude with full context
-            cmd = ['claude', '--dangerously-skip-permissions', '--print', context_prompt]
+                terminal_monitor.add_output(self.tab_id, response)
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True
-            )
+            # Store the exchange in history, unless the reply is itself an error report
+            if classify_result(result) is None:
+                self.context.add('user', message)
+                self.context.add('assistant', response)
             
-            elapsed_time = time.time() - start_time
-            print(f"[SESSION {self.session_id[:8]}] Request took {elapsed_time:.1f} seconds")
-            
-            if result.returncode == 0 and result.stdout:
-                response = result.stdout.strip()
-                
-                # Add output to terminal monitor
-                if self.tab_id:
-                    terminal_monitor.add_output(self.tab_id, response)
-                
-                # Check for execution error in response
-                if "execution error" in response.lower() and retry_count < max_retries:
-                    print(f"[SESSION {self.session_id[:8]}] Detected execution error, retrying...")
-                    return self._retry_with_message(message, retry_count + 1)
-                
-                # Store the exchange in history (only if successful)
-                if retry_count == 0 or "execution error" not in response.lower():
-                    self.conversation_history.append({
-                        'role': 'user',
-                        'content': message,
-                        'timestamp': datetime.now().isoformat()
-                    })
-                    self.conversation_history.append({
-                        'role': 'assistant',
-                        'content': response,
-                        'timestamp': datetime.now().isoformat()
-                    })
-                    
-                    # Trim history if too long
-                    if len(self.conversation_history) > self.max_context_messages * 2:
-                        # Keep only the most recent messages
-                        self.conversation_history = self.conversation_history[-(self.max_context_messages * 2):]
-                
-                print(f"[SESSION {self.session_id[:8]}] Got response ({len(response)} chars): {response[:200]}...")
-                return response
-            else:
-                print(f"[SESSION {self.session_id[:8]}] Error: returncode={result.returncode}, stderr={result.stderr}")
-                
-                # Add error to terminal monitor
-                if self.tab_id and result.stderr:
-                    terminal_monitor.add_output(self.tab_id, f"ERROR: {result.stderr}")
-                
-                # Check if this looks like an execution error and retry
-                error_message = result.stderr or "Unknown error"
-                if ("execution" in error_message.lower() or result.returncode != 0) and retry_count < max_retries:
-                    print(f"[SESSION {self.session_id[:8]}] Process error detected, retrying...")
-                    return self._retry_with_message(message, retry_count + 1)
+            print(f"[SESSION {self.session_id[:8]}] Got response ({len(response)} chars): {response[:200]}...")
+            return response
+        
+        print(f"[SESSION {self.session_id[:8]}] Error: returncode={result.returncode}, stderr={result.stderr}")
+        
+        # Add error to terminal monitor
+        if self.tab_id and result.stderr:
+            terminal_monitor.add_output(self.tab_id, f"ERROR: {result.stderr}")
+        
+        return "Sorry, I couldn't process that request after multiple attempts."
+    
+    def _attempt(self, message: str, on_chunk: Optional[Callable[[str], None]],
+                 attempt: int) -> subprocess.CompletedProcess:
+        """One try at the request (runs on a retry thread after the first)"""
+        if self.cancel_event.is_set():
+            raise CancelledError()
+        if attempt > 1:
+            print(f"[SESSION {self.session_id[:8]}] Retry attempt {attempt - 1}")
+        return self._run_claude(message, on_chunk)
+    
+    def _run_claude(self, message: str,
+                    on_chunk: Optional[Callable[[str], None]] = None) -> subprocess.CompletedProcess:
+        """Run one turn on this tab's pooled worker, falling back to `claude --print`"""
+        if self.use_worker_pool:
+            worker = None
+            healthy = False
+            try:
+                worker = claude_worker_pool.checkout(self.tab_id or self.session_id)
                 
-                return "Sorry, I couldn't process that request after multiple attempts."
+                # A worker keeps its own conversation, so only a fresh one needs the history
+                if claude_worker_pool.is_fresh(worker):
+                    prompt = self._build_context_prompt(message)
+                else:
+                    prompt = message
                 
-        except Exception as e:
-            print(f"[SESSION {self.session_id[:8]}] Exception: {e}")
-            
-            # Retry on exception if we haven't exceeded max retries
-            if retry_count < max_retries:
-                print(f"[SESSION {self.session_id[:8]}] Exception occurred, retrying...")
-                return self._retry_with_message(message, retry_count + 1)
-            
-            return f"Sorry, an error occurred after multiple attempts: {str(e)}"
-    
-    def _retry_with_message(self, original_message: str, retry_count: int) -> str:
-        """Handle retry with user-visible feedback"""
-        # Add a small delay before retrying
-        time.sleep(1)
+                self.current_worker = worker
+                if self.cancel_event.is_set():
+                    result = subprocess.CompletedProcess(args=[], returncode=1, stdout='', stderr='Cancelled')
+                else:
+                    result = worker.request(prompt, on_chunk=on_chunk)
+                # A failed turn stays in the worker's conversation; a retry needs a fresh worker
+                healthy = classify_result(result) is None
+                return result
+            except FileNotFoundError as e:
+                print(f"[SESSION {self.session_id[:8]}] Worker pool unavailable ({e}), using one-shot CLI")
+                self.use_worker_pool = False
+            except WorkerError as e:
+                print(f"[SESSION {self.session_id[:8]}] Worker error: {e}")
+                return subprocess.CompletedProcess(args=[], returncode=1, stdout='', stderr=str(e))
+            finally:
+                self.current_worker = None
+                # Anything else (a failing on_chunk, a dead socket) leaves the worker mid-turn: retire it
+                if worker:
+                    claude_worker_pool.checkin(worker, healthy=healthy)
+        
+        # Build context from conversation history
+        context_prompt = self._build_context_prompt(message)
+        cmd = ['claude', '--dangerously-skip-permissions', '--print', context_prompt]
         
-        # Create retry message for the user to see
-        if retry_count == 1:
-            retry_response = "⚠️ Execution error - Trying again..."
-        else:
-            retry_response = f"⚠️ Execution error - Trying again (attempt {retry_count})..."
+        if on_chunk:
+            return self._run_streaming(cmd, on_chunk)
         
-        print(f"[SESSION {self.session_id[:8]}] Showing retry message to user: {retry_response}")
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        self.current_process = process
+        if self.cancel_event.is_set():
+            process.kill()
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            self.current_process = None
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+    
+    def _run_streaming(self, cmd: List[str], on_chunk: Callable[[str], None]) -> subprocess.CompletedProcess:
+        """Run a one-shot CLI call, forwarding stdout as it is written"""
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.current_process = process
+        if self.cancel_event.is_set():
+            process.kill()
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        chunks = []
         
-        # Try the request again
-        actual_response = self.send_message(original_message, retry_count)
+        try:
+            while True:
+                data = process.stdout.read1(4096)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    chunks.append(text)
+                    on_chunk(text)
+            
+            stderr = process.stderr.read().decode('utf-8', errors='replace')
+            returncode = process.wait()
+        finally:
+            self.current_process = None
+        return subprocess.CompletedProcess(cmd, returncode, ''.join(chunks), stderr)
+    
+    def cancel(self) -> bool:
+        """Abort the in-flight turn, killing whichever Claude process is serving it.
         
-        # If we got another error response, combine them
-        if "execution error" in actual_response.lower() or "sorry" in actual_response.lower():
-            return f"{retry_response}\n\n{actual_response}"
-        else:
-            # Success on retry - show the retry message followed by the actual response
-            return f"{retry_response}\n\n{actual_response}"
+        send_message() then returns '' without retrying or recording the
+        exchange. A killed pool worker is retired by the pool, and the next
+        turn gets a fresh one primed with the conversation history. A retry
+        waiting out its backoff is dropped.
+        """
+        self.cancel_event.set()
+        retry_engine.cancel(self.session_id)
+        killed = False
+        for process in (getattr(self.current_worker, 'process', None), self.current_process):
+            if process is not None and process.poll() is None:
+                process.kill()
+                killed = True
+        if killed:
+            print(f"[SESSION {self.session_id[:8]}] Cancelled in-flight request")
+        return killed
+    
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """Messages still in the context window (summarized ones are not included)"""
+        return self.context.history()
     
     def _build_context_prompt(self, new_message: str) -> str:
         """Build a prompt that includes conversation history"""
-        if not self.conversation_history:
+        if self.context.is_empty():
             # First message, no context needed
             return new_message
-        
-        # Build context from history
-        context_parts = []
-        context_parts.append("Continue this conversation, maintaining context from our previous messages:")
-        context_parts.append("")
-        
-        # Add conversation history
-        for msg in self.conversation_history[-self.max_context_messages:]:
-            if msg['role'] == 'user':
-                context_parts.append(f"Human: {msg['content']}")
-            else:
-                context_parts.append(f"Assistant: {msg['content']}")
-            context_parts.append("")
-        
-        # Add the new message
-        context_parts.append(f"Human: {new_message}")
-        context_parts.append("")
-        context_parts.append("Assistant:")
-        
-        full_prompt = "\n".join(context_parts)
+        full_prompt = self.context.build(new_message)
         
         # Log the context being sent (truncated for readability)
-        print(f"[SESSION {self.session_id[:8]}] Context prompt ({len(full_prompt)} chars):")
+        stats = self.context.get_stats()
+        print(f"[SESSION {self.session_id[:8]}] Context prompt ({len(full_prompt)} chars, "
+              f"{stats['messages']} messages + {stats['summary_lines']} summarized exchanges):")
         print(full_prompt[:500] + "..." if len(full_prompt) > 500 else full_prompt)
         
         return full_prompt
@@ -186,14 +250,17 @@ class ClaudeMemoryOrchestrator:
         print(f"[MEMORY ORCHESTRATOR] Created session {session_id[:8]} for tab {tab_id}")
         return session_id
         
-    def send_message(self, tab_id: str, message: str) -> Optional[str]:
-        """Send message to a session and get response"""
+    def send_message(self, tab_id: str, message: str,
+                     on_chunk: Optional[Callable[[str], None]] = None,
+                     cancel_event: Optional[threading.Event] = None,
+                     on_retry: Optional[Callable[[int, str, float], None]] = None) -> Optional[str]:
+        """Send message to a session and get response (streamed to on_chunk if given)"""
         if tab_id not in self.sessions:
             print(f"[MEMORY ORCHESTRATOR] No session for tab {tab_id}, creating one")
             self.create_session(tab_id)
             
         session = self.sessions[tab_id]
-        response = session.send_message(message)
+        response = session.send_message(message, on_chunk=on_chunk, cancel_event=cancel_event, on_retry=on_retry)
         
         # Update session data
         if tab_id in self.session_data:
@@ -202,6 +269,11 @@ class ClaudeMemoryOrchestrator:
         
         return response
     
+    def cancel(self, tab_id: str) -> bool:
+        """Cancel the in-flight request for a tab; True if a process was killed"""
+        session = self.sessions.get(tab_id)
+        return session.cancel() if session else False
+    
     def send_message_with_retry_feedback(self, tab_id: str, message: str, callback=None) -> Optional[str]:
         """Send message with real-time retry feedback"""
         if tab_id not in self.sessions:
@@ -210,27 +282,14 @@ class ClaudeMemoryOrchestrator:
             
         session = self.sessions[tab_id]
         
-        # Custom wrapper to provide feedback during retries
-        class RetryFeedbackSession:
-            def __init__(self, original_session, feedback_callback):
-                self.original_session = original_session
-                self.feedback_callback = feedback_callback
-                
-            def send_message(self, msg, retry_count=0):
-                if retry_count > 0 and self.feedback_callback:
-                    # Send immediate feedback to user
-                    if retry_count == 1:
-                        self.feedback_callback("⚠️ Execution error - Trying again...")
-                    else:
-                        self.feedback_callback(f"⚠️ Execution error - Trying again (attempt {retry_count})...")
-                
-                return self.original_session.send_message(msg, retry_count)
+        def retry_feedback(attempt: int, error_class: str, delay: float):
+            # Send immediate feedback to user
+            if attempt == 1:
+                callback("⚠️ Execution error - Trying again...")
+            else:
+                callback(f"⚠️ Execution error - Trying again (attempt {attempt})...")
         
-        if callback:
-            wrapped_session = RetryFeedbackSession(session, callback)
-            response = wrapped_session.send_message(message)
-        else:
-            response = session.send_message(message)
+        response = session.send_message(message, on_retry=retry_feedback if callback else None)
         
         # Update session data
         if tab_id in self.session_data:
@@ -251,6 +310,10 @@ class ClaudeMemoryOrchestrator:
             del self.sessions[tab_id]
             if tab_id in self.session_data:
                 del self.session_data[tab_id]
+            retry_engine.forget(session.session_id)
+            
+            # Stop the worker holding this tab's conversation
+            claude_worker_pool.release(tab_id)
             
     def get_session_id(self, tab_id: str) -> Optional[str]:
         """Get session ID for a tab"""
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Incremental parser for Claude TUI output - strips ANSI once and turns lines into typed events
+"""
+import codecs
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Union
+
+# CSI (colours, cursor moves, modes), OSC (titles, hyperlinks) and two-byte escapes
+ANSI_ESCAPE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])')
+
+# Line kinds
+RESPONSE = 'response'            # "● text" - start of a response paragraph
+RESPONSE_CONT = 'response_cont'  # Indented continuation of a response paragraph
+RESPONSE_COMPLETE = 'response_complete'  # Synthesized: a whole response paragraph ended
+TOOL_CALL = 'tool_call'          # "● Bash(ls)" and friends
+TOOL_OUTPUT = 'tool_output'      # "⎿  result"
+PERMISSION = 'permission'        # "Do you want to proceed?", "❯ 1. Yes", "2. No" right after either
+STATS = 'stats'                  # "4s · ↓ 122 tokens"
+SPINNER = 'spinner'              # "✻ Thinking… (4s · ↓ 122 tokens · esc to interrupt)"
+PROMPT = 'prompt'                # "Human:", "User:", "> input" - the assistant's turn is over
+UI = 'ui'                        # Box drawing, shortcut hints
+TEXT = 'text'                    # Anything else
+
+TOOL_NAMES = ('Bash', 'Read', 'Edit', 'MultiEdit', 'Write', 'Grep', 'Glob', 'LS', 'List', 'Call',
+              'WebFetch', 'WebSearch', 'NotebookRead', 'NotebookEdit', 'Task', 'TodoWrite', 'Update')
+
+_STATS = r'(?P<{s}>\d+)s\s*·\s*[⚒↑↓]\s*(?P<{t}>\d+(?:\.\d+)?[kK]?)\s*tokens'
+
+# One alternation, tried once per line; the first alternative that matches wins
+LINE_PATTERN = re.compile(r'''
+    (?P<permission>
+        Do\ you\ want\ to\ .*\? | ❯\s*\d\.\s
+      | (?:Bash\ command|Allow\ .*\?)\s*$
+    )
+  | (?P<option>\d\.\s*(?:Yes|No)\b)
+  | [●⏺]\s*(?P<tool>(?:''' + '|'.join(TOOL_NAMES) + r''')\(.*)
+  | [●⏺]\s*(?P<response>.*)
+  | ⎿\s*(?P<tool_output>.*)
+  | (?P<prompt>(?:Human|User):.* | >\s.*)
+  | (?:Assistant|Claude):\s*(?P<assistant>.*)
+  | (?P<spinner>[✻✽✢✶✳·*]\s*\S+…) (?:.*? ''' + _STATS.format(s='spin_seconds', t='spin_tokens') + r''')?
+  | .*? (?P<stats>''' + _STATS.format(s='seconds', t='tokens') + r''')
+  | (?P<ui>[╭╰─⏵]|\?\ for\ shortcuts|.*(?:esc\ to\ interrupt|shift\+tab|auto-accept)).*
+''', re.VERBOSE)
+
+# Box borders around a line ("│ Do you want to proceed? │")
+_BORDER = re.compile(r'^[\s│]+|[\s│]+$')
+
+
+def strip_ansi(text: str) -> str:
+    return ANSI_ESCAPE.sub('', text)
+
+
+def _token_count(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    if value[-1] in 'kK':
+        return int(float(value[:-1]) * 1000)
+    return int(float(value))
+
+
+@dataclass
+class ParseEvent:
+    """One classified line (or a completed response)"""
+    kind: str
+    text: str
+    seconds: Optional[int] = None
+    tokens: Optional[int] = None
+
+
+def classify_line(line: str, after_question: bool = False) -> ParseEvent:
+    """Classify a single ANSI-free line.
+
+    An unmarked "2. No" option only counts as part of a permission prompt
+    when after_question says the previous line was one; on its own it is
+    just a numbered list item ("2. No worries, ...").
+    """
+    indented = line[:1] in (' ', '\t')
+    stripped = _BORDER.sub('', line)
+    if not stripped:
+        return ParseEvent(TEXT, '')
+
+    match = LINE_PATTERN.match(stripped)
+    if match is None:
+        return ParseEvent(RESPONSE_CONT if indented else TEXT, stripped)
+
+    groups = match.groupdict()
+    if groups['permission'] is not None:
+        return ParseEvent(PERMISSION, stripped)
+    if groups['option'] is not None:
+        if after_question:
+            return ParseEvent(PERMISSION, stripped)
+        return ParseEvent(RESPONSE_CONT if indented else TEXT, stripped)
+    if groups['tool'] is not None:
+        return ParseEvent(TOOL_CALL, groups['tool'])
+    if groups['response'] is not None:
+        return ParseEvent(RESPONSE, groups['response'].strip())
+    if groups['tool_output'] is not None:
+        return ParseEvent(TOOL_OUTPUT, groups['tool_output'].strip())
+    if groups['prompt'] is not None:
+        if indented and stripped[0] == '>':
+            # The input line starts at column 0 (or a box border); an indented "> " is a markdown quote
+            return ParseEvent(RESPONSE_CONT, stripped)
+        return ParseEvent(PROMPT, stripped)
+    if groups['assistant'] is not None:
+        return ParseEvent(RESPONSE, groups['assistant'].strip())
+    if groups['spinner'] is not None:
+        seconds = groups['spin_seconds']
+        return ParseEvent(SPINNER, stripped, int(seconds) if seconds else None,
+                          _token_count(groups['spin_tokens']))
+    if groups['stats'] is not None:
+        return ParseEvent(STATS, stripped, int(groups['seconds']), _token_count(groups['tokens']))
+    if groups['ui'] is not None:
+        return ParseEvent(UI, stripped)
+    return ParseEvent(TEXT, stripped)
+
+
+class ClaudeOutputParser:
+    """
+    Feed raw terminal output (bytes or str) as it arrives and get events back.
+
+    Partial lines and split UTF-8 sequences are held until they complete,
+    so every byte is decoded, ANSI-stripped and classified exactly once.
+    Consecutive response and continuation lines are also joined into one
+    RESPONSE_COMPLETE event when the paragraph ends.
+    """
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.partial = ''
+        self.response: List[str] = []
+        self.last_kind = TEXT
+        self.lines = 0
+
+    def feed(self, data: Union[bytes, str]) -> List[ParseEvent]:
+        text = self.decoder.decode(data) if isinstance(data, bytes) else data
+        if not text:
+            return []
+        # Spinners redraw with a bare \r; treat it as a line end like \n
+        parts = (self.partial + text).replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        self.partial = parts.pop()
+        return self._consume(parts)
+
+    def flush(self) -> List[ParseEvent]:
+        """Classify any trailing partial line and close an open response"""
+        parts = [self.partial] if self.partial else []
+        self.partial = ''
+        events = self._consume(parts)
+        events.extend(self._close_response())
+        return events
+
+    def _close_response(self) -> List[ParseEvent]:
+        if not self.response:
+            return []
+        text = ' '.join(self.response)
+        self.response = []
+        return [ParseEvent(RESPONSE_COMPLETE, text)]
+
+    def _consume(self, lines: List[str]) -> List[ParseEvent]:
+        events: List[ParseEvent] = []
+        for raw in lines:
+            self.lines += 1
+            event = classify_line(ANSI_ESCAPE.sub('', raw) if '\x1b' in raw else raw,
+                                  after_question=self.last_kind == PERMISSION)
+            if not event.text and event.kind == TEXT:
+                # Blank lines end a paragraph but are not reported
+                events.extend(self._close_response())
+                continue
+
+            if event.kind == PROMPT and self.response and event.text[0] == '>':
+                # The input box is drawn after a blank line; "> " inside a paragraph quotes
+                event.kind = RESPONSE_CONT
+            if event.kind == RESPONSE:
+                events.extend(self._close_response())
+                self.response.append(event.text)
+            elif event.kind == RESPONSE_CONT and self.response:
+                self.response.append(event.text)
+            else:
+                if event.kind == RESPONSE_CONT:
+                    # Indented text outside a response continues a tool result, if any
+                    event.kind = TOOL_OUTPUT if self.last_kind == TOOL_OUTPUT else TEXT
+                events.extend(self._close_response())
+            self.last_kind = event.kind
+            events.append(event)
+        return events
+
+    def parse(self, data: Union[bytes, str]) -> List[ParseEvent]:
+        """Parse a complete buffer in one call (feed + flush)"""
+        return self.feed(data) + self.flush()
+
+
+def iter_events(chunks: Iterator[Union[bytes, str]]) -> Iterator[ParseEvent]:
+    """Events for a stream of output chunks"""
+    parser = ClaudeOutputParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.flush()
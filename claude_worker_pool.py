@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Pool of warm, long-lived Claude processes - avoids paying CLI startup on every message
+"""
+import json
+import queue
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set
+from claude_subprocess_manager import ClaudeSession
+from session_registry import max_sessions_from_env
+
+CLAUDE_WORKER_CMD = [
+    'claude', '--dangerously-skip-permissions', '--print',
+    '--input-format', 'stream-json',
+    '--output-format', 'stream-json',
+    '--include-partial-messages',
+    '--verbose'
+]
+
+
+class WorkerError(Exception):
+    """Raised when a worker dies or stops answering mid-request"""
+
+
+class ClaudeWorker(ClaudeSession):
+    """
+    A persistent `claude --print` process speaking stream-json.
+
+    Each user message written to stdin is a new turn in the same
+    conversation, so a worker keeps its context between requests. Workers
+    are therefore bound to a single tab while in use.
+    """
+
+    def __init__(self, worker_id: str):
+        super().__init__(worker_id)
+        self.tab_id: Optional[str] = None
+        self.requests_served = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.busy = False
+
+    def start(self):
+        """Spawn the Claude process and its stdout reader"""
+        self.process = subprocess.Popen(
+            CLAUDE_WORKER_CMD,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+        self.reader_thread = threading.Thread(target=self._read_output, daemon=True)
+        self.reader_thread.start()
+        self.is_ready = True
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def send_message(self, message: str):
+        """Write one user turn to the worker"""
+        event = {
+            'type': 'user',
+            'message': {'role': 'user', 'content': [{'type': 'text', 'text': message}]}
+        }
+        try:
+            self.process.stdin.write(json.dumps(event) + '\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            raise WorkerError(f"Worker {self.session_id[:8]} stdin closed: {e}")
+
+    def get_response(self, timeout: float = 600,
+                     on_chunk: Optional[Callable[[str], None]] = None) -> subprocess.CompletedProcess:
+        """Read events until the turn's result arrives.
+
+        Text deltas are passed to on_chunk as they stream in. The result is
+        returned as a CompletedProcess so callers can treat it exactly like a
+        one-shot `claude --print` run.
+        """
+        deadline = time.time() + timeout
+        text_parts = []
+        streamed = False  # Partial deltas seen for the current assistant message
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise WorkerError(f"Worker {self.session_id[:8]} timed out after {timeout:.0f}s")
+            try:
+                line = self.output_queue.get(timeout=min(remaining, 1.0))
+            except queue.Empty:
+                if not self.is_alive():
+                    raise WorkerError(f"Worker {self.session_id[:8]} exited mid-request")
+                continue
+
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+
+            if event.get('type') == 'stream_event':
+                delta = event.get('event', {}).get('delta', {})
+                if delta.get('type') == 'text_delta' and delta.get('text'):
+                    streamed = True
+                    if on_chunk:
+                        on_chunk(delta['text'])
+
+            elif event.get('type') == 'assistant':
+                for block in event.get('message', {}).get('content', []):
+                    if block.get('type') == 'text':
+                        text_parts.append(block.get('text', ''))
+                        # CLI without partial messages: forward the whole block instead
+                        if on_chunk and not streamed and block.get('text'):
+                            on_chunk(block['text'])
+                streamed = False
+
+            elif event.get('type') == 'result':
+                is_error = event.get('is_error', False) or event.get('subtype') != 'success'
+                result_text = event.get('result') or '\n'.join(text_parts)
+                return subprocess.CompletedProcess(
+                    args=CLAUDE_WORKER_CMD,
+                    returncode=1 if is_error else 0,
+                    stdout='' if is_error else result_text,
+                    stderr=result_text if is_error else ''
+                )
+
+    def request(self, message: str, timeout: float = 600,
+                on_chunk: Optional[Callable[[str], None]] = None) -> subprocess.CompletedProcess:
+        """Send one turn and wait for its result"""
+        self.send_message(message)
+        result = self.get_response(timeout=timeout, on_chunk=on_chunk)
+        self.requests_served += 1
+        self.last_used = time.time()
+        return result
+
+
+class ClaudeWorkerPool:
+    """
+    Keeps warm Claude workers ready and hands them out per tab.
+
+    checkout(tab_id) returns the worker already holding that tab's
+    conversation, or binds a warm spare. checkin() recycles workers that are
+    unhealthy or have served max_requests; a background thread replaces dead
+    workers and keeps min_idle spares booted.
+    """
+
+    def __init__(self, min_idle: int = 2, max_workers: int = 8,
+                 max_requests: int = 20, health_interval: float = 10.0):
+        self.min_idle = min_idle
+        self.max_workers = max_workers
+        self.max_requests = max_requests
+        self.health_interval = health_interval
+
+        self.idle: Deque[ClaudeWorker] = deque()  # Warm spares, not bound to a tab
+        self.bound: Dict[str, ClaudeWorker] = {}  # tab_id -> worker holding its conversation
+        self.spawning: Set[str] = set()  # Tabs whose cold worker is starting (slot reserved)
+        self.condition = threading.Condition()
+        self.maintenance_thread: Optional[threading.Thread] = None
+        self.running = False
+        self.stats = {'spawned': 0, 'recycled': 0, 'died': 0, 'checkouts': 0, 'cold_checkouts': 0}
+
+    def _worker_count(self) -> int:
+        return len(self.idle) + len(self.bound) + len(self.spawning)
+
+    def _spawn(self) -> ClaudeWorker:
+        worker = ClaudeWorker(str(uuid.uuid4()))
+        worker.start()
+        self.stats['spawned'] += 1
+        print(f"[WORKER POOL] Spawned worker {worker.session_id[:8]}")
+        return worker
+
+    def _retire(self, worker: ClaudeWorker, reason: str):
+        """Stop a worker; caller has already removed it from idle/bound"""
+        print(f"[WORKER POOL] Retiring worker {worker.session_id[:8]} ({reason}, {worker.requests_served} requests)")
+        try:
+            worker.stop()
+        except Exception:
+            pass
+
+    def start(self):
+        """Start the maintenance thread (spares are booted from there)"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.maintenance_thread = threading.Thread(target=self._maintain, daemon=True)
+        self.maintenance_thread.start()
+        print(f"[WORKER POOL] Started (min_idle={self.min_idle}, max_workers={self.max_workers}, "
+              f"max_requests={self.max_requests})")
+
+    def _maintain(self):
+        """Health check loop: drop dead workers and keep spares warm"""
+        while self.running:
+            try:
+                with self.condition:
+                    for worker in [w for w in self.idle if not w.is_alive()]:
+                        self.idle.remove(worker)
+                        self.stats['died'] += 1
+                        print(f"[WORKER POOL] Idle worker {worker.session_id[:8]} died")
+                    for tab_id, worker in list(self.bound.items()):
+                        if not worker.busy and not worker.is_alive():
+                            del self.bound[tab_id]
+                            self.stats['died'] += 1
+                            print(f"[WORKER POOL] Worker for tab {tab_id} died")
+                    needed = min(self.min_idle - len(self.idle),
+                                 self.max_workers - self._worker_count())
+
+                # Spawn outside the lock so checkouts are not blocked on process start
+                for _ in range(max(0, needed)):
+                    worker = self._spawn()
+                    with self.condition:
+                        self.idle.append(worker)
+                        self.condition.notify_all()
+            except FileNotFoundError:
+                print("[WORKER POOL] claude CLI not found, stopping maintenance")
+                self.running = False
+                return
+            except Exception as e:
+                print(f"[WORKER POOL] Maintenance error: {e}")
+
+            with self.condition:
+                self.condition.wait(self.health_interval)
+
+    def checkout(self, tab_id: str, timeout: float = 30.0) -> ClaudeWorker:
+        """Get the worker for a tab, binding a warm spare if it has none"""
+        self.start()
+        deadline = time.time() + timeout
+
+        with self.condition:
+            self.stats['checkouts'] += 1
+            while True:
+                worker = self.bound.get(tab_id)
+                if worker is not None and not worker.is_alive():
+                    del self.bound[tab_id]
+                    self.stats['died'] += 1
+                    worker = None
+
+                if worker is not None:
+                    if not worker.busy:
+                        worker.busy = True
+                        return worker
+                    # Same tab already mid-request - wait for it to finish
+                elif tab_id not in self.spawning:  # Else its worker is starting - wait for it
+                    while self.idle:
+                        spare = self.idle.popleft()
+                        if spare.is_alive():
+                            return self._bind(spare, tab_id)
+                        self.stats['died'] += 1
+                    if self._worker_count() < self.max_workers:
+                        self.stats['cold_checkouts'] += 1
+                        self.spawning.add(tab_id)
+                        break
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise WorkerError(f"No Claude worker available for tab {tab_id}")
+                self.condition.wait(remaining)
+
+        # Spawn outside the lock (the slot is reserved) so other tabs are not blocked on process start
+        spare = None
+        try:
+            spare = self._spawn()
+        finally:
+            with self.condition:
+                self.spawning.discard(tab_id)
+                if spare is not None:
+                    self._bind(spare, tab_id)
+                self.condition.notify_all()  # Wake maintenance to refill spares
+        return spare
+
+    def _bind(self, worker: ClaudeWorker, tab_id: str) -> ClaudeWorker:
+        worker.tab_id = tab_id
+        worker.busy = True
+        self.bound[tab_id] = worker
+        return worker
+
+    def checkin(self, worker: ClaudeWorker, healthy: bool = True):
+        """Return a worker after a request, recycling it if needed"""
+        with self.condition:
+            worker.busy = False
+            reason = None
+            if not healthy:
+                reason = 'unhealthy'
+            elif not worker.is_alive():
+                reason = 'exited'
+            elif worker.requests_served >= self.max_requests:
+                reason = 'request limit'
+
+            if reason:
+                if self.bound.get(worker.tab_id) is worker:
+                    del self.bound[worker.tab_id]
+                self.stats['recycled'] += 1
+            self.condition.notify_all()
+
+        if reason:
+            self._retire(worker, reason)
+
+    def is_fresh(self, worker: ClaudeWorker) -> bool:
+        """True if the worker has no conversation yet (needs full context)"""
+        return worker.requests_served == 0
+
+    def release(self, tab_id: str):
+        """Drop the worker bound to a tab (tab closed)"""
+        with self.condition:
+            worker = self.bound.pop(tab_id, None)
+            self.condition.notify_all()
+        if worker:
+            self._retire(worker, 'tab closed')
+
+    def shutdown(self):
+        """Stop all workers"""
+        with self.condition:
+            self.running = False
+            workers = list(self.idle) + list(self.bound.values())
+            self.idle.clear()
+            self.bound.clear()
+            self.condition.notify_all()
+        for worker in workers:
+            self._retire(worker, 'shutdown')
+
+    def get_stats(self) -> dict:
+        with self.condition:
+            return {
+                **self.stats,
+                'idle': len(self.idle),
+                'bound': len(self.bound),
+                'busy': sum(1 for w in self.bound.values() if w.busy)
+            }
+
+
+# Global pool - workers are only spawned on first checkout; one per open tab at most
+claude_worker_pool = ClaudeWorkerPool(max_workers=max_sessions_from_env(16))
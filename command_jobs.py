@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Background command jobs - runs slow Claude turns off the HTTP request thread
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Optional
+from voice_logging import get_logger
+
+log = get_logger('jobs')
+
+
+class QueueFullError(Exception):
+    """Raised when a tab already has too many commands waiting"""
+
+
+@dataclass
+class CommandJob:
+    """One command sent to a tab, tracked from enqueue to completion"""
+    job_id: str
+    tab_id: str
+    command: str
+    status: str = 'queued'  # queued | running | done | error | cancelled
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    session_id: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        if self.started_at:
+            data['queue_seconds'] = round(self.started_at - self.created_at, 3)
+        if self.finished_at and self.started_at:
+            data['run_seconds'] = round(self.finished_at - self.started_at, 3)
+        return data
+
+
+class CommandJobTracker:
+    """
+    Runs commands on a single-thread executor per tab.
+
+    Each tab's commands execute in order, one at a time, while different
+    tabs run in parallel. submit() returns immediately with a job whose
+    status can be polled with get() or followed through the on_update
+    callback, which fires on every status change.
+    """
+
+    def __init__(self, runner: Callable[[str, str], str], max_pending_per_tab: int = 5,
+                 max_finished: int = 500, on_update: Optional[Callable[[CommandJob], None]] = None):
+        self.runner = runner  # runner(tab_id, command) -> session_id
+        self.max_pending_per_tab = max_pending_per_tab
+        self.max_finished = max_finished
+        self.on_update = on_update
+
+        self.jobs: "OrderedDict[str, CommandJob]" = OrderedDict()
+        self.executors: Dict[str, ThreadPoolExecutor] = {}
+        self.pending: Dict[str, int] = {}  # tab_id -> queued + running jobs
+        self.lock = threading.Lock()
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'cancelled': 0}
+
+    def _executor(self, tab_id: str) -> ThreadPoolExecutor:
+        executor = self.executors.get(tab_id)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'job-{tab_id}')
+            self.executors[tab_id] = executor
+        return executor
+
+    def _notify(self, job: CommandJob):
+        if self.on_update:
+            try:
+                self.on_update(job)
+            except Exception as e:
+                log.error("Update callback error: %s", e)
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_finished (lock held)"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def is_full(self, tab_id: str) -> bool:
+        with self.lock:
+            return self.pending.get(tab_id, 0) >= self.max_pending_per_tab
+
+    def submit(self, tab_id: str, command: str, run: Optional[Callable[[], str]] = None) -> CommandJob:
+        """Queue a command for a tab and return its job without waiting.
+
+        run, if given, replaces runner(tab_id, command) for this job.
+        """
+        job = self.reserve(tab_id, command)
+        self.start(job, run)
+        return job
+
+    def reserve(self, tab_id: str, command: str) -> CommandJob:
+        """Take one of the tab's pending slots for a job that is not started yet.
+
+        Raises QueueFullError if the tab has none left. Pass the job to
+        start(), or to release() if the work it stands for could not be set up.
+        """
+        with self.lock:
+            if self.pending.get(tab_id, 0) >= self.max_pending_per_tab:
+                self.stats['rejected'] += 1
+                raise QueueFullError(f"Tab {tab_id} already has {self.max_pending_per_tab} commands pending")
+
+            job = CommandJob(job_id=str(uuid.uuid4()), tab_id=tab_id, command=command, created_at=time.time())
+            self.jobs[job.job_id] = job
+            self.pending[tab_id] = self.pending.get(tab_id, 0) + 1
+            self._prune()
+        return job
+
+    def start(self, job: CommandJob, run: Optional[Callable[[], str]] = None):
+        """Queue a reserved job on its tab's executor"""
+        with self.lock:
+            self.stats['submitted'] += 1
+            executor = self._executor(job.tab_id)
+
+        log.info("Queued job %.8s for tab %s", job.job_id, job.tab_id)
+        # Announce before it can start so clients always see queued -> running -> done
+        self._notify(job)
+        executor.submit(self._run, job, run)
+
+    def release(self, job: CommandJob):
+        """Give back the slot of a reserved job that will never be started"""
+        with self.lock:
+            self.jobs.pop(job.job_id, None)
+            self.pending[job.tab_id] -= 1
+
+    def _run(self, job: CommandJob, run: Optional[Callable[[], str]] = None):
+        job.status = 'running'
+        job.started_at = time.time()
+        self._notify(job)
+
+        try:
+            job.session_id = run() if run else self.runner(job.tab_id, job.command)
+            job.status = 'done'
+            self.stats['completed'] += 1
+        except CancelledError:
+            log.info("Job %.8s for tab %s cancelled", job.job_id, job.tab_id)
+            job.status = 'cancelled'
+            self.stats['cancelled'] += 1
+        except Exception as e:
+            log.error("Job %.8s for tab %s failed: %s", job.job_id, job.tab_id, e)
+            job.status = 'error'
+            job.error = str(e)
+            self.stats['failed'] += 1
+        finally:
+            job.finished_at = time.time()
+            with self.lock:
+                self.pending[job.tab_id] -= 1
+
+        self._notify(job)
+
+    def get(self, job_id: str) -> Optional[CommandJob]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {**self.stats, 'tracked': len(self.jobs),
+                    'pending': {tab: n for tab, n in self.pending.items() if n}}
+
+    def close_tab(self, tab_id: str):
+        """Stop the tab's executor thread once its queued jobs are done (tab closed)"""
+        with self.lock:
+            executor = self.executors.pop(tab_id, None)
+            if not self.pending.get(tab_id):
+                self.pending.pop(tab_id, None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def shutdown(self):
+        with self.lock:
+            executors = list(self.executors.values())
+            self.executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=False)
@@ -9,7 +9,6 @@ Advanced AI Companion Voice Bot with Enhanced Features
 """
 
 from flask import Flask, render_template_string, request, jsonify, send_file, session
-import subprocess
 import ssl
 import time
 from datetime import datetime, timedelta
@@ -17,14 +16,18 @@ import threading
 import queue
 import re
 import os
-import tempfile
-import asyncio
 import edge_tts
 import random
 import json
 from collections import deque
 import sqlite3
 import hashlib
+import io
+import sys
+from tmux_client import tmux_client
+from tts_cache import tts_cache
+from tts_worker import tts_worker
+from phrase_bank import phrase_bank, PhraseEntry, fingerprint
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
@@ -156,6 +159,23 @@ VOICE_PROFILES = {
     }
 }
 
+def companion_phrases():
+    """Every stock phrase in COMPANION_CONFIG, for every voice profile"""
+    elements = COMPANION_CONFIG['conversation_elements']
+    proactive = COMPANION_CONFIG['proactive_behaviors']
+    
+    groups = [(category, 'neutral', phrases) for category, phrases in elements.items()]
+    groups.append(('check_in_phrases', 'neutral', proactive['check_in_phrases']))
+    groups.append(('follow_up_phrases', 'neutral', proactive['follow_up_phrases']))
+    # Mood responses are voiced with the mood they answer
+    groups += [(f'mood_responses.{mood}', mood, phrases)
+               for mood, phrases in proactive['mood_responses'].items()]
+    
+    return [PhraseEntry(profile, category, mood, text)
+            for profile in VOICE_PROFILES
+            for category, mood, phrases in groups
+            for text in phrases]
+
 def get_user_id(ip_address):
     """Generate consistent user ID from IP"""
     return hashlib.md5(ip_address.encode()).hexdigest()[:8]
@@ -266,7 +286,7 @@ def generate_contextual_response(user_input, user_id):
     return enhanced_command, current_mood
 
 async def generate_natural_tts(text, voice_profile, mood='neutral', user_prefs=None):
-    """Generate natural-sounding speech with dynamic adjustments"""
+    """Generate natural-sounding speech with dynamic adjustments, returned as MP3 bytes"""
     profile = VOICE_PROFILES.get(voice_profile, VOICE_PROFILES['warm_supportive'])
     
     # Clean and prepare text
@@ -306,11 +326,26 @@ async def generate_natural_tts(text, voice_profile, mood='neutral', user_prefs=N
     </speak>'''
     
     # Generate audio
-    communicate = edge_tts.Communicate(ssml, profile['voice'])
+    async def synthesize():
+        communicate = edge_tts.Communicate(ssml, profile['voice'])
+        audio = bytearray()
+        async for chunk in communicate.stream():
+            if chunk['type'] == 'audio':
+                audio.extend(chunk['data'])
+        return bytes(audio)
     
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-        await communicate.save(tmp_file.name)
-        return tmp_file.name
+    # Prosody is baked into the SSML, so it alone identifies the utterance
+    return await tts_cache.aget_or_create(ssml, profile['voice'], synthesize)
+
+def ensure_phrase_bank(background=True):
+    """Load the phrase audio bank, rebuilding it if the phrases or voice profiles changed"""
+    entries = companion_phrases()
+    phrase_bank.ensure(
+        entries,
+        lambda entry: generate_natural_tts(entry.text, entry.profile, entry.mood),
+        fingerprint(entries, VOICE_PROFILES),
+        background=background
+    )
 
 def capture_tmux_output():
     """Enhanced output capture with conversation flow management"""
@@ -326,15 +361,10 @@ def capture_tmux_output():
             
             # Quick permission check
             if time.time() - last_command_time < 1 and not permission_handled:
-                result = subprocess.run(
-                    ['tmux', 'capture-pane', '-t', 'claude:0', '-p'],
-                    capture_output=True,
-                    text=True
-                )
+                pane = tmux_client.capture_pane('claude:0') or ''
                 
-                if any(p in result.stdout.lower() for p in ['permission', 'approve', 'bash', '❯', 'y/n']):
-                    subprocess.run(['tmux', 'send-keys', '-t', 'claude:0', '1'], check=True)
-                    subprocess.run(['tmux', 'send-keys', '-t', 'claude:0', 'Enter'], check=True)
+                if any(p in pane.lower() for p in ['permission', 'approve', 'bash', '❯', 'y/n']):
+                    tmux_client.send_keys('claude:0', '1', 'Enter')
                     permission_handled = True
                     time.sleep(1)
                     continue
@@ -345,13 +375,7 @@ def capture_tmux_output():
                 continue
             
             # Capture full response
-            result = subprocess.run(
-                ['tmux', 'capture-pane', '-t', 'claude:0', '-p'],
-                capture_output=True,
-                text=True
-            )
-            
-            output = result.stdout
+            output = tmux_client.capture_pane('claude:0') or ''
             current_stats = extract_stats_from_output(output)
             is_claude_thinking = any(ind in output for ind in ['Simmering', 'Deciphering', 'tokens'])
             
@@ -1007,6 +1031,9 @@ HTML_TEMPLATE = '''
                 
                 if (!response.ok) throw new Error('Failed to send message');
                 
+                // Acknowledge right away; the real answer interrupts it when ready
+                playInstantPhrase(Math.random() < 0.5 ? 'acknowledgments' : 'thinking');
+                
             } catch (error) {
                 console.error('Send error:', error);
                 isThinking = false;
@@ -1064,6 +1091,29 @@ HTML_TEMPLATE = '''
             if (typing) typing.remove();
         }
         
+        // Play a pre-synthesized stock phrase while the real answer is generated
+        async function playInstantPhrase(category) {
+            if (isSpeaking) return;
+            
+            try {
+                const response = await fetch(`/phrase-audio?category=${category}&voice=${selectedVoice}`);
+                if (!response.ok) return;  // Phrase bank still building
+                
+                const audioUrl = URL.createObjectURL(await response.blob());
+                if (isSpeaking || !isThinking) {
+                    // The answer arrived first
+                    URL.revokeObjectURL(audioUrl);
+                    return;
+                }
+                
+                currentAudio = new Audio(audioUrl);
+                currentAudio.onended = () => URL.revokeObjectURL(audioUrl);
+                await currentAudio.play();
+            } catch (error) {
+                console.error('Phrase audio error:', error);
+            }
+        }
+        
         async function speakText(text, mood = 'neutral') {
             if (currentAudio && !currentAudio.paused) {
                 currentAudio.pause();
@@ -1222,8 +1272,7 @@ def send_command():
         processed_responses.clear()
         
         # Send to tmux
-        subprocess.run(['tmux', 'send-keys', '-t', 'claude:0', enhanced_command], check=True)
-        subprocess.run(['tmux', 'send-keys', '-t', 'claude:0', 'Enter'], check=True)
+        tmux_client.send_text('claude:0', enhanced_command)
         
         last_command = enhanced_command
         last_command_time = time.time()
@@ -1290,24 +1339,34 @@ def get_tts_audio():
         if result and result[0]:
             voice_profile = result[0]
         
-        # Generate audio
-        audio_file = asyncio.run(generate_natural_tts(text, voice_profile, mood))
-        
-        response = send_file(audio_file, mimetype='audio/mpeg')
+        # Stock phrases come straight from the pre-synthesized bank
+        audio = phrase_bank.get(voice_profile, mood, text)
+        if audio is None:
+            # Generate audio
+            audio = tts_worker.run(generate_natural_tts(text, voice_profile, mood))
         
-        @response.call_on_close
-        def cleanup():
-            try:
-                os.unlink(audio_file)
-            except:
-                pass
-        
-        return response
+        return send_file(io.BytesIO(audio), mimetype='audio/mpeg')
         
     except Exception as e:
         print(f"TTS Error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/phrase-audio')
+def get_phrase_audio():
+    """Instant audio for a random stock phrase (played while Claude is still answering)"""
+    category = request.args.get('category', 'acknowledgments')
+    voice_profile = request.args.get('voice', 'warm_supportive')
+    
+    phrase = phrase_bank.pick(voice_profile, category)
+    if phrase is None:
+        # Bank not built yet (or unknown category) - client just skips the phrase
+        return jsonify({'error': 'Phrase not available'}), 404
+    
+    text, audio = phrase
+    response = send_file(io.BytesIO(audio), mimetype='audio/mpeg')
+    response.headers['X-Phrase'] = text
+    return response
+
 @app.route('/conversation-summary/<user_id>')
 def get_conversation_summary(user_id):
     """Get conversation summary for a user"""
@@ -1347,6 +1406,14 @@ if __name__ == '__main__':
     print(f"\n📱 Access at: https://192.168.40.232:8106")
     print("="*50 + "\n")
     
+    if '--build-phrase-bank' in sys.argv:
+        # Offline build: synthesize every stock phrase and exit
+        ensure_phrase_bank(background=False)
+        sys.exit(0)
+    
+    # Serve from the existing pack; rebuild in the background if phrases changed
+    ensure_phrase_bank()
+    
     # SSL context
     context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
     context.load_cert_chain('cert.pem', 'key.pem')
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Context builder - token-budgeted conversation context with an incrementally maintained prompt prefix
+"""
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+CONTEXT_HEADER = "Continue this conversation, maintaining context from our previous messages:\n\n"
+SUMMARY_HEADER = "Summary of earlier conversation:\n"
+ROLE_LABELS = {'user': 'Human', 'assistant': 'Assistant'}
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count - 1 token ≈ 4 characters, as the orchestrators estimate it"""
+    return len(text) // 4 + 1
+
+
+def context_budget_from_env(default: int = 4000) -> int:
+    """Prompt context budget in tokens, overridable with $VOICE_CONTEXT_TOKENS"""
+    try:
+        return int(os.environ.get('VOICE_CONTEXT_TOKENS', default))
+    except ValueError:
+        return default
+
+
+def _clip(text: str, max_chars: int) -> str:
+    """Head and tail of text when it is longer than max_chars"""
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 2 // 3
+    return f"{text[:head]} […] {text[-(max_chars - head):]}"
+
+
+def _gist(text: str, max_chars: int) -> str:
+    """First sentence of text, on one line, at most max_chars"""
+    line = ' '.join(text[:max_chars * 2].split())  # The gist is at the start; skip the rest
+    first = SENTENCE_END.split(line, 1)[0]
+    return first if len(first) <= max_chars else first[:max_chars - 1] + '…'
+
+
+@dataclass
+class ContextEntry:
+    role: str
+    content: str
+    timestamp: str
+    rendered: str  # "Human: ...\n\n", clipped to the per-message cap
+    tokens: int
+
+
+class ContextWindow:
+    """
+    Conversation history for prompts, bounded by tokens rather than messages.
+
+    Each message is rendered and its tokens estimated once, when added. The
+    rendered transcript is kept as one prefix string that grows by appending
+    and shrinks by slicing off its oldest messages, so building a prompt is
+    a single concatenation. When the transcript exceeds budget_tokens, the
+    oldest exchanges move into a short extractive summary (one line per
+    exchange, itself capped at summary_tokens) instead of disappearing.
+    Messages longer than max_message_tokens keep their head and tail.
+    """
+
+    def __init__(self, budget_tokens: int = 4000, summary_tokens: int = 500,
+                 max_message_tokens: Optional[int] = None, min_recent: int = 2):
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.max_message_tokens = max_message_tokens or budget_tokens // 3
+        self.min_recent = min_recent  # Messages never summarized (the last exchange)
+        self.entries: Deque[ContextEntry] = deque()
+        self.prefix = ''
+        self.tokens = 0  # Of self.entries
+        self.summary_lines: Deque[str] = deque()
+        self.summary_tokens_used = 0
+        self.summary = ''
+        self.pending_user: Optional[ContextEntry] = None  # Summarized together with its reply
+        self.stats = {'added': 0, 'summarized': 0, 'summary_dropped': 0, 'clipped': 0}
+
+    def add(self, role: str, content: str):
+        """Append a message and trim to the budget"""
+        text = _clip(content, self.max_message_tokens * 4)
+        if text is not content:
+            self.stats['clipped'] += 1
+        rendered = f"{ROLE_LABELS.get(role, 'Assistant')}: {text}\n\n"
+        entry = ContextEntry(role, content, datetime.now().isoformat(), rendered, estimate_tokens(rendered))
+        self.entries.append(entry)
+        self.prefix += rendered
+        self.tokens += entry.tokens
+        self.stats['added'] += 1
+        self._trim()
+
+    def _trim(self):
+        dropped = 0
+        while self.tokens > self.budget_tokens and len(self.entries) > self.min_recent:
+            entry = self.entries.popleft()
+            self.tokens -= entry.tokens
+            dropped += len(entry.rendered)
+            self._summarize(entry)
+            # A reply does not stay behind without its question
+            if entry.role == 'user' and self.entries and self.entries[0].role == 'assistant' \
+                    and len(self.entries) > self.min_recent:
+                entry = self.entries.popleft()
+                self.tokens -= entry.tokens
+                dropped += len(entry.rendered)
+                self._summarize(entry)
+        if dropped:
+            self.prefix = self.prefix[dropped:]
+
+    def _summarize(self, entry: ContextEntry):
+        self.stats['summarized'] += 1
+        if entry.role == 'user':
+            self.pending_user = entry
+            return
+        asked = self.pending_user.content if self.pending_user else ''
+        self.pending_user = None
+        line = f"- {_gist(asked, 120)} → {_gist(entry.content, 160)}\n" if asked else \
+            f"- {_gist(entry.content, 200)}\n"
+        self.summary_lines.append(line)
+        self.summary_tokens_used += estimate_tokens(line)
+        while self.summary_tokens_used > self.summary_tokens and len(self.summary_lines) > 1:
+            self.summary_tokens_used -= estimate_tokens(self.summary_lines.popleft())
+            self.stats['summary_dropped'] += 1
+        self.summary = SUMMARY_HEADER + ''.join(self.summary_lines) + '\n'
+
+    def is_empty(self) -> bool:
+        """True when there is no history to put in front of a new message"""
+        return not self.entries and not self.summary
+
+    def build(self, new_message: str) -> str:
+        """The prompt for new_message: header, summary, recent transcript, then the new turn"""
+        if self.is_empty():
+            return new_message
+        return f"{CONTEXT_HEADER}{self.summary}{self.prefix}Human: {new_message}\n\nAssistant:"
+
+    def history(self) -> List[Dict[str, str]]:
+        """Messages still in the window, oldest first"""
+        return [{'role': e.role, 'content': e.content, 'timestamp': e.timestamp} for e in self.entries]
+
+    def clear(self):
+        self.entries.clear()
+        self.summary_lines.clear()
+        self.prefix = self.summary = ''
+        self.tokens = self.summary_tokens_used = 0
+        self.pending_user = None
+
+    def get_stats(self) -> dict:
+        return {**self.stats, 'messages': len(self.entries), 'tokens': self.tokens,
+                'summary_lines': len(self.summary_lines), 'summary_tokens': self.summary_tokens_used}
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Bounded dedup window - remembers recent fingerprints in a size-capped, time-decayed LRU
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def fingerprint(text: str) -> bytes:
+    """Stable 16-byte digest of a line or response (hash() changes between runs and collides more)"""
+    return hashlib.blake2b(text.encode('utf-8', errors='replace'), digest_size=16).digest()
+
+
+class DedupWindow:
+    """
+    Answers "was this seen recently?" in O(1) with bounded memory.
+
+    Entries are kept in recency order. Looking one up refreshes it; an entry
+    not seen for ttl seconds is forgotten, and beyond max_entries the least
+    recently seen ones are dropped, so a capture loop that runs for days
+    holds at most max_entries fingerprints. The ttl also lets the same text
+    through again once it has been gone a while, e.g. an identical reply to
+    a later request.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[bytes, float]" = OrderedDict()  # key -> last seen
+        self.lock = threading.Lock()
+        self.stats = {'checks': 0, 'duplicates': 0, 'evictions': 0, 'expirations': 0, 'peak_entries': 0}
+
+    def _expire(self, now: float):
+        """Drop entries older than ttl from the cold end (lock held)"""
+        if self.ttl is None:
+            return
+        cutoff = now - self.ttl
+        while self.entries:
+            key, seen = next(iter(self.entries.items()))
+            if seen >= cutoff:
+                break
+            del self.entries[key]
+            self.stats['expirations'] += 1
+
+    def __contains__(self, text: str) -> bool:
+        """True if text was seen recently (refreshes it)"""
+        key = fingerprint(text)
+        with self.lock:
+            self.stats['checks'] += 1
+            self._expire(time.monotonic())
+            if key not in self.entries:
+                return False
+            self.stats['duplicates'] += 1
+            self.entries.move_to_end(key)
+            self.entries[key] = time.monotonic()
+            return True
+
+    def add(self, text: str):
+        """Remember text, evicting the least recently seen entries beyond max_entries"""
+        key = fingerprint(text)
+        with self.lock:
+            self.entries[key] = time.monotonic()
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+            self.stats['peak_entries'] = max(self.stats['peak_entries'], len(self.entries))
+
+    def seen(self, text: str) -> bool:
+        """Check-and-add: True if text was seen recently, recording it either way"""
+        if text in self:
+            return True
+        self.add(text)
+        return False
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {**self.stats, 'entries': len(self.entries), 'max_entries': self.max_entries,
+                    'ttl': self.ttl}
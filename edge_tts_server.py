@@ -2,12 +2,14 @@
 """
 Edge-TTS Server for high-quality text-to-speech
 """
-import asyncio
-import edge_tts
-from flask import Flask, request, Response, jsonify
+from flask import Flask, request, Response, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 import io
 import logging
+import time
+from tts_pipeline import pipelined_tts
+from tts_cache import tts_cache, make_key
+from tts_worker import tts_worker, TTSBusyError
 
 app = Flask(__name__)
 CORS(app)
@@ -71,30 +73,8 @@ def text_to_speech():
         
         logger.info(f"TTS request: voice={voice_name} ({voice_id}), text_length={len(text)}")
         
-        # Create async function for edge-tts
-        async def generate_speech():
-            # Create communication instance
-            communicate = edge_tts.Communicate(
-                text=text,
-                voice=voice_id,
-                rate=rate,
-                pitch=pitch,
-                volume=volume
-            )
-            
-            # Generate speech and collect audio data
-            audio_data = b""
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    audio_data += chunk["data"]
-            
-            return audio_data
-        
-        # Run async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        audio_data = loop.run_until_complete(generate_speech())
-        loop.close()
+        # Synthesized on the shared TTS worker loop (repeat phrases come from the cache)
+        audio_data = tts_worker.synthesize(text, voice_id, rate, pitch, volume)
         
         # Return audio as response
         return Response(
@@ -106,17 +86,29 @@ def text_to_speech():
             }
         )
         
+    except TTSBusyError as e:
+        logger.warning(f"TTS rejected: {str(e)}")
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         logger.error(f"TTS error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/tts/stream', methods=['POST'])
-async def text_to_speech_stream():
-    """Stream text to speech using edge-tts"""
+@app.route('/tts/stream', methods=['GET', 'POST'])
+def text_to_speech_stream():
+    """Stream text to speech, flushing MP3 frames to the client as edge-tts yields them.
+
+    Uncached audio is sent with chunked transfer encoding. Audio that has
+    already been generated (or a Range request that seeks past the start)
+    is served from the TTS cache with full Range/206 support.
+    """
+    request_start = time.time()
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or request.args
         text = data.get('text', '')
         voice_name = data.get('voice', DEFAULT_VOICE).lower()
+        rate = data.get('rate', '+0%')
+        pitch = data.get('pitch', '+0Hz')
+        volume = data.get('volume', '+0%')
         
         if not text:
             return jsonify({"error": "No text provided"}), 400
@@ -126,32 +118,86 @@ async def text_to_speech_stream():
         
         logger.info(f"TTS stream request: voice={voice_name} ({voice_id}), text_length={len(text)}")
         
-        # Create communication instance
-        communicate = edge_tts.Communicate(text=text, voice=voice_id)
+        audio_data = tts_cache.get(make_key(text, voice_id, rate, pitch, volume))
+        range_start = request.range.ranges[0][0] if request.range else 0
+        if audio_data is None and range_start != 0:
+            # Seeking into audio that hasn't been generated yet - finish it first
+            audio_data = tts_worker.synthesize(text, voice_id, rate, pitch, volume)
+        
+        if audio_data is not None:
+            logger.info(f"TTS stream served {len(audio_data)} buffered bytes "
+                        f"in {(time.time() - request_start) * 1000:.0f}ms")
+            response = send_file(io.BytesIO(audio_data), mimetype='audio/mpeg', conditional=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        
+        # Submitted now, so a full worker queue is still a 503 rather than a broken 200
+        chunks = tts_worker.stream_synthesis(text, voice_id, rate, pitch, volume, check_cache=False)
         
-        # Stream audio data
-        async def generate():
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    yield chunk["data"]
+        def generate():
+            sent = 0
+            for chunk in chunks:
+                if sent == 0:
+                    logger.info(f"TTS stream first byte after {(time.time() - request_start) * 1000:.0f}ms")
+                sent += len(chunk)
+                yield chunk
+            logger.info(f"TTS stream complete: {sent} bytes in {(time.time() - request_start) * 1000:.0f}ms")
         
         return Response(
-            generate(),
+            stream_with_context(generate()),
             mimetype='audio/mpeg',
             headers={
                 'Content-Disposition': 'inline; filename="speech.mp3"',
-                'Cache-Control': 'no-cache'
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'  # Don't let a reverse proxy buffer the stream
             }
         )
         
+    except TTSBusyError as e:
+        logger.warning(f"TTS stream rejected: {str(e)}")
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         logger.error(f"TTS stream error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/tts/pipelined', methods=['GET', 'POST'])
+def text_to_speech_pipelined():
+    """Speak long text sentence by sentence, streaming each segment as soon as it is ready.
+
+    Accepts JSON (POST) or query parameters (GET), so an <audio> element can
+    point straight at it and start playing before the whole reply is synthesized.
+    """
+    data = request.get_json(silent=True) or request.args
+    text = data.get('text', '')
+    voice_name = data.get('voice', DEFAULT_VOICE).lower()
+    rate = data.get('rate', '+0%')
+    pitch = data.get('pitch', '+0Hz')
+    volume = data.get('volume', '+0%')
+    
+    if not text:
+        return jsonify({"error": "No text provided"}), 400
+    
+    voice_id = VOICES.get(voice_name, VOICES[DEFAULT_VOICE])
+    logger.info(f"TTS pipelined request: voice={voice_name} ({voice_id}), text_length={len(text)}")
+    
+    return Response(
+        stream_with_context(pipelined_tts.stream(text, voice_id, rate, pitch, volume)),
+        mimetype='audio/mpeg',
+        headers={
+            'Content-Disposition': 'inline; filename="speech.mp3"',
+            'Cache-Control': 'no-cache'
+        }
+    )
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "service": "edge-tts-server"})
+    return jsonify({
+        "status": "healthy",
+        "service": "edge-tts-server",
+        "tts_cache": tts_cache.get_stats(),
+        "tts_worker": tts_worker.get_stats()
+    })
 
 if __name__ == '__main__':
     print("Starting Edge-TTS Server...")
@@ -1,10 +1,9 @@
 #!/usr/bin/env python3
-import asyncio
 import json
 from flask import Flask, request, Response
 from flask_cors import CORS
 import edge_tts
-import io
+from tts_worker import tts_worker
 
 app = Flask(__name__)
 CORS(app)  # Allow all origins
@@ -20,20 +19,8 @@ def tts():
         pitch = data.get('pitch', '+0Hz')
         volume = data.get('volume', '+0%')
         
-        # Create async function to generate speech
-        async def generate():
-            communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch, volume=volume)
-            audio_data = io.BytesIO()
-            
-            async for chunk in communicate.stream():
-                if chunk['type'] == 'audio':
-                    audio_data.write(chunk['data'])
-            
-            audio_data.seek(0)
-            return audio_data.read()
-        
-        # Run async function
-        audio_bytes = asyncio.run(generate())
+        # Synthesized on the shared TTS worker loop (repeat phrases come from the cache)
+        audio_bytes = tts_worker.synthesize(text, voice, rate, pitch, volume)
         
         return Response(audio_bytes, mimetype='audio/mpeg', 
                        headers={'Content-Type': 'audio/mpeg'})
@@ -48,7 +35,7 @@ def get_voices():
             voices = await edge_tts.list_voices()
             return voices
         
-        voices = asyncio.run(list_voices())
+        voices = tts_worker.run(list_voices())
         return json.dumps(voices)
     except Exception as e:
         return json.dumps({'error': str(e)}), 400
@@ -2,12 +2,13 @@
 """
 Edge-TTS Server with HTTPS support for high-quality text-to-speech
 """
-import asyncio
-import edge_tts
-from flask import Flask, request, Response, jsonify
+from flask import Flask, request, Response, jsonify, stream_with_context
 from flask_cors import CORS
 import io
 import logging
+from tts_pipeline import pipelined_tts
+from tts_cache import tts_cache
+from tts_worker import tts_worker, TTSBusyError
 import ssl
 import os
 
@@ -73,30 +74,8 @@ def text_to_speech():
         
         logger.info(f"TTS request: voice={voice_name} ({voice_id}), text_length={len(text)}")
         
-        # Create async function for edge-tts
-        async def generate_speech():
-            # Create communication instance
-            communicate = edge_tts.Communicate(
-                text=text,
-                voice=voice_id,
-                rate=rate,
-                pitch=pitch,
-                volume=volume
-            )
-            
-            # Generate speech and collect audio data
-            audio_data = b""
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    audio_data += chunk["data"]
-            
-            return audio_data
-        
-        # Run async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        audio_data = loop.run_until_complete(generate_speech())
-        loop.close()
+        # Synthesized on the shared TTS worker loop (repeat phrases come from the cache)
+        audio_data = tts_worker.synthesize(text, voice_id, rate, pitch, volume)
         
         # Return audio as response
         return Response(
@@ -108,14 +87,51 @@ def text_to_speech():
             }
         )
         
+    except TTSBusyError as e:
+        logger.warning(f"TTS rejected: {str(e)}")
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         logger.error(f"TTS error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/tts/pipelined', methods=['GET', 'POST'])
+def text_to_speech_pipelined():
+    """Speak long text sentence by sentence, streaming each segment as soon as it is ready.
+
+    Accepts JSON (POST) or query parameters (GET), so an <audio> element can
+    point straight at it and start playing before the whole reply is synthesized.
+    """
+    data = request.get_json(silent=True) or request.args
+    text = data.get('text', '')
+    voice_name = data.get('voice', DEFAULT_VOICE).lower()
+    rate = data.get('rate', '+0%')
+    pitch = data.get('pitch', '+0Hz')
+    volume = data.get('volume', '+0%')
+    
+    if not text:
+        return jsonify({"error": "No text provided"}), 400
+    
+    voice_id = VOICES.get(voice_name, VOICES[DEFAULT_VOICE])
+    logger.info(f"TTS pipelined request: voice={voice_name} ({voice_id}), text_length={len(text)}")
+    
+    return Response(
+        stream_with_context(pipelined_tts.stream(text, voice_id, rate, pitch, volume)),
+        mimetype='audio/mpeg',
+        headers={
+            'Content-Disposition': 'inline; filename="speech.mp3"',
+            'Cache-Control': 'no-cache'
+        }
+    )
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "service": "edge-tts-server"})
+    return jsonify({
+        "status": "healthy",
+        "service": "edge-tts-server",
+        "tts_cache": tts_cache.get_stats(),
+        "tts_worker": tts_worker.get_stats()
+    })
 
 if __name__ == '__main__':
     print("Starting Edge-TTS HTTPS Server...")
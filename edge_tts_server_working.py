@@ -2,12 +2,12 @@
 """
 Edge-TTS Server with HTTPS support - Only working voices
 """
-import asyncio
-import edge_tts
 from flask import Flask, request, Response, jsonify
 from flask_cors import CORS
 import io
 import logging
+from tts_cache import tts_cache
+from tts_worker import tts_worker, TTSBusyError
 import ssl
 import os
 
@@ -69,49 +69,28 @@ def text_to_speech():
         
         logger.info(f"TTS request: voice={voice_name} ({voice_id}), text_length={len(text)}")
         
-        # Create async function for edge-tts
-        async def generate_speech():
+        def generate_speech():
+            # Synthesized on the shared TTS worker loop (repeat phrases come from the cache)
             try:
-                # Create communication instance
-                communicate = edge_tts.Communicate(
-                    text=text,
-                    voice=voice_id,
-                    rate=rate,
-                    pitch=pitch,
-                    volume=volume
-                )
-                
-                # Generate speech and collect audio data
-                audio_data = b""
-                async for chunk in communicate.stream():
-                    if chunk["type"] == "audio":
-                        audio_data += chunk["data"]
-                
+                audio_data = tts_worker.synthesize(text, voice_id, rate, pitch, volume)
                 if not audio_data:
                     logger.error(f"No audio data received for voice {voice_id}")
                     return None
-                    
                 return audio_data
-                
+            except TTSBusyError:
+                raise
             except Exception as e:
                 logger.error(f"Edge-TTS generation error: {str(e)}")
                 return None
         
-        # Run async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        audio_data = loop.run_until_complete(generate_speech())
-        loop.close()
+        audio_data = generate_speech()
         
         if not audio_data:
             # Fallback to a known working voice
             logger.warning(f"Voice {voice_name} failed, falling back to {DEFAULT_VOICE}")
             voice_id = VOICES[DEFAULT_VOICE]
             
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            audio_data = loop.run_until_complete(generate_speech())
-            loop.close()
+            audio_data = generate_speech()
             
             if not audio_data:
                 return jsonify({"error": "Failed to generate audio"}), 500
@@ -127,6 +106,9 @@ def text_to_speech():
             }
         )
         
+    except TTSBusyError as e:
+        logger.warning(f"TTS rejected: {str(e)}")
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         logger.error(f"TTS error: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -134,7 +116,12 @@ def text_to_speech():
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "service": "edge-tts-server"})
+    return jsonify({
+        "status": "healthy",
+        "service": "edge-tts-server",
+        "tts_cache": tts_cache.get_stats(),
+        "tts_worker": tts_worker.get_stats()
+    })
 
 if __name__ == '__main__':
     print("Starting Edge-TTS HTTPS Server (Working Voices Only)...")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Event bus - orchestrator events delivered in-process or across processes over Redis pub/sub
+"""
+import hashlib
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from voice_logging import get_logger
+
+log = get_logger('events')
+
+EVENTS_CHANNEL = 'orchestrator_events'  # Pub/sub channel prefix
+EVENTS_STREAM = 'orchestrator_events:log'  # Capped stream of recent events for late joiners
+
+# Scopes Redis traffic to one deployment, since tab ids ('tab_1') repeat
+# across apps. Defaults to one namespace per install directory, so the web
+# workers of one checkout share events and a second checkout does not see them.
+NAMESPACE = os.environ.get('VOICE_EVENT_NAMESPACE') or \
+    hashlib.blake2b(os.path.dirname(os.path.abspath(__file__)).encode(), digest_size=4).hexdigest()
+
+# Identifies the publishing process. Shard workers inherit their web process's
+# source, so a web worker can tell its own events from other web workers'.
+SOURCE = os.environ.get('VOICE_EVENT_SOURCE') or f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Subscription:
+    """
+    Events of the chosen types, either handed to a callback or queued.
+
+    Callbacks run on the thread delivering the event (the publisher for the
+    memory bus, the listener thread for Redis) and must return quickly.
+    Queued subscriptions keep at most maxsize events, dropping the oldest.
+    """
+
+    def __init__(self, bus: 'EventBus', types: Optional[Iterable[str]] = None,
+                 callback: Optional[Callable[[dict], None]] = None, maxsize: int = 1000):
+        self.bus = bus
+        self.types = frozenset(types) if types else None
+        self.callback = callback
+        self.queue: "queue.Queue[dict]" = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def wants(self, event: dict) -> bool:
+        return self.types is None or event.get('type') in self.types
+
+    def deliver(self, event: dict):
+        if self.callback is not None:
+            try:
+                self.callback(event)
+            except Exception as e:
+                log.error("Event callback for %s failed: %s", event.get('type'), e)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None after timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self) -> List[dict]:
+        """Every queued event, without blocking"""
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    Fans published events out to this process's subscriptions.
+
+    Events are dicts: {'type', 'timestamp', 'namespace', 'source', 'data'}. This base
+    class is the in-memory backend; RedisEventBus sends events through Redis
+    first, so every process's subscriptions see them.
+    """
+    backend = 'memory'
+
+    def __init__(self):
+        self.subscriptions: List[Subscription] = []
+        self.lock = threading.Lock()
+        self.stats = {'published': 0, 'delivered': 0, 'errors': 0}
+
+    def subscribe(self, callback: Optional[Callable[[dict], None]] = None,
+                  types: Optional[Iterable[str]] = None, maxsize: int = 1000) -> Subscription:
+        """Receive events of the given types (all if None) via callback, or queued on the subscription"""
+        subscription = Subscription(self, types, callback, maxsize)
+        with self.lock:
+            self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> dict:
+        event = {
+            'type': event_type,
+            'timestamp': datetime.now().isoformat(),
+            'namespace': NAMESPACE,
+            'source': SOURCE,
+            'data': data
+        }
+        self.stats['published'] += 1
+        self._send(event)
+        return event
+
+    def _send(self, event: dict):
+        self._dispatch(event)
+
+    def _dispatch(self, event: dict):
+        # The list is replaced, never mutated, so no lock is needed to walk it
+        for subscription in self.subscriptions:
+            if subscription.wants(event):
+                subscription.deliver(event)
+                self.stats['delivered'] += 1
+
+    def history(self, count: int = 100) -> List[dict]:
+        """Recent events, oldest first (none kept in memory)"""
+        return []
+
+    def close(self):
+        pass
+
+    def get_stats(self) -> dict:
+        return {'backend': self.backend, **self.stats, 'subscriptions': len(self.subscriptions)}
+
+
+MemoryEventBus = EventBus
+
+
+class RedisEventBus(EventBus):
+    """
+    Events shared by every process of one deployment connected to one Redis.
+
+    publish() appends the event to a capped stream (for history()) and
+    publishes it on the namespace's channel in one round trip. A listener thread
+    blocks on the pub/sub connection and dispatches each event to local
+    subscriptions, including this process's own events, so all processes
+    see the same order. Any redis-py compatible client works, so a local
+    stand-in can be passed for testing.
+    """
+    backend = 'redis'
+
+    def __init__(self, client, namespace: str = NAMESPACE, stream_maxlen: int = 10000):
+        super().__init__()
+        self.client = client
+        self.namespace = namespace
+        self.channel = f'{EVENTS_CHANNEL}:{namespace}'
+        self.stream = f'{EVENTS_STREAM}:{namespace}'
+        self.stream_maxlen = stream_maxlen
+        self.closed = threading.Event()
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(self.channel)
+        self.listener = threading.Thread(target=self._listen, name='event-bus', daemon=True)
+        self.listener.start()
+
+    def _send(self, event: dict):
+        payload = json.dumps(event)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.xadd(self.stream, {'event': payload}, maxlen=self.stream_maxlen, approximate=True)
+            pipe.publish(self.channel, payload)
+            pipe.execute()
+        except Exception as e:
+            # Local subscribers still hear it; other processes miss it
+            self.stats['errors'] += 1
+            log.warning("Publishing %s to Redis failed (%s); delivered locally only", event['type'], e)
+            self._dispatch(event)
+
+    def _listen(self):
+        while not self.closed.is_set():
+            try:
+                for message in self.pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    try:
+                        event = json.loads(message['data'])
+                    except (TypeError, ValueError):
+                        continue  # Not one of ours
+                    if event.get('namespace') == self.namespace:
+                        self._dispatch(event)
+            except Exception as e:
+                if self.closed.is_set():
+                    return
+                self.stats['errors'] += 1
+                log.warning("Event listener lost Redis (%s); retrying", e)
+                time.sleep(1.0)
+
+    def history(self, count: int = 100) -> List[dict]:
+        """The last count events from the stream, oldest first"""
+        try:
+            entries = self.client.xrevrange(self.stream, count=count)
+        except Exception as e:
+            log.warning("Reading event history failed: %s", e)
+            return []
+        events = []
+        for _, fields in reversed(entries):
+            payload = fields.get('event', fields.get(b'event'))
+            try:
+                events.append(json.loads(payload))
+            except (TypeError, ValueError):
+                continue
+        return events
+
+    def close(self):
+        self.closed.set()
+        try:
+            self.pubsub.close()
+        except Exception:
+            pass
+
+
+def event_bus_from_env() -> EventBus:
+    """The bus named by $VOICE_EVENT_BUS: a redis:// URL to share events across processes, else in-memory"""
+    url = os.environ.get('VOICE_EVENT_BUS', '')
+    if not url or url == 'memory':
+        return MemoryEventBus()
+    try:
+        import redis
+        client = redis.Redis.from_url(url, decode_responses=True, socket_connect_timeout=0.5)
+        client.ping()
+    except Exception as e:
+        log.warning("No Redis event bus at %s (%s); events stay in-process", url, e)
+        return MemoryEventBus()
+    log.info("Event bus on %s, namespace %s", url, NAMESPACE)
+    return RedisEventBus(client)
+
+
+# Shared by every orchestrator in the process
+event_bus = event_bus_from_env()
@@ -3,19 +3,38 @@
 Multi-Tab Claude Voice Assistant - Exact Replica
 Built from scratch based on precise UI specifications
 """
-from flask import Flask, render_template_string, request, jsonify, Response
+from flask import Flask, render_template_string, request, jsonify, Response, stream_with_context
 from flask_socketio import SocketIO, emit
 import ssl
 import os
 import threading
 import time
 import sys
-from orchestrator_simple_v2 import orchestrator
+from tts_pipeline import pipelined_tts
+from tts_worker import tts_worker, TTSBusyError
+from command_jobs import CommandJobTracker, QueueFullError
+from stats_broadcaster import StatsBroadcaster
+from event_bus import SOURCE as EVENT_SOURCE, event_bus
+from voice_logging import setup_logging, get_logger, HOT_PATH_DEBUG
 
 # Force unbuffered output
 sys.stdout = sys.__stdout__
 sys.stderr = sys.__stderr__
 
+setup_logging()
+send_log = get_logger('send')
+capture_log = get_logger('capture')
+session_log = get_logger('session')
+tts_log = get_logger('tts')
+
+# VOICE_ORCHESTRATOR_SHARDS=N spreads tabs over N worker processes; 0 keeps them in this one
+ORCHESTRATOR_SHARDS = int(os.environ.get('VOICE_ORCHESTRATOR_SHARDS') or 0)
+if ORCHESTRATOR_SHARDS > 0:
+    from sharded_orchestrator import ShardedOrchestrator
+    orchestrator = ShardedOrchestrator(workers=ORCHESTRATOR_SHARDS)
+else:
+    from orchestrator_simple_v2 import orchestrator
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'exact-replica-secret-key'
 socketio = SocketIO(app, cors_allowed_origins="*")
@@ -156,9 +175,10 @@ HTML_TEMPLATE = '''
             font-size: 14px;
         }
         
-        /* Add Tab Button (Hidden by default) */
+        /* Add Tab Button */
         .add-tab {
-            display: none;
+            display: flex;
+            cursor: pointer;
             position: static;
             flex-direction: row;
             justify-content: center;
@@ -175,6 +195,11 @@ HTML_TEMPLATE = '''
             cursor: pointer;
         }
         
+        .add-tab.disabled {
+            opacity: 0.4;
+            cursor: not-allowed;
+        }
+        
         /* Debug Box */
         #debugBox {
             display: block;
@@ -1196,7 +1221,7 @@ HTML_TEMPLATE = '''
             </div>
             
             <!-- Tab Count -->
-            <div id="tabCount" class="tab-count">Tabs: 4/4</div>
+            <div id="tabCount" class="tab-count">Tabs: 4</div>
             
             <!-- Title -->
             <h1>Claude Voice Assistant</h1>
@@ -1269,7 +1294,7 @@ HTML_TEMPLATE = '''
             
             <!-- Info -->
             <div class="info">
-                Multi-tab support • Up to 4 simultaneous sessions • Real-time voice interaction
+                Multi-tab support • Simultaneous sessions • Real-time voice interaction
             </div>
             
             <!-- Unnamed div (spacer) -->
@@ -1280,12 +1305,12 @@ HTML_TEMPLATE = '''
     <!-- New Tab Modal -->
     <div id="newTabModal" class="modal">
         <div class="modal-content">
-            <button class="modal-close">×</button>
+            <button class="modal-close" onclick="closeNewTabModal()">×</button>
             <h3>Create New Tab</h3>
             <input type="text" id="projectName" placeholder="Enter project name...">
             <div class="modal-buttons">
-                <button class="cancel">Cancel</button>
-                <button>Create</button>
+                <button class="cancel" onclick="closeNewTabModal()">Cancel</button>
+                <button onclick="createTabFromModal()">Create</button>
             </div>
         </div>
     </div>
@@ -1352,9 +1377,111 @@ HTML_TEMPLATE = '''
             'tab_4': []
         };
         
-        // Tab Management
-        const tabs = document.querySelectorAll('.tab');
-        tabs.forEach(tab => {
+        // Tab Management - tab ids are whatever tabs the bar holds (tab_1, tab_2, ... tab_N)
+        function tabIdList() {
+            return Array.from(document.querySelectorAll('#tabBar .tab')).map(tab => tab.id);
+        }
+        
+        // Sessions the server will hold at once (0 if it has not said)
+        const MAX_TABS = {{ max_sessions }};
+        
+        function updateTabCount() {
+            const count = tabIdList().length;
+            document.getElementById('tabCount').textContent = MAX_TABS ? `Tabs: ${count}/${MAX_TABS}` : `Tabs: ${count}`;
+            document.getElementById('debugTabCount').textContent = count;
+            const full = MAX_TABS > 0 && count >= MAX_TABS;
+            const addButton = document.querySelector('#tabBar .add-tab');
+            addButton.classList.toggle('disabled', full);
+            addButton.title = full ? `At most ${MAX_TABS} tabs can be open` : 'New tab';
+        }
+        
+        function createServerSession(tabId, projectName) {
+            return fetch('/create_session', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    tab_id: tabId,
+                    project_name: projectName
+                })
+            })
+            .then(response => response.json())
+            .then(result => {
+                if (!result.success) {
+                    addTabNotice(tabId, `⚠️ No Claude session for this tab: ${result.error}`);
+                }
+                return result;
+            })
+            .catch(error => {
+                addTabNotice(tabId, `⚠️ No Claude session for this tab: ${error}`);
+            });
+        }
+        
+        // Add a tab to the bar; its server session is created now, or on first message if createSession is false
+        function addTab(name = null, tabId = null, createSession = true) {
+            if (!tabId) {
+                const numbers = tabIdList().map(id => parseInt(id.split('_')[1], 10) || 0);
+                tabId = `tab_${Math.max(0, ...numbers) + 1}`;
+            }
+            if (document.getElementById(tabId)) return tabId;
+            name = name || `Tab ${tabId.split('_')[1]}`;
+            
+            const tab = document.createElement('div');
+            tab.className = 'tab';
+            tab.id = tabId;
+            const span = document.createElement('span');
+            span.className = 'tab-name';
+            span.textContent = name;
+            const input = document.createElement('input');
+            input.type = 'text';
+            input.className = 'tab-rename-input';
+            input.value = name;
+            tab.appendChild(span);
+            tab.appendChild(input);
+            document.getElementById('tabBar').insertBefore(tab, document.querySelector('#tabBar .add-tab'));
+            bindTab(tab);
+            
+            tabConversations[tabId] = tabConversations[tabId] || [];
+            terminalContents[tabId] = terminalContents[tabId] || '';
+            updateTabCount();
+            if (createSession) {
+                createServerSession(tabId, name);
+            }
+            return tabId;
+        }
+        
+        function openNewTabModal() {
+            if (MAX_TABS > 0 && tabIdList().length >= MAX_TABS) {
+                addTabNotice(activeTabId, `⚠️ At most ${MAX_TABS} tabs can be open`);
+                return;
+            }
+            const input = document.getElementById('projectName');
+            input.value = '';
+            document.getElementById('newTabModal').style.display = 'flex';
+            input.focus();
+        }
+        
+        function closeNewTabModal() {
+            document.getElementById('newTabModal').style.display = 'none';
+        }
+        
+        function createTabFromModal() {
+            const tabId = addTab(document.getElementById('projectName').value.trim());
+            closeNewTabModal();
+            switchTab(tabId);
+            saveAllSessions();
+        }
+        
+        document.querySelector('#tabBar .add-tab').addEventListener('click', openNewTabModal);
+        document.getElementById('projectName').addEventListener('keypress', (e) => {
+            if (e.key === 'Enter') {
+                e.preventDefault();
+                createTabFromModal();
+            }
+        });
+        
+        function bindTab(tab) {
             // Click to switch tabs
             tab.addEventListener('click', function() {
                 switchTab(this.id);
@@ -1401,7 +1528,8 @@ HTML_TEMPLATE = '''
                     }
                 });
             });
-        });
+        }
+        document.querySelectorAll('#tabBar .tab').forEach(bindTab);
         
         function switchTab(tabId) {
             // If recording is active and we have a transcript, send it to the recording tab
@@ -1414,7 +1542,7 @@ HTML_TEMPLATE = '''
             }
             
             // Remove active class from all tabs
-            tabs.forEach(t => t.classList.remove('active'));
+            document.querySelectorAll('#tabBar .tab').forEach(t => t.classList.remove('active'));
             // Add active class to clicked tab
             const activeTab = document.getElementById(tabId);
             activeTab.classList.add('active');
@@ -1433,6 +1561,7 @@ HTML_TEMPLATE = '''
             
             // Emit tab switch event
             socket.emit('switch_tab', { tab_id: activeTabId });
+            socket.emit('subscribe_stats', { tab_ids: [activeTabId] });
         }
         
         // Initialize speech recognition
@@ -1527,6 +1656,7 @@ HTML_TEMPLATE = '''
             button.textContent = isMuted ? '🔇' : '🔊';
             // Update button appearance if needed
             if (isMuted) {
+                stopSpeech();
                 button.style.backgroundColor = 'rgba(255, 0, 0, 0.2)';
             } else {
                 button.style.backgroundColor = 'rgb(17, 17, 17)';
@@ -1608,7 +1738,29 @@ HTML_TEMPLATE = '''
                     command: text,
                     tab_id: tabId.replace('-', '_')  // Ensure underscore format
                 })
+            })
+            .then(response => response.json())
+            .then(data => {
+                // Accepted commands run in the background; progress arrives as job_update events
+                if (!data.success) {
+                    addTabNotice(tabId, `⚠️ ${data.error || 'Command was not accepted'}`);
+                }
+            })
+            .catch(error => console.error('Send error:', error));
+        }
+        
+        // Show a bot-side notice in a tab's conversation
+        function addTabNotice(tabId, text) {
+            const conversation = tabConversations[tabId] || tabConversations[tabId.replace('-', '_')];
+            if (!conversation) return;
+            conversation.push({
+                type: 'bot',
+                text: text,
+                timestamp: new Date().toLocaleTimeString()
             });
+            if (tabId.replace('-', '_') === activeTabId.replace('-', '_')) {
+                displayConversation();
+            }
         }
         
         // Add message to conversation log
@@ -1645,6 +1797,21 @@ HTML_TEMPLATE = '''
                 log.appendChild(message);
             });
             
+            // Response still streaming in for this tab
+            const live = streamingResponses[activeTabId.replace('-', '_')];
+            if (live && live.text) {
+                const message = document.createElement('div');
+                message.className = 'message bot-message streaming';
+                
+                const timestamp = document.createElement('span');
+                timestamp.className = 'timestamp';
+                timestamp.textContent = live.timestamp;
+                
+                message.appendChild(timestamp);
+                message.appendChild(document.createTextNode('🤖 ' + live.text));
+                log.appendChild(message);
+            }
+            
             log.scrollTop = log.scrollHeight;
         }
         
@@ -1652,6 +1819,8 @@ HTML_TEMPLATE = '''
         socket.on('connect', () => {
             document.getElementById('connectionDot').classList.add('connected');
             document.getElementById('connectionStatus').textContent = 'Connected';
+            // Only the visible tab's stats are displayed
+            socket.emit('subscribe_stats', { tab_ids: [activeTabId] });
         });
         
         socket.on('disconnect', () => {
@@ -1659,12 +1828,102 @@ HTML_TEMPLATE = '''
             document.getElementById('connectionStatus').textContent = 'Disconnected';
         });
         
+        // Partial responses per tab: {text, spokenUpTo, timestamp}
+        const streamingResponses = {};
+        
+        // Sentence end: punctuation followed by whitespace, or a newline
+        const SENTENCE_END = /[.!?](?=\\s)|\\n/g;
+        
+        // Speak any complete sentences of a streaming response not yet spoken
+        function speakCompletedSentences(tabId, final) {
+            const live = streamingResponses[tabId];
+            if (!live) return;
+            
+            let end = live.spokenUpTo;
+            if (final) {
+                end = live.text.length;
+            } else {
+                SENTENCE_END.lastIndex = live.spokenUpTo;
+                let match;
+                while ((match = SENTENCE_END.exec(live.text)) !== null) {
+                    end = match.index + 1;
+                }
+            }
+            
+            const sentence = live.text.slice(live.spokenUpTo, end).trim();
+            live.spokenUpTo = end;
+            if (sentence) {
+                enqueueSpeech(sentence);
+            }
+        }
+        
+        socket.on('response_chunk', (data) => {
+            const tabId = data.tab_id.replace('-', '_');
+            let live = streamingResponses[tabId];
+            if (!live) {
+                live = streamingResponses[tabId] = {
+                    text: '',
+                    spokenUpTo: 0,
+                    timestamp: new Date().toLocaleTimeString()
+                };
+                // New reply on the active tab interrupts whatever is still playing
+                if (tabId === activeTabId.replace('-', '_')) {
+                    stopSpeech();
+                }
+            }
+            live.text += data.text;
+            
+            if (tabId === activeTabId.replace('-', '_')) {
+                displayConversation();
+                speakCompletedSentences(tabId, false);
+            }
+        });
+        
+        socket.on('job_update', (data) => {
+            console.log('[SOCKET] Job update:', data.job_id, data.status);
+            if (data.status === 'error') {
+                addTabNotice(data.tab_id, `⚠️ Command failed: ${data.error}`);
+            } else if (data.status === 'cancelled') {
+                addTabNotice(data.tab_id, '⏹️ Command cancelled');
+            }
+        });
+        
+        socket.on('response_reset', (data) => {
+            // The reply is being retried: drop the partial text and stop reading it out
+            const tabId = data.tab_id.replace('-', '_');
+            if (streamingResponses[tabId]) {
+                delete streamingResponses[tabId];
+                if (tabId === activeTabId.replace('-', '_')) {
+                    stopSpeech();
+                    displayConversation();
+                }
+            }
+        });
+        
+        socket.on('response_done', (data) => {
+            // Covers requests that ended without a final response
+            const tabId = data.tab_id.replace('-', '_');
+            if (streamingResponses[tabId]) {
+                delete streamingResponses[tabId];
+                if (tabId === activeTabId.replace('-', '_')) {
+                    displayConversation();
+                }
+            }
+        });
+        
         socket.on('response', (data) => {
             console.log('[SOCKET] Received response:', data);
             // Fix tab_id comparison - ensure both use underscores
             const normalizedTabId = data.tab_id.replace('-', '_');
             const normalizedActiveTab = activeTabId.replace('-', '_');
             
+            // The final text replaces the live bubble built from chunks
+            const streamed = streamingResponses[normalizedTabId];
+            if (streamed && normalizedTabId === normalizedActiveTab) {
+                speakCompletedSentences(normalizedTabId, true);
+            }
+            delete streamingResponses[normalizedTabId];
+            
             if (data.text) {
                 // Store message in the appropriate tab's conversation
                 const targetTabId = normalizedTabId.replace('_', '_'); // Already normalized
@@ -1684,8 +1943,10 @@ HTML_TEMPLATE = '''
                 // If this is the active tab, update display and speak
                 if (normalizedTabId === normalizedActiveTab) {
                     displayConversation();
-                    // Speak the response using TTS
-                    speakText(data.text);
+                    // Speak the response using TTS (streamed replies were spoken as they arrived)
+                    if (!streamed) {
+                        speakText(data.text);
+                    }
                 } else {
                     // Visual indicator for unread messages on other tabs
                     const tab = document.getElementById(targetTabId);
@@ -1731,9 +1992,10 @@ HTML_TEMPLATE = '''
             }
         }
         
-        socket.on('realtime_stats', (data) => {
-            console.log('Received realtime_stats:', data);
-            if (data.tab_id === activeTabId) {
+        socket.on('realtime_stats', (batch) => {
+            // Batched per-tab stats; tabs without changes are left out
+            const data = batch.tabs[activeTabId];
+            if (data) {
                 // Update time with proper formatting
                 const timeElement = document.getElementById('realtimeTime');
                 if (timeElement && data.duration !== undefined) {
@@ -1806,23 +2068,13 @@ HTML_TEMPLATE = '''
                 radio.addEventListener('change', updateSettingsVisibility);
             });
             
+            updateTabCount();
+            
             // Only create new sessions if we're not loading saved data
             if (!hasSavedData) {
                 // Create sessions for all tabs
-                const tabNames = ['Tab 1', 'Tab 2', 'Tab 3', 'Tab 4'];
-                const tabIds = ['tab_1', 'tab_2', 'tab_3', 'tab_4'];
-                
-                tabIds.forEach((tabId, index) => {
-                    fetch('/create_session', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify({
-                            tab_id: tabId,
-                            project_name: tabNames[index]
-                        })
-                    });
+                tabIdList().forEach(tabId => {
+                    createServerSession(tabId, document.getElementById(tabId).querySelector('.tab-name').textContent);
                 });
             }
         });
@@ -1896,62 +2148,136 @@ HTML_TEMPLATE = '''
             }
         }
         
-        // Speak text using TTS
-        async function speakText(text) {
+        function ttsServerUrl(path) {
+            const protocol = window.location.protocol;
+            return protocol === 'https:' 
+                ? 'https://192.168.40.232:5001' + path
+                : 'http://192.168.40.232:5001' + path;
+        }
+        
+        // URL of the sentence-pipelined stream for text - an <audio> element
+        // starts playing it as soon as the first sentence is synthesized
+        function pipelinedTtsUrl(text) {
+            const params = new URLSearchParams({
+                text: text,
+                voice: document.getElementById('voiceSelect').value
+            });
+            return ttsServerUrl('/tts/pipelined') + '?' + params.toString();
+        }
+        
+        // Fetch TTS audio for text; resolves to a blob URL, or null if the server failed
+        async function fetchTtsAudio(text) {
+            const voice = document.getElementById('voiceSelect').value;
+            const ttsUrl = ttsServerUrl('/tts');
+            
+            const response = await fetch(ttsUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    text: text,
+                    voice: voice,
+                    rate: '+0%',
+                    pitch: '+0Hz',
+                    volume: '+0%'
+                })
+            });
+            
+            if (!response.ok) return null;
+            const blob = await response.blob();
+            return URL.createObjectURL(blob);
+        }
+        
+        // Sentences waiting to be played, in order: {text, audio: Promise<url>}
+        let speechQueue = [];
+        let speechPlaying = false;
+        
+        // Queue text to be spoken after anything already queued. Audio is
+        // requested immediately so it is ready by the time its turn comes;
+        // pipelined items stream from the server instead of being prefetched.
+        function enqueueSpeech(text, pipelined = false) {
             if (isMuted || !text) return;
+            speechQueue.push({
+                text: text,
+                audio: pipelined
+                    ? Promise.resolve(pipelinedTtsUrl(text))
+                    : fetchTtsAudio(text).catch(error => {
+                        console.error('TTS error:', error);
+                        return null;
+                    })
+            });
+            if (!speechPlaying) {
+                playNextSpeech();
+            }
+        }
+        
+        async function playNextSpeech() {
+            const item = speechQueue.shift();
+            if (!item) {
+                speechPlaying = false;
+                return;
+            }
+            speechPlaying = true;
             
-            // Cancel any ongoing audio
-            if (currentAudio) {
-                currentAudio.pause();
-                currentAudio = null;
+            const audioUrl = await item.audio;
+            if (!speechPlaying) {
+                // Stopped while waiting for audio
+                if (audioUrl) URL.revokeObjectURL(audioUrl);
+                return;
             }
             
-            try {
-                const voice = document.getElementById('voiceSelect').value;
-                const protocol = window.location.protocol;
-                const ttsUrl = protocol === 'https:' 
-                    ? 'https://192.168.40.232:5001/tts'
-                    : 'http://192.168.40.232:5001/tts';
-                
-                const response = await fetch(ttsUrl, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        text: text,
-                        voice: voice,
-                        rate: '+0%',
-                        pitch: '+0Hz',
-                        volume: '+0%'
-                    })
-                });
-                
-                if (response.ok) {
-                    const blob = await response.blob();
-                    const audioUrl = URL.createObjectURL(blob);
-                    currentAudio = new Audio(audioUrl);
-                    currentAudio.play();
-                    
-                    // Clean up blob URL after playback
-                    currentAudio.addEventListener('ended', () => {
-                        URL.revokeObjectURL(audioUrl);
-                        currentAudio = null;
-                    });
-                }
-            } catch (error) {
-                console.error('TTS error:', error);
+            if (!audioUrl) {
                 // Fallback to browser speech synthesis
                 if ('speechSynthesis' in window) {
-                    const utterance = new SpeechSynthesisUtterance(text);
+                    const utterance = new SpeechSynthesisUtterance(item.text);
+                    utterance.onend = () => playNextSpeech();
                     speechSynthesis.speak(utterance);
+                } else {
+                    playNextSpeech();
                 }
+                return;
             }
+            
+            currentAudio = new Audio(audioUrl);
+            // Clean up blob URL after playback and move on to the next sentence
+            currentAudio.addEventListener('ended', () => {
+                URL.revokeObjectURL(audioUrl);
+                currentAudio = null;
+                playNextSpeech();
+            });
+            currentAudio.addEventListener('error', () => {
+                console.error('TTS playback error for:', item.text);
+                currentAudio = null;
+                playNextSpeech();
+            });
+            currentAudio.play();
+        }
+        
+        // Stop current playback and drop anything queued
+        function stopSpeech() {
+            speechQueue.forEach(item => item.audio.then(url => url && URL.revokeObjectURL(url)));
+            speechQueue = [];
+            speechPlaying = false;
+            if (currentAudio) {
+                currentAudio.pause();
+                currentAudio = null;
+            }
+        }
+        
+        // Speak text using TTS, interrupting anything already playing.
+        // Multi-sentence text uses the pipelined stream so playback starts
+        // after the first sentence rather than the whole reply.
+        function speakText(text) {
+            if (isMuted || !text) return;
+            stopSpeech();
+            enqueueSpeech(text, /[.!?]\\s+\\S/.test(text));
         }
         
         // Test function for debug box
         function testAddTab() {
             console.log('Test Add Tab clicked');
+            addTab();
         }
         
         // Settings functions
@@ -2052,7 +2378,7 @@ HTML_TEMPLATE = '''
             };
             
             // Get tab names
-            ['tab_1', 'tab_2', 'tab_3', 'tab_4'].forEach(tabId => {
+            tabIdList().forEach(tabId => {
                 const tab = document.getElementById(tabId);
                 if (tab) {
                     sessionData.tabNames[tabId] = tab.querySelector('.tab-name').textContent;
@@ -2095,11 +2421,13 @@ HTML_TEMPLATE = '''
                             // Restore conversations
                             Object.assign(tabConversations, data.conversations);
                             
-                            // Restore tab names
+                            // Restore tab names, re-adding tabs beyond the default four
                             Object.entries(data.tabNames || {}).forEach(([tabId, name]) => {
                                 const tab = document.getElementById(tabId);
                                 if (tab) {
                                     tab.querySelector('.tab-name').textContent = name;
+                                } else {
+                                    addTab(name, tabId, false);
                                 }
                             });
                             
@@ -2142,145 +2470,101 @@ HTML_TEMPLATE = '''
 
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    return render_template_string(HTML_TEMPLATE, max_sessions=orchestrator.max_sessions)
 
 # Global state
 response_queues = {}  # tab_id -> queue
 capture_threads = {}  # tab_id -> thread
-stats_threads = {}  # tab_id -> thread
+
+def chunk_forwarder(tab_id):
+    """Callback that streams partial output to the browser as Claude writes it"""
+    def forward_chunk(text):
+        if HOT_PATH_DEBUG:
+            send_log.debug("Chunk for tab %s: %d chars", tab_id, len(text))
+        socketio.emit('response_chunk', {
+            'tab_id': tab_id,
+            'text': text
+        })
+    return forward_chunk
+
+def reset_forwarder(tab_id):
+    """Callback that tells the browser to drop a streamed reply that is being retried"""
+    def forward_reset():
+        socketio.emit('response_reset', {'tab_id': tab_id})
+    return forward_reset
+
+def run_command(tab_id, command):
+    """Run one command to completion (on the tab's job thread, not a request thread)"""
+    session_id = orchestrator.route_message(tab_id, command, on_chunk=chunk_forwarder(tab_id),
+                                            on_reset=reset_forwarder(tab_id))
+    send_log.info("Message sent to session %s", session_id)
+    return session_id
+
+def emit_job_update(job):
+    """Tell the browser when a command job is queued, starts or finishes"""
+    socketio.emit('job_update', job.to_dict())
+
+command_jobs = CommandJobTracker(run_command, on_update=emit_job_update)
 
 def capture_responses(session_id, tab_id):
-    """Capture responses from Claude for a specific session"""
-    print(f"[CAPTURE] Started capture thread for tab {tab_id}, session {session_id}")
-    last_content = ""
-    last_seen_lines = set()
-    processed_responses = set()
+    """Forward completed responses from the orchestrator to the browser.
     
-    while True:
-        if tab_id not in capture_threads:
-            print(f"[CAPTURE] Stopping capture thread for tab {tab_id}")
-            break
-            
-        try:
-            content = orchestrator.capture_response(session_id)
-            
-            if content:
-                print(f"[CAPTURE DEBUG] Got content for tab {tab_id}: {content[:100]}", flush=True)
-            
-            if content and content != last_content:
-                # Debug: Show first 200 chars of new content
-                if len(content) > len(last_content) + 10:
-                    print(f"[CAPTURE] New content for tab {tab_id}: {content[-200:]}")
-                    
-                lines = content.split('\n')
-                
-                # Look for complete multi-line responses
-                response_started = False
-                full_response_lines = []
-                
-                for i, line in enumerate(lines):
-                    line_hash = hash(line)
-                    cleaned_line = line.strip()
-                    
-                    # Check if this is the start of a Claude response
-                    if cleaned_line.startswith('●'):
-                        # If we already had a response building, emit it first
-                        if response_started and full_response_lines:
-                            full_response = '\n'.join(full_response_lines)
-                            response_hash = hash(full_response)
-                            if response_hash not in processed_responses:
-                                processed_responses.add(response_hash)
-                                print(f"[CAPTURE] Emitting complete response for tab {tab_id}: {len(full_response)} chars", flush=True)
-                                print(f"[CAPTURE] Response text: '{full_response}'", flush=True)
-                                socketio.emit('response', {
-                                    'tab_id': tab_id,
-                                    'text': full_response
-                                })
-                        
-                        # Start new response
-                        response_started = True
-                        full_response_lines = [cleaned_line[1:].strip()]
-                        print(f"[CAPTURE] Found ● response start for tab {tab_id}")
-                        
-                    elif response_started and cleaned_line:
-                        # This line is part of the ongoing response
-                        # Stop collecting if we hit another marker
-                        if cleaned_line.startswith('User:') or cleaned_line.startswith('Human:'):
-                            # Emit the collected response
-                            if full_response_lines:
-                                full_response = '\n'.join(full_response_lines)
-                                response_hash = hash(full_response)
-                                if response_hash not in processed_responses:
-                                    processed_responses.add(response_hash)
-                                    print(f"[CAPTURE] Emitting complete response for tab {tab_id}: {len(full_response)} chars")
-                                    socketio.emit('response', {
-                                        'tab_id': tab_id,
-                                        'text': full_response
-                                    })
-                            response_started = False
-                            full_response_lines = []
-                        else:
-                            # Add this line to the response
-                            full_response_lines.append(cleaned_line)
-                    
-                    # Mark line as seen
-                    if line_hash not in last_seen_lines:
-                        last_seen_lines.add(line_hash)
-                
-                # Emit any remaining response
-                if response_started and full_response_lines:
-                    full_response = '\n'.join(full_response_lines)
-                    response_hash = hash(full_response)
-                    if response_hash not in processed_responses:
-                        processed_responses.add(response_hash)
-                        print(f"[CAPTURE] Emitting complete response for tab {tab_id}: {len(full_response)} chars")
-                        socketio.emit('response', {
-                            'tab_id': tab_id,
-                            'text': full_response
-                        })
-                
-                last_content = content
-                
-        except Exception as e:
-            print(f"[CAPTURE] Error for tab {tab_id}: {e}")
-            
-        time.sleep(0.5)
-
-def emit_realtime_stats(tab_id):
-    """Emit real-time stats for a tab"""
-    print(f"[STATS] Started stats thread for tab {tab_id}")
-    last_emit_time = 0
+    Blocks on the tab's response channel instead of polling, so a reply is
+    emitted as soon as route_message stores it and idle tabs cost nothing.
+    """
+    capture_log.info("Started capture thread for tab %s, session %s", tab_id, session_id)
     
-    while tab_id in stats_threads:
+    while tab_id in capture_threads:
         try:
-            current_time = time.time()
+            response = orchestrator.wait_for_response(tab_id)
+            
+            if response is None:
+                # Channel closed - the session for this tab was cleaned up
+                break
+            
+            full_response = response.strip()
+            if full_response:
+                if HOT_PATH_DEBUG:
+                    capture_log.debug("Emitting complete response for tab %s: %d chars", tab_id, len(full_response))
+                socketio.emit('response', {
+                    'tab_id': tab_id,
+                    'text': full_response
+                })
             
-            # Emit stats every 0.5 seconds
-            if current_time - last_emit_time >= 0.5:
-                session_info = orchestrator.get_session_info(tab_id)
-                
-                if session_info:
-                    # Use is_processing from orchestrator
-                    is_processing = session_info.get('is_processing', False)
-                    
-                    # Emit stats - now using per-request metrics
-                    stats_data = {
-                        'tab_id': tab_id,
-                        'duration': session_info.get('duration', 0),  # Changed from session_duration
-                        'tokens': session_info.get('tokens', 0),      # Changed from total_tokens
-                        'is_processing': is_processing
-                    }
-                    print(f"[STATS] Emitting for {tab_id}: duration={stats_data['duration']:.1f}s, tokens={stats_data['tokens']}, processing={is_processing}", flush=True)
-                    socketio.emit('realtime_stats', stats_data)
-                    
-                last_emit_time = current_time
+            # Emitted from this thread so it always follows the final response
+            socketio.emit('response_done', {'tab_id': tab_id})
                 
         except Exception as e:
-            print(f"[STATS] Error emitting stats for tab {tab_id}: {e}")
-            
-        time.sleep(0.5)
+            capture_log.error("Error for tab %s: %s", tab_id, e)
+            time.sleep(0.5)
     
-    print(f"[STATS] Stopped stats thread for tab {tab_id}")
+    # Allow a fresh thread to be started if the tab gets a new session
+    capture_threads.pop(tab_id, None)
+    command_jobs.close_tab(tab_id)
+    capture_log.info("Stopping capture thread for tab %s", tab_id)
+
+def relay_remote_response(event):
+    """Forward responses finished by this deployment's other web workers (over a Redis event bus) to our clients"""
+    if event.get('source') == EVENT_SOURCE:
+        return  # Our own capture threads already emitted it
+    data = event.get('data') or {}
+    tab_id = data.get('tab_id')
+    if data.get('text', '').strip():
+        socketio.emit('response', {'tab_id': tab_id, 'text': data['text'].strip()})
+    socketio.emit('response_done', {'tab_id': tab_id})
+
+if event_bus.backend == 'redis':  # Only when VOICE_EVENT_BUS opts this deployment into sharing
+    event_bus.subscribe(relay_remote_response, types=('response',))
+
+def read_tab_stats():
+    """Current request stats for every open tab"""
+    return {info['tab_id']: info for info in orchestrator.list_active_sessions() if info}
+
+def emit_stats(payload, sid):
+    socketio.emit('realtime_stats', payload, to=sid)
+
+# One thread serves realtime stats for all tabs and clients
+stats_broadcaster = StatsBroadcaster(read_tab_stats, emit_stats)
 
 @app.route('/create_session', methods=['POST'])
 def create_session():
@@ -2289,12 +2573,12 @@ def create_session():
         tab_id = data.get('tab_id')
         project_name = data.get('project_name', 'Claude Session')
         
-        print(f"[CREATE_SESSION] Creating session for tab {tab_id}, project: {project_name}")
+        session_log.info("Creating session for tab %s, project: %s", tab_id, project_name)
         
         # Create session in orchestrator
         bot_session = orchestrator.create_session(tab_id, project_name)
         session_id = bot_session.session_id if hasattr(bot_session, 'session_id') else str(bot_session)
-        print(f"[CREATE_SESSION] Session created: {session_id}")
+        session_log.info("Session created: %s", session_id)
         
         # Start response capture thread if not already running
         if tab_id not in capture_threads:
@@ -2305,25 +2589,14 @@ def create_session():
             )
             capture_threads[tab_id] = thread  # Add to dict BEFORE starting
             thread.start()
-            print(f"[CREATE] Started capture thread for tab {tab_id}, session {session_id}")
-        
-        # Start stats thread if not already running
-        if tab_id not in stats_threads:
-            stats_thread = threading.Thread(
-                target=emit_realtime_stats,
-                args=(tab_id,),
-                daemon=True
-            )
-            stats_threads[tab_id] = stats_thread  # Add to dict BEFORE starting
-            stats_thread.start()
-            print(f"[CREATE] Started stats thread for tab {tab_id}")
+            capture_log.info("Started capture thread for tab %s, session %s", tab_id, session_id)
         
         return jsonify({
             'success': True,
             'session_id': session_id
         })
     except Exception as e:
-        print(f"[CREATE_SESSION] Error: {e}")
+        session_log.error("Error creating session: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -2331,23 +2604,22 @@ def create_session():
 
 @app.route('/send_command', methods=['POST'])
 def send_command():
-    print("[SEND] Received send_command request")
     try:
         data = request.json
-        print(f"[SEND] Request data: {data}")
+        send_log.debug("Request data: %s", data)
         tab_id = data.get('tab_id')
         command = data.get('command')
         
-        print(f"[SEND] Sending '{command}' to tab {tab_id}")
+        send_log.info("Sending %d chars to tab %s", len(command or ''), tab_id)
         
         # Check if we need to start threads for this tab
         session = orchestrator.get_session_info(tab_id)
         if not session:
-            print(f"[SEND] No session for tab {tab_id}, creating one")
+            send_log.info("No session for tab %s, creating one", tab_id)
             # Create session if it doesn't exist
             bot_session = orchestrator.create_session(tab_id, f"Tab {tab_id}")
             session_id = bot_session.session_id
-            print(f"[SEND] Created session: {session_id}")
+            send_log.info("Created session: %s", session_id)
             
             # Start capture thread for new session
             if tab_id not in capture_threads:
@@ -2358,39 +2630,68 @@ def send_command():
                 )
                 capture_threads[tab_id] = thread  # Add to dict BEFORE starting
                 thread.start()
-                print(f"[SEND] Started capture thread for tab {tab_id}")
-            
-            # Start stats thread for new session
-            if tab_id not in stats_threads:
-                stats_thread = threading.Thread(
-                    target=emit_realtime_stats,
-                    args=(tab_id,),
-                    daemon=True
-                )
-                stats_threads[tab_id] = stats_thread  # Add to dict BEFORE starting
-                stats_thread.start()
-                print(f"[SEND] Started stats thread for tab {tab_id}")
+                capture_log.info("Started capture thread for tab %s", tab_id)
+        
+        # The job slot is taken first, so a full queue never leaves a turn without a job
+        job = command_jobs.reserve(tab_id, command)
         
-        # Route message through orchestrator
-        session_id = orchestrator.route_message(tab_id, command)
-        print(f"[SEND] Message sent to session {session_id}")
+        # Queue the turn now so quick follow-ups merge into it (or preempt it);
+        # the job just follows it to completion - the request returns immediately
+        try:
+            turn = orchestrator.submit_message(tab_id, command, on_chunk=chunk_forwarder(tab_id),
+                                               preempt=bool(data.get('preempt')), on_reset=reset_forwarder(tab_id))
+        except Exception:
+            command_jobs.release(job)
+            raise
+        command_jobs.start(job, run=lambda: orchestrator.wait_for_turn(turn))
+        bot_session = orchestrator.sessions.get(tab_id)
         
         return jsonify({
             'success': True,
-            'session_id': session_id
-        })
+            'job_id': job.job_id,
+            'status': job.status,
+            'session_id': bot_session.session_id if bot_session else None
+        }), 202
+    except QueueFullError as e:
+        send_log.warning("%s", e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429
     except Exception as e:
-        print(f"[SEND] Error: {e}")
+        send_log.error("Error: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/cancel_command', methods=['POST'])
+def cancel_command():
+    """Cancel a tab's running command (killing its Claude process) and anything queued behind it"""
+    data = request.json or {}
+    tab_id = data.get('tab_id')
+    if not tab_id:
+        return jsonify({'success': False, 'error': 'tab_id is required'}), 400
+    
+    cancelled = orchestrator.cancel(tab_id, include_queued=data.get('include_queued', True))
+    send_log.info("Cancelled %d command(s) for tab %s", cancelled, tab_id)
+    return jsonify({'success': True, 'cancelled': cancelled})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a command submitted through /send_command"""
+    job = command_jobs.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
 @app.route('/get_session_stats', methods=['POST'])
 def get_session_stats():
     try:
         all_stats = {}
-        for tab_id in ['tab_1', 'tab_2', 'tab_3', 'tab_4']:
+        # The page's tabs if it says which, otherwise every tab with a session
+        tab_ids = (request.get_json(silent=True) or {}).get('tab_ids') or list(orchestrator.sessions)
+        for tab_id in tab_ids:
             session_info = orchestrator.get_session_info(tab_id)
             if session_info:
                 all_stats[tab_id] = {
@@ -2408,6 +2709,21 @@ def get_session_stats():
     except Exception as e:
         return jsonify({}), 500
 
+@socketio.on('connect')
+def handle_connect():
+    # Every tab until the page says which ones it shows
+    stats_broadcaster.subscribe(request.sid)
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    stats_broadcaster.unsubscribe(request.sid)
+
+@socketio.on('subscribe_stats')
+def handle_subscribe_stats(data):
+    """Limit realtime_stats for this client to the given tabs"""
+    tab_ids = (data or {}).get('tab_ids')
+    stats_broadcaster.subscribe(request.sid, tab_ids)
+
 @socketio.on('switch_tab')
 def handle_tab_switch(data):
     """Handle tab switching"""
@@ -2430,7 +2746,9 @@ def save_sessions():
         
         # Add orchestrator session data
         data['orchestrator_sessions'] = {}
-        for tab_id in ['tab_1', 'tab_2', 'tab_3', 'tab_4']:
+        tab_ids = list(data.get('tabNames', {}))
+        tab_ids += [tab_id for tab_id in orchestrator.sessions if tab_id not in tab_ids]
+        for tab_id in tab_ids:
             session_info = orchestrator.get_session_info(tab_id)
             if session_info:
                 data['orchestrator_sessions'][tab_id] = {
@@ -2446,7 +2764,7 @@ def save_sessions():
         
         return jsonify({'success': True})
     except Exception as e:
-        print(f"[SAVE] Error saving sessions: {e}")
+        session_log.error("Error saving sessions: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/load_sessions', methods=['GET'])
@@ -2476,7 +2794,7 @@ def load_sessions():
                 'orchestrator_sessions': {}
             })
     except Exception as e:
-        print(f"[LOAD] Error loading sessions: {e}")
+        session_log.error("Error loading sessions: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/clear_sessions', methods=['POST'])
@@ -2491,7 +2809,7 @@ def clear_sessions():
         
         return jsonify({'success': True})
     except Exception as e:
-        print(f"[CLEAR] Error clearing sessions: {e}")
+        session_log.error("Error clearing sessions: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/tts', methods=['POST'])
@@ -2505,30 +2823,35 @@ def tts():
         return jsonify({'error': 'No text provided'}), 400
     
     try:
-        # Use edge-tts to generate speech
-        import edge_tts
-        import asyncio
-        
-        async def generate_speech():
-            tts = edge_tts.Communicate(text, voice)
-            audio_data = b''
-            async for chunk in tts.stream():
-                if chunk['type'] == 'audio':
-                    audio_data += chunk['data']
-            return audio_data
-        
-        # Run async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        audio_data = loop.run_until_complete(generate_speech())
+        # Synthesized on the shared TTS worker loop (repeat phrases come from the cache)
+        audio_data = tts_worker.synthesize(text, voice)
         
         # Return audio as response
         return Response(audio_data, mimetype='audio/mpeg')
         
+    except TTSBusyError as e:
+        tts_log.warning("%s", e)
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
-        print(f"[TTS] Error: {e}")
+        tts_log.error("Error: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/tts/pipelined', methods=['GET', 'POST'])
+def tts_pipelined():
+    """Text-to-speech streamed sentence by sentence (first sentence plays while the rest synthesize)"""
+    data = request.get_json(silent=True) or request.args
+    text = data.get('text', '')
+    voice = data.get('voice', 'en-US-AriaNeural')
+    
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+    
+    return Response(
+        stream_with_context(pipelined_tts.stream(text, voice)),
+        mimetype='audio/mpeg',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
 
 
 if __name__ == '__main__':
@@ -15,6 +15,8 @@ import os
 import subprocess
 import re
 from orchestrator_simple_v2 import orchestrator
+from dedup_window import DedupWindow
+from claude_output_parser import classify_line, RESPONSE
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'multi-claude-secret-key-v2'
@@ -23,9 +25,18 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # Global state for each tab
 response_queues = {}  # tab_id -> queue
 capture_threads = {}  # tab_id -> thread
+capture_dedup = {}  # tab_id -> {'lines': DedupWindow, 'responses': DedupWindow}
 active_tab_id = None
 tab_stats = {}  # tab_id -> {"time": "", "tokens": "", "start_time": time}
 
+def format_token_count(token_count):
+    """Format tokens with K notation"""
+    if token_count >= 10000:
+        return f"{token_count/1000:.0f}K"
+    if token_count >= 1000:
+        return f"{token_count/1000:.1f}K"
+    return str(token_count)
+
 def extract_stats_from_output(output):
     """Extract time and token info from Claude's output"""
     stats = {"time": "", "tokens": ""}
@@ -34,16 +45,7 @@ def extract_stats_from_output(output):
     token_match = re.search(r'(\d+s)\s*·\s*[⚒↑↓]\s*(\d+)\s*tokens', output)
     if token_match:
         stats["time"] = token_match.group(1)
-        token_count = int(token_match.group(2))
-        
-        # Format tokens with K notation
-        if token_count >= 1000:
-            if token_count >= 10000:
-                stats["tokens"] = f"{token_count/1000:.0f}K"
-            else:
-                stats["tokens"] = f"{token_count/1000:.1f}K"
-        else:
-            stats["tokens"] = str(token_count)
+        stats["tokens"] = format_token_count(int(token_match.group(2)))
     
     return stats
 
@@ -1532,6 +1534,7 @@ def close_session():
         # Stop capture thread
         if tab_id in capture_threads:
             del capture_threads[tab_id]
+        capture_dedup.pop(tab_id, None)
         
         if tab_id in response_queues:
             del response_queues[tab_id]
@@ -1545,6 +1548,14 @@ def close_session():
             'error': str(e)
         })
 
+@app.route('/dedup_stats', methods=['GET'])
+def dedup_stats():
+    """Size and hit counts of each tab's capture dedup windows"""
+    return jsonify({
+        tab_id: {name: window.get_stats() for name, window in windows.items()}
+        for tab_id, windows in list(capture_dedup.items())
+    })
+
 @app.route('/get_session_stats', methods=['POST'])
 def get_session_stats():
     """Get session statistics for a tab"""
@@ -1586,8 +1597,11 @@ def handle_switch_tab(data):
 def capture_responses(session_id, tab_id):
     """Capture responses from Claude for a specific session - matches 8103 style"""
     last_content = ""
-    last_seen_lines = set()
-    processed_responses = set()
+    # Bounded and time-decayed, so a tab left open for days keeps flat memory.
+    # The ttl also lets an identical reply to a later request through again.
+    last_seen_lines = DedupWindow(max_entries=512, ttl=60)
+    processed_responses = DedupWindow(max_entries=256, ttl=60)
+    capture_dedup[tab_id] = {'lines': last_seen_lines, 'responses': processed_responses}
     
     print(f"[CAPTURE] Started capture thread for tab {tab_id}, session {session_id}")
     
@@ -1604,17 +1618,16 @@ def capture_responses(session_id, tab_id):
                 
                 # Process lines to find Claude's responses
                 for line in lines:
-                    line_hash = hash(line)
-                    
                     # Skip already processed lines
-                    if line_hash in last_seen_lines:
+                    if line in last_seen_lines:
                         continue
                     
-                    cleaned_line = line.strip()
+                    # One pass of the shared parser classifies the line
+                    event = classify_line(line)
                     
                     # Check for real-time stats
-                    stats = extract_stats_from_output(cleaned_line)
-                    if stats["time"] or stats["tokens"]:
+                    if event.tokens is not None:
+                        stats = {"time": f"{event.seconds}s", "tokens": format_token_count(event.tokens)}
                         # Update tab stats
                         if tab_id not in tab_stats:
                             tab_stats[tab_id] = {"time": "", "tokens": ""}
@@ -1627,41 +1640,12 @@ def capture_responses(session_id, tab_id):
                             'tokens': stats["tokens"]
                         })
                     
-                    # Look for Claude's responses (multiple patterns)
-                    # Pattern 1: Gray circles (●)
-                    # Pattern 2: Assistant responses after "Claude:" or similar
-                    is_claude_response = False
-                    
-                    if cleaned_line.startswith('●'):
-                        is_claude_response = True
-                    elif cleaned_line.startswith('Claude:'):
-                        is_claude_response = True
-                        cleaned_line = cleaned_line[7:].strip()  # Remove "Claude:" prefix
-                    elif cleaned_line.startswith('Assistant:'):
-                        is_claude_response = True  
-                        cleaned_line = cleaned_line[10:].strip()  # Remove "Assistant:" prefix
-                    
-                    if is_claude_response:
-                        # Extract response text
-                        if cleaned_line.startswith('●'):
-                            response_text = cleaned_line[1:].strip()
-                        else:
-                            response_text = cleaned_line  # Already cleaned for other patterns
+                    # Claude's responses: "● text", "Claude: text" or "Assistant: text".
+                    # Tool calls ("● Bash(...)") are classified separately and skipped.
+                    if event.kind == RESPONSE:
+                        response_text = event.text
                         print(f"[CAPTURE] Found Claude response for tab {tab_id}: {response_text[:50]}...")
                         
-                        # Skip ONLY obvious tool call patterns at the start
-                        # Allow mentions of tools in normal conversation
-                        tool_start_patterns = [
-                            'List(.', 'Call(', 'Read(', 'Edit(', 'Write(',
-                            'Bash(', 'MultiEdit(', 'Grep(', 'Glob(', 'LS(',
-                            'WebFetch(', 'WebSearch(', 'NotebookRead(', 'NotebookEdit(',
-                        ]
-                        
-                        # Skip if it starts with a tool call
-                        is_tool_call = any(response_text.startswith(pattern) for pattern in tool_start_patterns)
-                        if is_tool_call:
-                            continue
-                            
                         # Skip very short responses
                         if len(response_text) < 3:
                             continue
@@ -1669,10 +1653,8 @@ def capture_responses(session_id, tab_id):
                         # Process valid responses
                         if True:
                             
-                            response_hash = hash(response_text)
-                            if response_hash not in processed_responses:
-                                processed_responses.add(response_hash)
-                                last_seen_lines.add(line_hash)
+                            if not processed_responses.seen(response_text):
+                                last_seen_lines.add(line)
                                 
                                 # Send response via WebSocket
                                 socketio.emit('response', {
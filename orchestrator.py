@@ -3,16 +3,22 @@
 Claude Orchestrator - Manages multiple Claude instances across tabs
 """
 import asyncio
-import json
 import subprocess
 import time
 import uuid
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Iterator, Optional
 from datetime import datetime
-import redis
 import sqlite3
 from pathlib import Path
+from tmux_capture import IncrementalPaneCapture
+from tmux_client import tmux_client
+from event_bus import event_bus
+from session_registry import SessionRegistry, max_sessions_from_env
+
+# Claude's TUI keeps redrawing the spinner and input box border just above the
+# cursor, so those rows are not treated as finished output yet
+TUI_LIVE_LINES = 3
 
 @dataclass
 class BotSession:
@@ -32,16 +38,16 @@ class ClaudeOrchestrator:
     """
     
     def __init__(self):
-        self.sessions: Dict[str, BotSession] = {}
+        self.sessions: SessionRegistry[BotSession] = SessionRegistry()
         self.active_tab_id: Optional[str] = None
-        self.max_sessions = 4
+        self.max_sessions = max_sessions_from_env(4)
+        
+        # Per-session read cursors into tmux scrollback
+        self.pane_capture = IncrementalPaneCapture(live_lines=TUI_LIVE_LINES)
         
         # Initialize storage
         self.init_storage()
         
-        # Redis for real-time communication
-        self.redis_client = redis.Redis(host='localhost', port=6379, decode_responses=True)
-        
     def init_storage(self):
         """Initialize SQLite database for persistent storage"""
         self.db_path = Path("orchestrator_data.db")
@@ -116,6 +122,7 @@ class ClaudeOrchestrator:
         self.publish_event('session_created', {
             'tab_id': tab_id,
             'session_id': session_id,
+            'tmux_session': tmux_session,
             'project_name': project_name
         })
         
@@ -130,14 +137,7 @@ class ClaudeOrchestrator:
         session.last_activity = datetime.now()
         
         # Send message to appropriate tmux session
-        subprocess.run([
-            'tmux', 'send-keys', '-t', f'{session.tmux_session}:0',
-            '-l', message
-        ])
-        subprocess.run([
-            'tmux', 'send-keys', '-t', f'{session.tmux_session}:0',
-            'Enter'
-        ])
+        tmux_client.send_text(f'{session.tmux_session}:0', message)
         
         # Log the message
         self.log_memory(session.session_id, 'user_message', message)
@@ -151,28 +151,35 @@ class ClaudeOrchestrator:
         
         return session.session_id
     
+    def _find_session(self, session_id: str) -> Optional[BotSession]:
+        """Find a session by its session_id"""
+        return self.sessions.by_session_id(session_id)
+    
     def capture_response(self, session_id: str) -> Optional[str]:
-        """Capture response from a specific Claude instance"""
-        session = None
-        for s in self.sessions.values():
-            if s.session_id == session_id:
-                session = s
-                break
-        
+        """Capture output written by a Claude instance since the last call"""
+        session = self._find_session(session_id)
         if not session:
             return None
         
-        # Capture tmux pane content
-        result = subprocess.run([
-            'tmux', 'capture-pane', '-t', f'{session.tmux_session}:0',
-            '-p', '-S', '-500'
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return result.stdout
+        lines = self.pane_capture.read_new_lines(f'{session.tmux_session}:0')
+        if lines:
+            return '\n'.join(lines)
         
         return None
     
+    def stream_response_lines(self, session_id: str, poll_interval: float = 0.2,
+                              stop_event=None) -> Iterator[str]:
+        """Yield new output lines from a Claude instance as they appear"""
+        session = self._find_session(session_id)
+        if not session:
+            return iter(())
+        
+        return self.pane_capture.iter_new_lines(
+            f'{session.tmux_session}:0',
+            poll_interval=poll_interval,
+            stop_event=stop_event
+        )
+    
     def switch_tab(self, tab_id: str):
         """Switch active tab and update audio routing"""
         if tab_id not in self.sessions:
@@ -224,13 +231,8 @@ class ClaudeOrchestrator:
         conn.close()
     
     def publish_event(self, event_type: str, data: dict):
-        """Publish event to Redis for real-time updates"""
-        event = {
-            'type': event_type,
-            'timestamp': datetime.now().isoformat(),
-            'data': data
-        }
-        self.redis_client.publish('orchestrator_events', json.dumps(event))
+        """Publish event on the shared event bus (Redis when available) for real-time updates"""
+        event_bus.publish(event_type, data)
     
     def cleanup_session(self, tab_id: str):
         """Clean up a session when tab is closed"""
@@ -241,6 +243,7 @@ class ClaudeOrchestrator:
         
         # Kill tmux session
         subprocess.run(['tmux', 'kill-session', '-t', session.tmux_session])
+        self.pane_capture.forget(f'{session.tmux_session}:0')
         
         # Mark as inactive in database
         session.is_active = False
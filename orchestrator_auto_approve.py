@@ -12,6 +12,7 @@ from datetime import datetime
 import threading
 import queue
 import re
+from session_registry import SessionRegistry, max_sessions_from_env
 
 @dataclass
 class BotSession:
@@ -40,9 +41,9 @@ class SimpleOrchestrator:
     """
     
     def __init__(self):
-        self.sessions: Dict[str, BotSession] = {}
+        self.sessions: SessionRegistry[BotSession] = SessionRegistry()
         self.active_tab_id: Optional[str] = None
-        self.max_sessions = 4
+        self.max_sessions = max_sessions_from_env(4)
         self.event_queue = queue.Queue()
         # Permission patterns from single voice version
         self.permission_patterns = [
@@ -216,11 +217,7 @@ class SimpleOrchestrator:
     
     def capture_response(self, session_id: str) -> Optional[str]:
         """Capture response from a specific Claude instance"""
-        session = None
-        for s in self.sessions.values():
-            if s.session_id == session_id:
-                session = s
-                break
+        session = self.sessions.by_session_id(session_id)
         
         if not session:
             return None
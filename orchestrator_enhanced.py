@@ -8,12 +8,14 @@ import uuid
 import time
 import json
 import os
-import sqlite3
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 import threading
 import queue
+from tmux_client import tmux_client, TmuxError
+from session_store import SessionStore
+from session_registry import SessionRegistry, max_sessions_from_env
 
 @dataclass
 class BotSession:
@@ -33,9 +35,9 @@ class EnhancedOrchestrator:
     def __init__(self):
         """Initialize the enhanced orchestrator with memory support"""
         print("[ENHANCED ORCHESTRATOR] Initializing with memory and error handling")
-        self.sessions: Dict[str, BotSession] = {}
+        self.sessions: SessionRegistry[BotSession] = SessionRegistry()
         self.event_queue = queue.Queue()
-        self.max_sessions = 10
+        self.max_sessions = max_sessions_from_env(10)
         self.session_timeout = timedelta(minutes=30)
         self.max_memory_messages = 20  # Keep last 20 messages in memory
         
@@ -50,112 +52,36 @@ class EnhancedOrchestrator:
         self.maintenance_thread.start()
     
     def init_database(self):
-        """Initialize SQLite database for session memory"""
+        """Open the session memory database"""
         self.db_path = "/home/corp06/software_projects/ClaudeVoiceBot/current/bot_memory.db"
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create tables if they don't exist
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                session_id TEXT PRIMARY KEY,
-                tab_id TEXT,
-                project_name TEXT,
-                created_at TEXT,
-                last_activity TEXT,
-                memory_context TEXT,
-                error_count INTEGER DEFAULT 0,
-                last_error TEXT
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT,
-                message_type TEXT,
-                content TEXT,
-                timestamp TEXT,
-                FOREIGN KEY (session_id) REFERENCES sessions (session_id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        self.store = SessionStore(self.db_path)
     
     def load_sessions_from_db(self):
         """Load previous sessions from database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         # Clean up old sessions (older than 24 hours)
-        cutoff_time = (datetime.now() - timedelta(hours=24)).isoformat()
-        cursor.execute('DELETE FROM sessions WHERE last_activity < ?', (cutoff_time,))
-        cursor.execute('DELETE FROM messages WHERE session_id NOT IN (SELECT session_id FROM sessions)')
-        
-        conn.commit()
-        conn.close()
-        print("[ORCHESTRATOR] Database cleaned up")
+        self.store.delete_inactive(datetime.now() - timedelta(hours=24))
+        print("[ORCHESTRATOR] Database cleanup queued")
     
     def save_session_to_db(self, session: BotSession):
         """Save session to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO sessions 
-            (session_id, tab_id, project_name, created_at, last_activity, memory_context, error_count, last_error)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        self.store.save_session(
             session.session_id,
             session.tab_id,
             session.project_name,
-            session.created_at.isoformat(),
-            session.last_activity.isoformat(),
+            session.created_at,
+            session.last_activity,
             session.memory_context,
             session.error_count,
             session.last_error
-        ))
-        
-        conn.commit()
-        conn.close()
+        )
     
     def save_message_to_db(self, session_id: str, message_type: str, content: str):
         """Save message to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO messages (session_id, message_type, content, timestamp)
-            VALUES (?, ?, ?, ?)
-        ''', (session_id, message_type, content, datetime.now().isoformat()))
-        
-        conn.commit()
-        conn.close()
+        self.store.save_message(session_id, message_type, content)
     
     def get_session_history(self, session_id: str, limit: int = 20) -> List[Dict[str, Any]]:
-        """Get message history for a session"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT message_type, content, timestamp 
-            FROM messages 
-            WHERE session_id = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (session_id, limit))
-        
-        messages = []
-        for row in cursor.fetchall():
-            messages.append({
-                'type': row[0],
-                'content': row[1],
-                'timestamp': row[2]
-            })
-        
-        conn.close()
-        return list(reversed(messages))  # Return in chronological order
+        """Get message history for a session, in chronological order"""
+        return self.store.get_history(session_id, limit)
     
     def create_session(self, tab_id: str, project_name: str) -> BotSession:
         """Create a new Claude session with memory initialization"""
@@ -230,14 +156,7 @@ class EnhancedOrchestrator:
         context_msg = f"Previous conversation context:\n{session.memory_context}\n\nPlease continue based on this context."
         
         try:
-            subprocess.run([
-                'tmux', 'send-keys', '-t', f'{session.tmux_session}:0',
-                '-l', context_msg
-            ])
-            subprocess.run([
-                'tmux', 'send-keys', '-t', f'{session.tmux_session}:0',
-                'Enter'
-            ])
+            tmux_client.send_text(f'{session.tmux_session}:0', context_msg)
             time.sleep(2)  # Wait for Claude to process
         except Exception as e:
             print(f"[ORCHESTRATOR] Error sending memory context: {str(e)}")
@@ -251,22 +170,8 @@ class EnhancedOrchestrator:
         session.last_activity = datetime.now()
         
         try:
-            # Clear the line first
-            subprocess.run([
-                'tmux', 'send-keys', '-t', f'{session.tmux_session}:0',
-                'C-u'
-            ], check=True)
-            time.sleep(0.1)
-            
-            # Send message to tmux session
-            subprocess.run([
-                'tmux', 'send-keys', '-t', f'{session.tmux_session}:0',
-                '-l', message
-            ], check=True)
-            subprocess.run([
-                'tmux', 'send-keys', '-t', f'{session.tmux_session}:0',
-                'Enter'
-            ], check=True)
+            # Clear the line, send the message and press Enter in one round trip
+            tmux_client.send_text(f'{session.tmux_session}:0', message, clear_line=True)
             
             # Store message
             session.messages.append({
@@ -291,7 +196,7 @@ class EnhancedOrchestrator:
             
             return session.session_id
             
-        except subprocess.CalledProcessError as e:
+        except TmuxError as e:
             session.error_count += 1
             session.last_error = f"Execution error: {str(e)}"
             self.save_session_to_db(session)
@@ -333,24 +238,19 @@ class EnhancedOrchestrator:
     def capture_response(self, session_id: str) -> Optional[str]:
         """Capture response with better error handling"""
         # Find session by ID
-        session = None
-        for s in self.sessions.values():
-            if s.session_id == session_id:
-                session = s
-                break
+        session = self.sessions.by_session_id(session_id)
         
         if not session:
             return None
         
         try:
             # Capture from tmux
-            result = subprocess.run([
-                'tmux', 'capture-pane', '-t', f'{session.tmux_session}:0',
-                '-p', '-S', '-100'
-            ], capture_output=True, text=True, check=True)
+            pane_lines = tmux_client.command(
+                'capture-pane', '-t', f'{session.tmux_session}:0', '-p', '-S', '-100'
+            )
             
-            if result.returncode == 0:
-                content = result.stdout
+            if pane_lines:
+                content = '\n'.join(pane_lines)
                 # Look for Claude's response pattern
                 lines = content.strip().split('\n')
                 
@@ -381,7 +281,7 @@ class EnhancedOrchestrator:
             
             return None
             
-        except subprocess.CalledProcessError as e:
+        except TmuxError as e:
             print(f"[ORCHESTRATOR] Error capturing response: {str(e)}")
             session.error_count += 1
             session.last_error = f"Capture error: {str(e)}"
@@ -431,6 +331,7 @@ class EnhancedOrchestrator:
         """Get statistics for all sessions"""
         stats = {
             'active_sessions': len(self.sessions),
+            'database': self.store.get_stats(),
             'sessions': {}
         }
         
@@ -9,8 +9,9 @@ from dataclasses import dataclass, field
 from typing import Dict, Optional, List
 from datetime import datetime
 import threading
-import queue
 from claude_pipe_wrapper import pipe_orchestrator
+from event_bus import event_bus
+from session_registry import SessionRegistry, max_sessions_from_env
 
 @dataclass
 class BotSession:
@@ -36,10 +37,10 @@ class SimpleOrchestrator:
     """
     
     def __init__(self):
-        self.sessions: Dict[str, BotSession] = {}
+        self.sessions: SessionRegistry[BotSession] = SessionRegistry()
         self.active_tab_id: Optional[str] = None
-        self.max_sessions = 4
-        self.event_queue = queue.Queue()
+        self.max_sessions = max_sessions_from_env(4)
+        self.events = event_bus.subscribe()  # Backlog for get_events()
         self.last_responses: Dict[str, str] = {}  # Store last response for each tab
         print(f"[ORCHESTRATOR] Initialized with pipe wrapper")
         
@@ -130,11 +131,7 @@ class SimpleOrchestrator:
     def capture_response(self, session_id: str) -> Optional[str]:
         """Get the last response for a session"""
         # Find the tab_id for this session
-        tab_id = None
-        for tid, sess in self.sessions.items():
-            if sess.session_id == session_id:
-                tab_id = tid
-                break
+        tab_id = self.sessions.tab_for(session_id)
                 
         if not tab_id:
             return None
@@ -176,23 +173,12 @@ class SimpleOrchestrator:
         return None
     
     def publish_event(self, event_type: str, data: dict):
-        """Publish event to event queue"""
-        event = {
-            'type': event_type,
-            'timestamp': datetime.now().isoformat(),
-            'data': data
-        }
-        self.event_queue.put(event)
+        """Publish event on the shared event bus"""
+        event_bus.publish(event_type, data)
     
     def get_events(self) -> List[dict]:
-        """Get all pending events"""
-        events = []
-        while not self.event_queue.empty():
-            try:
-                events.append(self.event_queue.get_nowait())
-            except queue.Empty:
-                break
-        return events
+        """Get all pending events (from every process when the bus is Redis)"""
+        return self.events.drain()
     
     def cleanup_session(self, tab_id: str):
         """Clean up a session when tab is closed"""
@@ -7,10 +7,11 @@ import subprocess
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import Dict, Optional, List
+from typing import Optional, List
 from datetime import datetime
 import threading
-import queue
+from event_bus import event_bus
+from session_registry import SessionRegistry, max_sessions_from_env
 
 @dataclass
 class BotSession:
@@ -37,10 +38,10 @@ class SimpleOrchestrator:
     """
     
     def __init__(self):
-        self.sessions: Dict[str, BotSession] = {}
+        self.sessions: SessionRegistry[BotSession] = SessionRegistry()
         self.active_tab_id: Optional[str] = None
-        self.max_sessions = 4
-        self.event_queue = queue.Queue()
+        self.max_sessions = max_sessions_from_env(4)
+        self.events = event_bus.subscribe()  # Backlog for get_events()
         
     def create_session(self, tab_id: str, project_name: str) -> BotSession:
         """Create a new Claude session for a tab"""
@@ -138,11 +139,7 @@ class SimpleOrchestrator:
     
     def capture_response(self, session_id: str) -> Optional[str]:
         """Capture response from a specific Claude instance"""
-        session = None
-        for s in self.sessions.values():
-            if s.session_id == session_id:
-                session = s
-                break
+        session = self.sessions.by_session_id(session_id)
         
         if not session:
             print(f"[ORCHESTRATOR] No session found for session_id: {session_id}")
@@ -211,23 +208,12 @@ class SimpleOrchestrator:
         return None
     
     def publish_event(self, event_type: str, data: dict):
-        """Publish event to event queue"""
-        event = {
-            'type': event_type,
-            'timestamp': datetime.now().isoformat(),
-            'data': data
-        }
-        self.event_queue.put(event)
+        """Publish event on the shared event bus"""
+        event_bus.publish(event_type, data)
     
     def get_events(self) -> List[dict]:
-        """Get all pending events"""
-        events = []
-        while not self.event_queue.empty():
-            try:
-                events.append(self.event_queue.get_nowait())
-            except queue.Empty:
-                break
-        return events
+        """Get all pending events (from every process when the bus is Redis)"""
+        return self.events.drain()
     
     def cleanup_session(self, tab_id: str):
         """Clean up a session when tab is closed"""
@@ -5,12 +5,19 @@ Simple orchestrator using the simple Claude wrapper
 import json
 import time
 import uuid
+from collections import deque
+from concurrent.futures import CancelledError
 from dataclasses import dataclass, field
-from typing import Dict, Optional, List
+from typing import Callable, Deque, Dict, Optional, List
 from datetime import datetime
 import threading
 import queue
 from claude_memory_wrapper import simple_orchestrator
+from event_bus import event_bus
+from session_registry import SessionRegistry, max_sessions_from_env
+from voice_logging import get_logger
+
+log = get_logger('orchestrator')
 
 @dataclass
 class BotSession:
@@ -30,30 +37,51 @@ class BotSession:
     total_tokens: int = 0
     total_duration: float = 0.0
 
+@dataclass
+class QueuedTurn:
+    """One user turn waiting in (or running from) a tab's queue"""
+    tab_id: str
+    message: str
+    on_chunk: Optional[Callable[[str], None]] = None
+    on_reset: Optional[Callable[[], None]] = None  # Streamed text so far is void (the turn is retried)
+    enqueued_at: float = 0.0
+    last_part_at: float = 0.0
+    parts: int = 1  # Utterances merged into this turn
+    status: str = 'queued'  # queued | running | done | cancelled | error
+    session_id: Optional[str] = None
+    error: Optional[Exception] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
 class SimpleOrchestrator:
     """
     Simple orchestrator that uses the simple Claude wrapper
     """
     
     def __init__(self):
-        self.sessions: Dict[str, BotSession] = {}
+        self.sessions: SessionRegistry[BotSession] = SessionRegistry()
         self.active_tab_id: Optional[str] = None
-        self.max_sessions = 4
-        self.event_queue = queue.Queue()
+        self.max_sessions = max_sessions_from_env(16)  # Tabs are user-created; the page shows the cap
+        self.events = event_bus.subscribe()  # Backlog for get_events()
         self.last_responses: Dict[str, str] = {}  # Store last response for each tab
-        print(f"[ORCHESTRATOR] Initialized with simple wrapper")
+        self.response_channels: Dict[str, queue.Queue] = {}  # tab_id -> completed responses
+        
+        # Per-tab turn queues: one dispatcher thread per busy tab runs its turns in order
+        self.turn_queues: Dict[str, Deque[QueuedTurn]] = {}
+        self.running_turns: Dict[str, QueuedTurn] = {}
+        self.dispatchers: Dict[str, threading.Thread] = {}
+        self.turn_lock = threading.Condition()
+        self.coalesce_window = 2.0  # Merge a new utterance into a queued turn this recent
+        self.debounce = 0.0  # Hold a new turn this long for follow-up utterances (0 = start at once)
+        log.info("Initialized with simple wrapper")
         
     def create_session(self, tab_id: str, project_name: str) -> BotSession:
         """Create a new Claude session for a tab"""
-        print(f"[ORCHESTRATOR] create_session called with tab_id={tab_id}, project_name={project_name}")
+        log.debug("create_session called with tab_id=%s, project_name=%s", tab_id, project_name)
         
-        if len(self.sessions) >= self.max_sessions:
-            # Try to clean up old sessions first
-            self._cleanup_old_sessions()
-            
-            # Check again after cleanup
-            if len(self.sessions) >= self.max_sessions:
-                raise Exception(f"Maximum number of sessions ({self.max_sessions}) reached")
+        # Evicting the oldest session would silently wipe a tab the user still has open
+        if tab_id not in self.sessions and len(self.sessions) >= self.max_sessions:
+            raise Exception(f"Maximum number of sessions ({self.max_sessions}) reached")
         
         try:
             # Use simple orchestrator to create the actual Claude session
@@ -70,21 +98,163 @@ class SimpleOrchestrator:
             
             # Store session
             self.sessions[tab_id] = session
+            self.response_channels.setdefault(tab_id, queue.Queue())
             
-            print(f"[ORCHESTRATOR] Session created successfully. Total sessions: {len(self.sessions)}")
+            log.info("Session created for tab %s. Total sessions: %d", tab_id, len(self.sessions))
+            
+            self.publish_event('session_created', {
+                'tab_id': tab_id,
+                'session_id': session_id,
+                'project_name': project_name
+            })
             
             return session
             
         except Exception as e:
-            print(f"[ORCHESTRATOR] Error creating session: {e}")
+            log.error("Error creating session: %s", e)
             raise
     
-    def route_message(self, tab_id: str, message: str) -> str:
-        """Route a message to the appropriate Claude instance"""
-        print(f"[ORCHESTRATOR] route_message called: tab_id={tab_id}, message={message}")
+    def route_message(self, tab_id: str, message: str,
+                      on_chunk: Optional[Callable[[str], None]] = None,
+                      on_reset: Optional[Callable[[], None]] = None) -> str:
+        """Route a message to the appropriate Claude instance (chunks streamed to on_chunk).
+        
+        Blocks until the turn has run; turns for the same tab run one at a time.
+        Raises CancelledError if the turn was cancelled.
+        """
+        log.debug("route_message called: tab_id=%s, message=%s", tab_id, message)
+        return self.wait_for_turn(self.submit_message(tab_id, message, on_chunk=on_chunk, on_reset=on_reset))
+    
+    def submit_message(self, tab_id: str, message: str,
+                       on_chunk: Optional[Callable[[str], None]] = None,
+                       preempt: bool = False,
+                       on_reset: Optional[Callable[[], None]] = None) -> QueuedTurn:
+        """Queue a message for a tab without waiting for it to run.
+        
+        A message arriving within coalesce_window of the last utterance of a
+        turn that has not started yet is appended to that turn instead of
+        becoming a new one. With preempt=True the tab's running and queued
+        turns are cancelled first, so this message runs next. on_reset is
+        called when a failed attempt is retried: the chunks streamed so far
+        are void and the reply streams again from the start.
+        """
+        if preempt:
+            self.cancel(tab_id)
         
+        now = time.time()
+        with self.turn_lock:
+            turns = self.turn_queues.setdefault(tab_id, deque())
+            last = turns[-1] if turns else None
+            if last is not None and now - last.last_part_at <= self.coalesce_window:
+                last.message = f"{last.message} {message}"
+                last.last_part_at = now
+                last.parts += 1
+                log.info("Merged message into queued turn for tab %s (%d parts)", tab_id, last.parts)
+                self.turn_lock.notify_all()
+                return last
+            
+            turn = QueuedTurn(tab_id=tab_id, message=message, on_chunk=on_chunk, on_reset=on_reset,
+                              enqueued_at=now, last_part_at=now)
+            turns.append(turn)
+            
+            dispatcher = self.dispatchers.get(tab_id)
+            if dispatcher is None or not dispatcher.is_alive():
+                dispatcher = threading.Thread(target=self._drain_turns, args=(tab_id,),
+                                              name=f'turns-{tab_id}', daemon=True)
+                self.dispatchers[tab_id] = dispatcher
+                dispatcher.start()
+            self.turn_lock.notify_all()
+        
+        log.info("Queued turn for tab %s (position %d)", tab_id, len(turns))
+        return turn
+    
+    def wait_for_turn(self, turn: QueuedTurn, timeout: Optional[float] = None) -> str:
+        """Block until a queued turn has run and return the tab's session_id"""
+        if not turn.done.wait(timeout):
+            raise TimeoutError(f"Turn for tab {turn.tab_id} still {turn.status} after {timeout}s")
+        if turn.status == 'cancelled':
+            raise CancelledError(f"Turn for tab {turn.tab_id} was cancelled")
+        if turn.error is not None:
+            raise turn.error
+        return turn.session_id
+    
+    def cancel(self, tab_id: str, include_queued: bool = True) -> int:
+        """Cancel the tab's running turn (killing its Claude process) and, optionally, its queued turns.
+        
+        Returns the number of turns cancelled.
+        """
+        with self.turn_lock:
+            cancelled = []
+            if include_queued:
+                cancelled.extend(self.turn_queues.get(tab_id, ()))
+                self.turn_queues.get(tab_id, deque()).clear()
+            running = self.running_turns.get(tab_id)
+            if running is not None:
+                cancelled.append(running)
+            for turn in cancelled:
+                turn.status = 'cancelled'
+                turn.cancel_event.set()
+            self.turn_lock.notify_all()
+        
+        if running is not None:
+            simple_orchestrator.cancel(tab_id)
+        for turn in cancelled:
+            if turn is not running:
+                turn.done.set()  # The running turn is released by its dispatcher
+        
+        if cancelled:
+            log.info("Cancelled %d turn(s) for tab %s", len(cancelled), tab_id)
+        return len(cancelled)
+    
+    def _drain_turns(self, tab_id: str):
+        """Dispatcher thread: run a tab's queued turns in order, exiting when the queue is empty"""
+        while True:
+            with self.turn_lock:
+                while True:
+                    turns = self.turn_queues.get(tab_id)
+                    if not turns:
+                        self.dispatchers.pop(tab_id, None)
+                        return
+                    # Give follow-up utterances a chance to join the head turn
+                    hold = turns[0].last_part_at + self.debounce - time.time()
+                    if hold <= 0:
+                        break
+                    self.turn_lock.wait(hold)
+                turn = turns.popleft()
+                turn.status = 'running'
+                self.running_turns[tab_id] = turn
+            
+            try:
+                turn.session_id = self._process_message(tab_id, turn.message, turn.on_chunk,
+                                                        turn.cancel_event, turn.on_reset)
+            except Exception as e:
+                log.error("Turn for tab %s failed: %s", tab_id, e)
+                turn.error = e
+            finally:
+                with self.turn_lock:
+                    self.running_turns.pop(tab_id, None)
+                    if turn.status == 'running':
+                        turn.status = 'error' if turn.error else 'done'
+                turn.done.set()
+    
+    def get_queue_info(self, tab_id: str) -> dict:
+        """Queued and running turns for a tab"""
+        with self.turn_lock:
+            running = self.running_turns.get(tab_id)
+            return {
+                'queued': len(self.turn_queues.get(tab_id, ())),
+                'running': running is not None,
+                'running_since': running.enqueued_at if running else None
+            }
+    
+    def _process_message(self, tab_id: str, message: str,
+                         on_chunk: Optional[Callable[[str], None]] = None,
+                         cancel_event: Optional[threading.Event] = None,
+                         on_reset: Optional[Callable[[], None]] = None) -> str:
+        """Run one turn against the tab's Claude session (called from the tab's dispatcher)"""
+
         if tab_id not in self.sessions:
-            print(f"[ORCHESTRATOR] No session for tab {tab_id}, creating one")
+            log.info("No session for tab %s, creating one", tab_id)
             self.create_session(tab_id, f"Tab {tab_id}")
         
         session = self.sessions[tab_id]
@@ -98,9 +268,34 @@ class SimpleOrchestrator:
         request_start = datetime.now()
         session.current_request_start = request_start
         
+        self.publish_event('message_sent', {
+            'tab_id': tab_id,
+            'session_id': session.session_id,
+            'message': message
+        })
+        
+        streamed_chars = 0
+        
+        def handle_chunk(text: str):
+            # Keep the live token estimate moving while the response streams in
+            nonlocal streamed_chars
+            streamed_chars += len(text)
+            session.current_request_tokens = len(message) // 4 + streamed_chars // 4
+            if on_chunk:
+                on_chunk(text)
+        
+        def handle_retry(attempt: int, error_class: str, delay: float):
+            # The retry streams the reply again from the start
+            nonlocal streamed_chars
+            log.info("Retrying turn for tab %s in %.1fs (%s)", tab_id, delay, error_class)
+            if streamed_chars and on_reset:
+                on_reset()
+            streamed_chars = 0
+        
         # Send message using simple orchestrator
-        print(f"[ORCHESTRATOR] Sending message to simple_orchestrator")
-        response = simple_orchestrator.send_message(tab_id, message)
+        log.debug("Sending message to simple_orchestrator")
+        response = simple_orchestrator.send_message(tab_id, message, on_chunk=handle_chunk,
+                                                    cancel_event=cancel_event, on_retry=handle_retry)
         
         # Calculate request duration
         request_duration = (datetime.now() - request_start).total_seconds()
@@ -110,8 +305,22 @@ class SimpleOrchestrator:
         # Add to cumulative metrics
         session.total_duration += request_duration
         
+        # Wake up anyone blocked in wait_for_response for this tab. An empty
+        # string still marks the end of a (possibly streamed) request.
+        channel = self.response_channels.get(tab_id)
+        if channel is not None:
+            channel.put(response or '')
+        
+        self.publish_event('response', {
+            'tab_id': tab_id,
+            'session_id': session.session_id,
+            'text': response or '',
+            'duration': request_duration
+        })
+        
         if response:
-            print(f"[ORCHESTRATOR] Got response: {response[:100]}...")
+            log.info("Got response for tab %s: %d chars", tab_id, len(response))
+            log.debug("Response: %.100s...", response)
             # Store the response
             self.last_responses[tab_id] = response
             
@@ -136,7 +345,7 @@ class SimpleOrchestrator:
                 'timestamp': datetime.now().isoformat()
             })
         else:
-            print(f"[ORCHESTRATOR] No response received")
+            log.info("No response received for tab %s", tab_id)
         
         return session.session_id
     
@@ -145,20 +354,16 @@ class SimpleOrchestrator:
         # Handle both string session_id and BotSession object
         if isinstance(session_id, BotSession):
             actual_session_id = session_id.session_id
-            print(f"[ORCHESTRATOR] capture_response called with BotSession object, extracting session_id: {actual_session_id}")
+            log.debug("capture_response called with BotSession object, extracting session_id: %s", actual_session_id)
         else:
             actual_session_id = session_id
-            print(f"[ORCHESTRATOR] capture_response called for session {actual_session_id}")
+            log.debug("capture_response called for session %s", actual_session_id)
         
         # Find the tab_id for this session
-        tab_id = None
-        for tid, sess in self.sessions.items():
-            if sess.session_id == actual_session_id:
-                tab_id = tid
-                break
+        tab_id = self.sessions.tab_for(actual_session_id)
                 
         if not tab_id:
-            print(f"[ORCHESTRATOR] No tab found for session {actual_session_id}")
+            log.warning("No tab found for session %s", actual_session_id)
             return None
             
         session = self.sessions[tab_id]
@@ -168,7 +373,7 @@ class SimpleOrchestrator:
             response = self.last_responses[tab_id]
             # Don't clear it immediately - let it be available for a few calls
             # This ensures the capture thread has time to get it
-            print(f"[ORCHESTRATOR] Returning response: {response[:100]}...")
+            log.debug("Returning response: %.100s...", response)
             
             # Add a counter to track how many times this response has been returned
             if not hasattr(self, '_response_counters'):
@@ -188,14 +393,33 @@ class SimpleOrchestrator:
         
         return None
     
+    def wait_for_response(self, tab_id: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Block until route_message stores a response for this tab.
+        
+        Returns '' for a request that produced no response, and None on
+        timeout or once the tab's session has been cleaned up.
+        """
+        channel = self.response_channels.get(tab_id)
+        if channel is None:
+            return None
+        
+        try:
+            return channel.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
     def switch_tab(self, tab_id: str):
         """Switch active tab"""
         if tab_id not in self.sessions:
             # Create session if it doesn't exist
-            print(f"[ORCHESTRATOR] Creating session for tab {tab_id} on switch")
+            log.info("Creating session for tab %s on switch", tab_id)
             self.create_session(tab_id, f"Tab {tab_id}")
         
         self.active_tab_id = tab_id
+        self.publish_event('tab_switched', {
+            'tab_id': tab_id,
+            'session_id': self.sessions[tab_id].session_id
+        })
     
     def get_active_session(self) -> Optional[BotSession]:
         """Get the currently active session"""
@@ -208,15 +432,30 @@ class SimpleOrchestrator:
         if tab_id not in self.sessions:
             return
         
+        # Stop anything still running or queued for the tab
+        self.cancel(tab_id)
+        with self.turn_lock:
+            self.turn_queues.pop(tab_id, None)
+        
         # Clean up simple orchestrator session
         simple_orchestrator.cleanup_session(tab_id)
         
         # Remove from active sessions
-        del self.sessions[tab_id]
+        session = self.sessions.pop(tab_id)
         
         # Remove any stored responses
         if tab_id in self.last_responses:
             del self.last_responses[tab_id]
+        
+        # Release any capture thread waiting on this tab
+        channel = self.response_channels.pop(tab_id, None)
+        if channel is not None:
+            channel.put(None)
+        
+        self.publish_event('session_closed', {
+            'tab_id': tab_id,
+            'session_id': session.session_id
+        })
     
     def get_session_info(self, tab_id: str) -> Optional[dict]:
         """Get information about a specific session"""
@@ -267,23 +506,6 @@ class SimpleOrchestrator:
         else:
             return f"{secs}s"
     
-    def _cleanup_old_sessions(self):
-        """Clean up the oldest inactive sessions"""
-        print(f"[ORCHESTRATOR] Cleaning up old sessions. Current count: {len(self.sessions)}")
-        
-        # Sort sessions by last activity
-        sorted_sessions = sorted(
-            self.sessions.items(), 
-            key=lambda x: x[1].last_activity if x[1].last_activity else x[1].created_at
-        )
-        
-        # Remove the oldest 25% of sessions
-        to_remove = max(1, len(sorted_sessions) // 4)
-        
-        for tab_id, session in sorted_sessions[:to_remove]:
-            print(f"[ORCHESTRATOR] Removing old session: tab_id={tab_id}, last_activity={session.last_activity}")
-            self.cleanup_session(tab_id)
-    
     def list_active_sessions(self) -> list:
         """List all active sessions"""
         return [self.get_session_info(tab_id) for tab_id in self.sessions.keys()]
@@ -298,23 +520,12 @@ class SimpleOrchestrator:
             })
     
     def publish_event(self, event_type: str, data: dict):
-        """Publish event to event queue"""
-        event = {
-            'type': event_type,
-            'timestamp': datetime.now().isoformat(),
-            'data': data
-        }
-        self.event_queue.put(event)
+        """Publish event on the shared event bus"""
+        event_bus.publish(event_type, data)
     
     def get_events(self) -> List[dict]:
-        """Get all pending events"""
-        events = []
-        while not self.event_queue.empty():
-            try:
-                events.append(self.event_queue.get_nowait())
-            except queue.Empty:
-                break
-        return events
+        """Get all pending events (from every process when the bus is Redis)"""
+        return self.events.drain()
 
 
 # Singleton instance
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Precomputed phrase audio bank - short stock phrases synthesized once and served from a memory-mapped pack
+"""
+import concurrent.futures
+import hashlib
+import json
+import mmap
+import os
+import random
+import threading
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from tts_worker import tts_worker
+
+PACK_PATH = 'phrase_bank.pack'
+
+
+@dataclass(frozen=True)
+class PhraseEntry:
+    """One phrase to pre-synthesize for one voice profile"""
+    profile: str
+    category: str
+    mood: str
+    text: str
+
+    @property
+    def key(self) -> str:
+        return PhraseBank.make_key(self.profile, self.mood, self.text)
+
+
+def fingerprint(entries: List[PhraseEntry], extra: Optional[dict] = None) -> str:
+    """Identifies the phrase set (and voice settings) a pack was built from"""
+    payload = json.dumps([[asdict(e) for e in entries], extra or {}], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PhraseBank:
+    """
+    All phrase audio lives in one pack file of concatenated MP3s, with a JSON
+    index of (offset, length) per phrase beside it. At runtime the pack is
+    mmapped, so lookups are a dict hit plus a slice copy and the OS page
+    cache is shared between processes serving the same bank.
+    """
+
+    def __init__(self, pack_path: str = PACK_PATH):
+        self.pack_path = pack_path
+        self.index_path = os.path.splitext(pack_path)[0] + '.index.json'
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self.categories: Dict[str, List[Tuple[str, str]]] = {}  # "profile|category" -> [(text, key)]
+        self.fingerprint: Optional[str] = None
+        self.mm: Optional[mmap.mmap] = None
+        self.lock = threading.Lock()
+        self.building = False
+        self.stats = {'hits': 0, 'misses': 0, 'builds': 0}
+
+    @staticmethod
+    def make_key(profile: str, mood: str, text: str) -> str:
+        return f'{profile}|{mood}|{text}'
+
+    def load(self) -> bool:
+        """Map the pack from disk; False if it does not exist or is unreadable"""
+        try:
+            with open(self.index_path) as f:
+                meta = json.load(f)
+            pack = open(self.pack_path, 'rb')
+        except (OSError, ValueError):
+            return False
+
+        with pack:
+            size = os.fstat(pack.fileno()).st_size
+            mm = mmap.mmap(pack.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+        index = {key: (offset, length) for key, offset, length in meta['entries']}
+        categories: Dict[str, List[Tuple[str, str]]] = {}
+        for group, items in meta['categories'].items():
+            categories[group] = [(text, key) for text, key in items if key in index]
+
+        with self.lock:
+            old = self.mm
+            self.mm = mm
+            self.index = index
+            self.categories = categories
+            self.fingerprint = meta.get('fingerprint')
+        if old is not None:
+            old.close()
+
+        print(f"[PHRASE BANK] Loaded {len(index)} phrases ({size / 1024:.0f} KB) from {self.pack_path}")
+        return True
+
+    def is_current(self, expected_fingerprint: str) -> bool:
+        return self.fingerprint == expected_fingerprint and bool(self.index)
+
+    def build(self, entries: List[PhraseEntry], synthesize: Callable[[PhraseEntry], Awaitable[bytes]],
+              build_fingerprint: str, batch_size: int = 32) -> int:
+        """Synthesize every entry on the TTS worker and write a new pack atomically.
+
+        Returns the number of phrases written. Failed phrases are left out.
+        """
+        self.building = True
+        try:
+            audio: Dict[PhraseEntry, bytes] = {}
+            # Batches keep the worker's pending queue from overflowing
+            for start in range(0, len(entries), batch_size):
+                batch = entries[start:start + batch_size]
+                futures = {tts_worker.submit(synthesize(entry)): entry for entry in batch}
+                for future in concurrent.futures.as_completed(futures):
+                    entry = futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        print(f"[PHRASE BANK] Failed '{entry.text}' ({entry.profile}): {e}")
+                        continue
+                    if data:
+                        audio[entry] = data
+
+            index_entries = []
+            categories: Dict[str, List[Tuple[str, str]]] = {}
+            tmp_pack = f'{self.pack_path}.tmp'
+            with open(tmp_pack, 'wb') as pack:
+                for entry in entries:
+                    data = audio.get(entry)
+                    if data is None:
+                        continue
+                    index_entries.append((entry.key, pack.tell(), len(data)))
+                    pack.write(data)
+                    categories.setdefault(f'{entry.profile}|{entry.category}', []).append((entry.text, entry.key))
+
+            tmp_index = f'{self.index_path}.tmp'
+            with open(tmp_index, 'w') as f:
+                json.dump({'fingerprint': build_fingerprint, 'entries': index_entries,
+                           'categories': categories}, f)
+
+            # Pack first: a reader never sees an index pointing past the end of an old pack
+            os.replace(tmp_pack, self.pack_path)
+            os.replace(tmp_index, self.index_path)
+            self.stats['builds'] += 1
+            print(f"[PHRASE BANK] Built {len(index_entries)}/{len(entries)} phrases")
+            self.load()
+            return len(index_entries)
+        finally:
+            self.building = False
+
+    def ensure(self, entries: List[PhraseEntry], synthesize: Callable[[PhraseEntry], Awaitable[bytes]],
+               build_fingerprint: str, background: bool = True):
+        """Load the pack, rebuilding it if missing or built from a different phrase set"""
+        if self.load() and self.is_current(build_fingerprint):
+            return
+        print("[PHRASE BANK] Pack missing or out of date, rebuilding")
+        if background:
+            threading.Thread(target=self.build, args=(entries, synthesize, build_fingerprint),
+                             daemon=True).start()
+        else:
+            self.build(entries, synthesize, build_fingerprint)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            location = self.index.get(key)
+            if location is None or self.mm is None:
+                self.stats['misses'] += 1
+                return None
+            offset, length = location
+            self.stats['hits'] += 1
+            return self.mm[offset:offset + length]
+
+    def get(self, profile: str, mood: str, text: str) -> Optional[bytes]:
+        """Audio for an exact phrase, or None if it is not in the bank"""
+        return self._read(self.make_key(profile, mood, text))
+
+    def pick(self, profile: str, category: str) -> Optional[Tuple[str, bytes]]:
+        """A random (text, audio) phrase from a category"""
+        with self.lock:
+            choices = self.categories.get(f'{profile}|{category}')
+        if not choices:
+            self.stats['misses'] += 1
+            return None
+        text, key = random.choice(choices)
+        audio = self._read(key)
+        return (text, audio) if audio is not None else None
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {**self.stats, 'phrases': len(self.index), 'building': self.building}
+
+
+# Shared bank - call ensure()/load() before use
+phrase_bank = PhraseBank()
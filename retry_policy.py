@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Retry policy - error classification, jittered exponential backoff and per-session circuit breakers for Claude calls
+"""
+import heapq
+import itertools
+import random
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import CancelledError, Future, InvalidStateError, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from voice_logging import get_logger
+
+log = get_logger('retry')
+
+# Error classes
+TRANSIENT = 'transient'  # Upstream trouble (rate limits, overload, timeouts, crashed process): retry with backoff
+FATAL = 'fatal'  # Retrying cannot help (not logged in, CLI missing, bugs): fail now
+CONTENT = 'content'  # Claude answered, but with an error report or nothing: one more try
+ERROR_CLASSES = (TRANSIENT, FATAL, CONTENT)
+
+FATAL_PATTERN = re.compile(
+    r'invalid api key|authenticat|unauthori[sz]ed|not logged in|/login|credit balance'
+    r'|permission denied|command not found|no such file', re.IGNORECASE)
+# Only a reply that *is* an error report counts, not one that mentions "execution error"
+CONTENT_PATTERN = re.compile(r'\W*(?:api\s+)?(?:execution error|error:)', re.IGNORECASE)
+
+
+def classify_result(result: subprocess.CompletedProcess) -> Optional[str]:
+    """Error class of a finished Claude call, or None if it succeeded"""
+    if result.returncode == 0:
+        text = (result.stdout or '').strip()
+        if not text or CONTENT_PATTERN.match(text.split('\n', 1)[0]):
+            return CONTENT
+        return None
+    if FATAL_PATTERN.search(result.stderr or ''):
+        return FATAL
+    return TRANSIENT
+
+
+def classify_exception(error: BaseException) -> str:
+    if isinstance(error, (FileNotFoundError, PermissionError)):
+        return FATAL
+    if isinstance(error, (OSError, TimeoutError)):
+        return TRANSIENT
+    return FATAL  # A bug will not fix itself on retry
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Claude while a session's breaker is open"""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Circuit open for {key[:8]}, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class RetryPolicy:
+    """How often each error class is attempted and how long to wait between attempts"""
+    attempts: Dict[str, int] = field(default_factory=lambda: {TRANSIENT: 3, CONTENT: 2, FATAL: 1})
+    base_delay: float = 0.5
+    multiplier: float = 2.0
+    max_delay: float = 8.0
+
+    def max_attempts(self, error_class: str) -> int:
+        return self.attempts.get(error_class, 1)
+
+    def backoff(self, attempt: int) -> float:
+        """Delay after a failed attempt: exponential, with equal jitter so retries do not align"""
+        cap = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+
+class CircuitBreaker:
+    """
+    Stops calling Claude for a session after repeated upstream failures.
+
+    failure_threshold consecutive transient or fatal failures open the
+    breaker; calls then fail fast for reset_timeout seconds. The next call
+    after that is a trial: success closes the breaker, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'  # closed | open | half_open
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        if self.state == 'open':
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = 'half_open'
+        return True
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic()) if self.state == 'open' else 0.0
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                self.times_opened += 1
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+
+
+@dataclass
+class _Job:
+    key: str
+    attempt: Callable[[int], Any]
+    classify: Callable[[Any], Optional[str]]
+    on_retry: Optional[Callable[[int, str, float], None]]
+    future: Future = field(default_factory=Future)
+    attempts: int = 0
+    last_error: Optional[str] = None
+
+
+class RetryEngine:
+    """
+    Runs Claude calls under a RetryPolicy with a circuit breaker per key.
+
+    The first attempt runs on the caller's thread. A failed attempt that may
+    be retried goes onto a timer heap. One scheduler thread waits out the
+    backoff, and a small shared pool runs the retry, so a waiting retry
+    holds no thread. The pool also caps how many retries hit Claude at once
+    across all sessions. The caller blocks on the job's future; cancel(key)
+    resolves it at once, even mid-backoff.
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, retry_workers: int = 4,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.policy = policy or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.jobs: Dict[str, _Job] = {}
+        self.executor = ThreadPoolExecutor(max_workers=retry_workers, thread_name_prefix='claude-retry')
+        self.timers: List[Tuple[float, int, _Job]] = []
+        self.timer_seq = itertools.count()
+        self.condition = threading.Condition()
+        self.scheduler: Optional[threading.Thread] = None
+        self.metrics = {error_class: {'errors': 0, 'retries': 0, 'recovered': 0, 'gave_up': 0}
+                        for error_class in ERROR_CLASSES}
+        self.stats = {'calls': 0, 'succeeded': 0, 'short_circuited': 0, 'cancelled': 0}
+
+    def breaker(self, key: str) -> CircuitBreaker:
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def call(self, key: str, attempt: Callable[[int], Any], classify: Callable[[Any], Optional[str]],
+             on_retry: Optional[Callable[[int, str, float], None]] = None) -> Any:
+        """Run attempt(1), retrying per the policy; returns the last result or raises the last exception.
+
+        Raises CircuitOpenError without calling attempt while key's breaker
+        is open, and CancelledError if cancel(key) is called meanwhile.
+        on_retry(attempt, error_class, delay) is called before each retry.
+        """
+        breaker = self.breaker(key)
+        if not breaker.allow():
+            self.stats['short_circuited'] += 1
+            raise CircuitOpenError(key, breaker.retry_after())
+        self.stats['calls'] += 1
+        job = _Job(key, attempt, classify, on_retry)
+        self.jobs[key] = job
+        try:
+            self._run(job)
+            return job.future.result()
+        finally:
+            if self.jobs.get(key) is job:
+                del self.jobs[key]
+
+    def cancel(self, key: str) -> bool:
+        """Abandon key's call: the caller gets CancelledError and any scheduled retry is dropped"""
+        job = self.jobs.get(key)
+        if job is None or job.future.done():
+            return False
+        self.stats['cancelled'] += 1
+        return self._finish(job, error=CancelledError())
+
+    def forget(self, key: str):
+        """Drop key's breaker (its session is gone)"""
+        self.cancel(key)
+        self.breakers.pop(key, None)
+
+    @staticmethod
+    def _finish(job: _Job, result: Any = None, error: Optional[BaseException] = None) -> bool:
+        try:
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+            return True
+        except InvalidStateError:
+            return False  # Cancelled meanwhile
+
+    def _run(self, job: _Job):
+        if job.future.done():
+            return  # Cancelled while waiting to retry
+        job.attempts += 1
+        breaker = self.breaker(job.key)
+        result, exception = None, None
+        try:
+            result = job.attempt(job.attempts)
+            error_class = job.classify(result)
+        except CancelledError as e:
+            if self._finish(job, error=e):
+                self.stats['cancelled'] += 1
+            return
+        except Exception as e:
+            exception, error_class = e, classify_exception(e)
+        if job.future.done():
+            return  # Cancelled mid-attempt: the killed process says nothing about upstream health
+
+        if error_class is None:
+            breaker.record_success()
+            self.stats['succeeded'] += 1
+            if job.last_error:
+                self.metrics[job.last_error]['recovered'] += 1
+            self._finish(job, result)
+            return
+
+        job.last_error = error_class
+        self.metrics[error_class]['errors'] += 1
+        if error_class != CONTENT:
+            breaker.record_failure()  # A bad reply says nothing about upstream health
+        if job.attempts >= self.policy.max_attempts(error_class) or breaker.state == 'open':
+            self.metrics[error_class]['gave_up'] += 1
+            if breaker.state == 'open':
+                log.warning("Circuit opened for %s after %d failures", job.key[:8], breaker.failures)
+            self._finish(job, result, exception)
+            return
+
+        delay = self.policy.backoff(job.attempts)
+        self.metrics[error_class]['retries'] += 1
+        log.info("Attempt %d for %s failed (%s%s), retrying in %.1fs", job.attempts, job.key[:8], error_class,
+                 f": {exception}" if exception else '', delay)
+        if job.on_retry:
+            try:
+                job.on_retry(job.attempts, error_class, delay)
+            except Exception as e:
+                log.error("Retry callback failed: %s", e)
+        self._schedule(job, delay)
+
+    def _schedule(self, job: _Job, delay: float):
+        with self.condition:
+            heapq.heappush(self.timers, (time.monotonic() + delay, next(self.timer_seq), job))
+            if self.scheduler is None or not self.scheduler.is_alive():
+                self.scheduler = threading.Thread(target=self._schedule_loop, name='retry-scheduler', daemon=True)
+                self.scheduler.start()
+            self.condition.notify()
+
+    def _schedule_loop(self):
+        while True:
+            with self.condition:
+                while not self.timers or self.timers[0][0] > time.monotonic():
+                    self.condition.wait(self.timers[0][0] - time.monotonic() if self.timers else None)
+                _, _, job = heapq.heappop(self.timers)
+            if not job.future.done():
+                self.executor.submit(self._run, job)
+
+    def get_stats(self) -> dict:
+        return {**self.stats, 'classes': {k: dict(v) for k, v in self.metrics.items()},
+                'open_circuits': sum(1 for b in self.breakers.values() if b.state == 'open'),
+                'scheduled': len(self.timers)}
+
+
+# Shared by every Claude session in the process
+retry_engine = RetryEngine()
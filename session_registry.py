@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Session registry - thread-safe tab_id <-> session_id index shared by the orchestrators
+"""
+import os
+import threading
+from typing import Dict, Generic, Iterator, List, MutableMapping, Optional, Tuple, TypeVar
+
+S = TypeVar('S')  # Any session object with a session_id attribute
+
+
+def max_sessions_from_env(default: int) -> int:
+    """Session cap for an orchestrator, overridable with $VOICE_MAX_SESSIONS"""
+    try:
+        return int(os.environ.get('VOICE_MAX_SESSIONS', default))
+    except ValueError:
+        return default
+
+
+class SessionRegistry(MutableMapping[str, S], Generic[S]):
+    """
+    Sessions keyed by tab_id, also indexed by session_id.
+
+    Drop-in for the orchestrators' `Dict[str, BotSession]`: it is a mapping
+    of tab_id -> session, so `tab_id in sessions`, `sessions[tab_id]` and
+    `del sessions[tab_id]` work as before. by_session_id() and tab_for()
+    replace the linear scans capture threads used to do on every poll.
+    Every mutation updates both indexes under one lock, and keys(),
+    values() and items() return snapshots that are safe to iterate while
+    other threads add or remove tabs.
+    """
+
+    def __init__(self):
+        self.by_tab: Dict[str, S] = {}
+        self.tab_by_session: Dict[str, str] = {}
+        self.lock = threading.RLock()
+
+    def __getitem__(self, tab_id: str) -> S:
+        return self.by_tab[tab_id]
+
+    def __setitem__(self, tab_id: str, session: S):
+        with self.lock:
+            previous = self.by_tab.get(tab_id)
+            if previous is not None:
+                self.tab_by_session.pop(previous.session_id, None)
+            self.by_tab[tab_id] = session
+            self.tab_by_session[session.session_id] = tab_id
+
+    def __delitem__(self, tab_id: str):
+        with self.lock:
+            session = self.by_tab.pop(tab_id)
+            if self.tab_by_session.get(session.session_id) == tab_id:
+                del self.tab_by_session[session.session_id]
+
+    def __contains__(self, tab_id: object) -> bool:
+        return tab_id in self.by_tab
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.by_tab)
+
+    def pop(self, tab_id: str, *default):
+        with self.lock:
+            if tab_id not in self.by_tab:
+                if default:
+                    return default[0]
+                raise KeyError(tab_id)
+            session = self.by_tab[tab_id]
+            del self[tab_id]
+            return session
+
+    def clear(self):
+        with self.lock:
+            self.by_tab.clear()
+            self.tab_by_session.clear()
+
+    def get(self, tab_id: str, default: Optional[S] = None) -> Optional[S]:
+        return self.by_tab.get(tab_id, default)
+
+    def keys(self) -> List[str]:
+        with self.lock:
+            return list(self.by_tab)
+
+    def values(self) -> List[S]:
+        with self.lock:
+            return list(self.by_tab.values())
+
+    def items(self) -> List[Tuple[str, S]]:
+        with self.lock:
+            return list(self.by_tab.items())
+
+    def copy(self) -> Dict[str, S]:
+        with self.lock:
+            return dict(self.by_tab)
+
+    def tab_for(self, session_id: str) -> Optional[str]:
+        """The tab_id owning session_id, in O(1)"""
+        return self.tab_by_session.get(session_id)
+
+    def by_session_id(self, session_id: str) -> Optional[S]:
+        """The session with this session_id, in O(1)"""
+        with self.lock:
+            tab_id = self.tab_by_session.get(session_id)
+            return self.by_tab.get(tab_id) if tab_id is not None else None
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Session store - SQLite persistence for orchestrator sessions and messages with batched background writes
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from voice_logging import get_logger
+
+log = get_logger('store')
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        tab_id TEXT,
+        project_name TEXT,
+        created_at TEXT,
+        last_activity TEXT,
+        memory_context TEXT,
+        error_count INTEGER DEFAULT 0,
+        last_error TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        message_type TEXT,
+        content TEXT,
+        timestamp TEXT,
+        FOREIGN KEY (session_id) REFERENCES sessions (session_id)
+    )''',
+    # History reads walk this index backwards from the newest row: O(limit)
+    'CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages (session_id, id)',
+    'CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions (last_activity)',
+]
+
+UPSERT_SESSION = '''INSERT OR REPLACE INTO sessions
+    (session_id, tab_id, project_name, created_at, last_activity, memory_context, error_count, last_error)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)'''
+INSERT_MESSAGE = 'INSERT INTO messages (session_id, message_type, content, timestamp) VALUES (?, ?, ?, ?)'
+
+
+class _Write:
+    """A queued statement; writes sharing a key supersede each other within a batch"""
+    __slots__ = ('sql', 'params', 'key')
+
+    def __init__(self, sql: str, params: Tuple, key: Optional[str] = None):
+        self.sql = sql
+        self.params = params
+        self.key = key
+
+
+class SessionStore:
+    """
+    One SQLite database shared by request threads and a single writer thread.
+
+    The database runs in WAL mode, so readers never wait for the writer.
+    Each reading thread keeps its own connection. Writes are queued and the
+    writer commits whatever has accumulated in one transaction, so a burst
+    of messages costs one fsync rather than one per message, and repeated
+    session upserts in a batch collapse to the latest. Reads flush pending
+    writes first, so callers always see their own writes.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 256):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.local = threading.local()
+        self.writes: "queue.Queue[Any]" = queue.Queue()
+        self.pending = 0  # Queued writes not yet committed
+        self.pending_lock = threading.Lock()
+        self.stats = {'writes': 0, 'batches': 0, 'superseded': 0, 'reads': 0, 'errors': 0}
+
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        self.writer_conn = conn
+
+        self.writer_thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer_thread.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        # WAL only needs a sync at checkpoints; a crash can lose the last commits, never corrupt
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self._connect()
+        return conn
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, write: _Write):
+        with self.pending_lock:
+            self.pending += 1
+        self.writes.put(write)
+
+    def _write_loop(self):
+        while True:
+            item = self.writes.get()
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.writes.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+            if any(entry is None for entry in batch):
+                return
+
+    def _commit(self, batch: List[Any]):
+        writes = [entry for entry in batch if isinstance(entry, _Write)]
+        latest = {w.key: i for i, w in enumerate(writes) if w.key is not None}
+        keep = [w for i, w in enumerate(writes) if w.key is None or latest[w.key] == i]
+        try:
+            with self.writer_conn:
+                # Consecutive statements of the same kind go through executemany
+                run: List[_Write] = []
+                for write in keep + [None]:
+                    if run and (write is None or write.sql != run[0].sql):
+                        self.writer_conn.executemany(run[0].sql, [w.params for w in run])
+                        run = []
+                    if write is not None:
+                        run.append(write)
+            self.stats['batches'] += 1
+            self.stats['writes'] += len(keep)
+            self.stats['superseded'] += len(writes) - len(keep)
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            log.error("Dropped %d writes: %s", len(writes), e)
+        finally:
+            with self.pending_lock:
+                self.pending -= len(writes)
+            for entry in batch:
+                if isinstance(entry, threading.Event):
+                    entry.set()
+
+    def save_session(self, session_id: str, tab_id: str, project_name: str, created_at: datetime,
+                     last_activity: datetime, memory_context: str, error_count: int,
+                     last_error: Optional[str]):
+        self._enqueue(_Write(UPSERT_SESSION, (
+            session_id, tab_id, project_name, created_at.isoformat(), last_activity.isoformat(),
+            memory_context, error_count, last_error), key=session_id))
+
+    def save_message(self, session_id: str, message_type: str, content: str):
+        self._enqueue(_Write(INSERT_MESSAGE, (session_id, message_type, content, datetime.now().isoformat())))
+
+    def delete_inactive(self, cutoff: datetime):
+        """Drop sessions idle since before cutoff, and their messages"""
+        self._enqueue(_Write('DELETE FROM sessions WHERE last_activity < ?', (cutoff.isoformat(),)))
+        self._enqueue(_Write('DELETE FROM messages WHERE session_id NOT IN (SELECT session_id FROM sessions)', ()))
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Wait until everything queued so far is committed"""
+        if self.pending == 0 or not self.writer_thread.is_alive():
+            return True
+        marker = threading.Event()
+        self.writes.put(marker)
+        return marker.wait(timeout)
+
+    def close(self):
+        """Commit outstanding writes and stop the writer"""
+        if self.writer_thread.is_alive():
+            self.writes.put(None)
+            self.writer_thread.join(5)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_history(self, session_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """The last limit messages of a session, oldest first"""
+        self.flush()
+        self.stats['reads'] += 1
+        rows = self._reader().execute('''
+            SELECT message_type, content, timestamp
+            FROM messages
+            WHERE session_id = ?
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (session_id, limit)).fetchall()
+        return [{'type': row[0], 'content': row[1], 'timestamp': row[2]} for row in reversed(rows)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'pending': self.pending}
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Sharded orchestrator - spreads tab sessions over worker processes behind a consistent-hash router
+
+Each worker process runs its own SimpleOrchestrator and owns the Claude
+processes of the tabs placed on it; the parent exposes the same interface
+the web layer already uses, so it can stand in for orchestrator_simple_v2.
+"""
+import bisect
+import hashlib
+import itertools
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+from concurrent.futures import CancelledError, Future
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from event_bus import SOURCE as EVENT_SOURCE
+from session_registry import SessionRegistry
+from voice_logging import get_logger, setup_logging
+
+log = get_logger('shards')
+
+RING_REPLICAS = 64  # Virtual nodes per worker; more gives a more even spread
+
+# Orchestrator methods a worker runs on the parent's behalf
+REMOTE_METHODS = {'create_session', 'get_session_info', 'cancel', 'switch_tab', 'cleanup_session',
+                  'get_queue_info', 'list_active_sessions'}
+
+
+class ShardError(Exception):
+    """Raised when a worker process dies with requests outstanding"""
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hashing: adding or removing a node only moves the keys that land on it"""
+
+    def __init__(self, replicas: int = RING_REPLICAS):
+        self.replicas = replicas
+        self.points: List[int] = []
+        self.owners: Dict[int, int] = {}  # point -> node
+
+    def add(self, node: int):
+        for replica in range(self.replicas):
+            point = _hash(f'shard-{node}#{replica}')
+            self.owners[point] = node
+            bisect.insort(self.points, point)
+
+    def remove(self, node: int):
+        self.points = [p for p in self.points if self.owners[p] != node]
+        self.owners = {p: n for p, n in self.owners.items() if n != node}
+
+    def nodes_for(self, key: str) -> Iterator[int]:
+        """Distinct nodes in ring order starting at key's position (first = owner)"""
+        if not self.points:
+            return
+        seen = set()
+        start = bisect.bisect(self.points, _hash(key))
+        for i in range(len(self.points)):
+            node = self.owners[self.points[(start + i) % len(self.points)]]
+            if node not in seen:
+                seen.add(node)
+                yield node
+
+
+@dataclass
+class RemoteSession:
+    """Parent-side record of a tab's session (the BotSession itself stays in its worker)"""
+    session_id: str
+    tab_id: str
+    project_name: str
+    shard: int
+
+
+@dataclass
+class RemoteTurn:
+    """Parent-side handle for a QueuedTurn living in a worker"""
+    tab_id: str
+    turn_id: int
+    shard: int
+    on_chunk: Optional[Callable[[str], None]] = None
+    on_reset: Optional[Callable[[], None]] = None
+    status: str = 'queued'
+    session_id: Optional[str] = None
+    error: Optional[BaseException] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+
+class _Shard:
+    """One worker process and the parent's end of its socket"""
+
+    def __init__(self, index: int):
+        self.index = index
+        parent_sock, child_sock = socket.socketpair()
+        with child_sock:
+            self.process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), 'worker', str(child_sock.fileno()), str(index)],
+                pass_fds=(child_sock.fileno(),),
+                # Events the worker publishes count as this process's own
+                env={**os.environ, 'VOICE_EVENT_SOURCE': EVENT_SOURCE})
+        self.conn = Connection(parent_sock.detach())
+        self.send_lock = threading.Lock()
+        self.pending: Dict[int, Future] = {}
+        self.turns: Dict[int, RemoteTurn] = {}
+        self.capacity: Optional[int] = None  # Worker's max_sessions, reported once it is up
+        self.alive = True
+
+    def send(self, message: tuple):
+        with self.send_lock:
+            self.conn.send(message)
+
+
+class ShardedOrchestrator:
+    """
+    Routes each tab to one of N worker processes.
+
+    A tab's shard is picked by consistent hashing on its tab_id when its
+    session is created and stays put afterwards; if that shard is full the
+    next one around the ring takes it. Adding a worker therefore never moves
+    a live session. Chunks, turn completions and finished responses are
+    pushed back from the workers, so the parent never polls them.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.shards: Dict[int, _Shard] = {}
+        self.ring = HashRing()
+        self.placements: Dict[str, int] = {}  # tab_id -> shard index
+        self.sessions: SessionRegistry = SessionRegistry()
+        self.response_channels: Dict[str, queue.Queue] = {}
+        self.active_tab_id: Optional[str] = None
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        for _ in range(workers):
+            self.add_worker()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def add_worker(self) -> int:
+        """Start one more worker process; new tabs start landing on it"""
+        with self.lock:
+            index = max(self.shards, default=-1) + 1
+            self._start(index)
+        log.info("Started shard %d (%d workers)", index, len(self.shards))
+        return index
+
+    def _start(self, index: int):
+        shard = _Shard(index)
+        self.shards[index] = shard
+        self.ring.add(index)
+        threading.Thread(target=self._read_loop, args=(shard,), name=f'shard-{index}', daemon=True).start()
+
+    def _read_loop(self, shard: _Shard):
+        try:
+            while True:
+                self._handle(shard, shard.conn.recv())
+        except (EOFError, OSError):
+            pass
+        shard.conn.close()
+        if shard.alive:
+            self._shard_died(shard)
+
+    def _handle(self, shard: _Shard, message: tuple):
+        kind = message[0]
+        if kind == 'ready':
+            shard.capacity = message[1]
+        elif kind == 'result':
+            _, request_id, value, error = message
+            future = shard.pending.pop(request_id, None)
+            if future is not None:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(value)
+        elif kind == 'chunk':
+            _, turn_id, text = message
+            turn = shard.turns.get(turn_id)
+            if turn is not None and turn.on_chunk:
+                try:
+                    turn.on_chunk(text)
+                except Exception as e:
+                    log.error("Chunk callback for tab %s failed: %s", turn.tab_id, e)
+        elif kind == 'reset':
+            _, turn_id = message
+            turn = shard.turns.get(turn_id)
+            if turn is not None and turn.on_reset:
+                try:
+                    turn.on_reset()
+                except Exception as e:
+                    log.error("Reset callback for tab %s failed: %s", turn.tab_id, e)
+        elif kind == 'turn':
+            _, turn_id, status, session_id, error = message
+            turn = shard.turns.pop(turn_id, None)
+            if turn is not None:
+                turn.status, turn.session_id, turn.error = status, session_id, error
+                turn.done.set()
+        elif kind == 'response':
+            _, tab_id, text = message
+            channel = self.response_channels.get(tab_id)
+            if channel is not None:
+                channel.put(text)
+        elif kind == 'closed':
+            # The tab's session was cleaned up on the worker; shards never evict tabs
+            with self.lock:
+                if self.placements.get(message[1]) == shard.index:
+                    self._forget(message[1])
+
+    def _shard_died(self, shard: _Shard):
+        """Fail everything waiting on a dead worker, drop its tabs and start a replacement"""
+        shard.alive = False
+        try:
+            code = shard.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            code = None
+        log.error("Shard %d exited (code %s); restarting it", shard.index, code)
+        error = ShardError(f"Shard {shard.index} exited")
+        for future in list(shard.pending.values()):
+            future.set_exception(error)
+        for turn in list(shard.turns.values()):
+            turn.status, turn.error = 'error', error
+            turn.done.set()
+        with self.lock:
+            lost = [tab_id for tab_id, index in self.placements.items() if index == shard.index]
+            for tab_id in lost:
+                self._forget(tab_id)
+            if self.shards.get(shard.index) is shard:
+                self.ring.remove(shard.index)
+                self._start(shard.index)
+
+    def _forget(self, tab_id: str):
+        self.placements.pop(tab_id, None)
+        self.sessions.pop(tab_id, None)
+        channel = self.response_channels.pop(tab_id, None)
+        if channel is not None:
+            channel.put(None)  # Ends the tab's capture thread
+
+    def close(self):
+        for shard in list(self.shards.values()):
+            shard.alive = False
+            shard.process.terminate()  # The reader thread sees EOF and closes the connection
+            try:
+                shard.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                shard.process.kill()
+        self.shards.clear()
+
+    # ------------------------------------------------------------------
+    # RPC
+    # ------------------------------------------------------------------
+
+    @property
+    def max_sessions(self) -> int:
+        """Tabs the running shards can hold together (0 until they have reported)"""
+        return sum(shard.capacity or 0 for shard in self.shards.values() if shard.alive)
+
+    def _call(self, index: int, method: str, *args, timeout: Optional[float] = 60.0, **kwargs) -> Any:
+        shard = self.shards[index]
+        request_id = next(self.ids)
+        future: Future = Future()
+        shard.pending[request_id] = future
+        try:
+            shard.send(('call', request_id, method, args, kwargs))
+        except OSError as e:
+            shard.pending.pop(request_id, None)
+            raise ShardError(f"Shard {index} unreachable: {e}")
+        return future.result(timeout)
+
+    def _shard_of(self, tab_id: str) -> Optional[int]:
+        return self.placements.get(tab_id)
+
+    def _candidates(self, tab_id: str) -> List[int]:
+        """Shards to try for a new tab: ring order, those with room first"""
+        load: Dict[int, int] = {}
+        for index in self.placements.values():
+            load[index] = load.get(index, 0) + 1
+        ring = list(self.ring.nodes_for(tab_id))
+        with_room = [index for index in ring
+                     if self.shards[index].capacity is None or load.get(index, 0) < self.shards[index].capacity]
+        # All full: a shard at its cap refuses the tab, so the full ones are only
+        # tried to surface that error to the caller, as a single orchestrator would
+        return with_room + [index for index in ring if index not in with_room]
+
+    # ------------------------------------------------------------------
+    # Orchestrator interface
+    # ------------------------------------------------------------------
+
+    def create_session(self, tab_id: str, project_name: str) -> RemoteSession:
+        """Create the tab's session on its shard (or the next one with room)"""
+        index = self._shard_of(tab_id)
+        if index is None:
+            candidates = self._candidates(tab_id)
+            if not candidates:
+                raise ShardError("No shards running")
+            index = candidates[0]
+        session = RemoteSession(shard=index, **self._call(index, 'create_session', tab_id, project_name))
+        with self.lock:
+            self.placements[tab_id] = index
+            self.sessions[tab_id] = session
+            self.response_channels.setdefault(tab_id, queue.Queue())
+        log.info("Tab %s on shard %d (%d tabs)", tab_id, index, len(self.placements))
+        return session
+
+    def submit_message(self, tab_id: str, message: str,
+                       on_chunk: Optional[Callable[[str], None]] = None,
+                       preempt: bool = False,
+                       on_reset: Optional[Callable[[], None]] = None) -> RemoteTurn:
+        """Queue a message on the tab's shard; returns a handle for wait_for_turn"""
+        index = self._shard_of(tab_id)
+        if index is None:
+            self.create_session(tab_id, f"Tab {tab_id}")
+            index = self._shard_of(tab_id)
+        shard = self.shards[index]
+        # Registered before the call: the worker may stream chunks before its reply arrives
+        turn = RemoteTurn(tab_id=tab_id, turn_id=next(self.ids), shard=index, on_chunk=on_chunk, on_reset=on_reset)
+        shard.turns[turn.turn_id] = turn
+        try:
+            turn_id = self._call(index, 'submit', tab_id, message, turn.turn_id, on_chunk is not None, preempt)
+        except Exception:
+            shard.turns.pop(turn.turn_id, None)
+            raise
+        if turn_id != turn.turn_id:
+            # Merged into a turn that had not started yet
+            shard.turns.pop(turn.turn_id, None)
+            turn = shard.turns.get(turn_id, turn)
+        return turn
+
+    def wait_for_turn(self, turn: RemoteTurn, timeout: Optional[float] = None) -> str:
+        """Block until a submitted turn has run and return the tab's session_id"""
+        if not turn.done.wait(timeout):
+            raise TimeoutError(f"Turn for tab {turn.tab_id} still {turn.status} after {timeout}s")
+        if turn.status == 'cancelled':
+            raise CancelledError(f"Turn for tab {turn.tab_id} was cancelled")
+        if turn.error is not None:
+            raise turn.error
+        return turn.session_id
+
+    def route_message(self, tab_id: str, message: str,
+                      on_chunk: Optional[Callable[[str], None]] = None,
+                      on_reset: Optional[Callable[[], None]] = None) -> str:
+        return self.wait_for_turn(self.submit_message(tab_id, message, on_chunk=on_chunk, on_reset=on_reset))
+
+    def wait_for_response(self, tab_id: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Block until the tab's shard pushes a finished response (None once the tab is gone)"""
+        channel = self.response_channels.get(tab_id)
+        if channel is None:
+            return None
+        try:
+            return channel.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def cancel(self, tab_id: str, include_queued: bool = True) -> int:
+        index = self._shard_of(tab_id)
+        return self._call(index, 'cancel', tab_id, include_queued) if index is not None else 0
+
+    def get_session_info(self, tab_id: str) -> Optional[dict]:
+        index = self._shard_of(tab_id)
+        return self._call(index, 'get_session_info', tab_id) if index is not None else None
+
+    def get_queue_info(self, tab_id: str) -> dict:
+        index = self._shard_of(tab_id)
+        return self._call(index, 'get_queue_info', tab_id) if index is not None else {}
+
+    def switch_tab(self, tab_id: str):
+        if self._shard_of(tab_id) is None:
+            self.create_session(tab_id, f"Tab {tab_id}")
+        self.active_tab_id = tab_id
+
+    def cleanup_session(self, tab_id: str):
+        index = self._shard_of(tab_id)
+        if index is None:
+            return
+        try:
+            self._call(index, 'cleanup_session', tab_id)
+        finally:
+            with self.lock:
+                self._forget(tab_id)
+
+    def list_active_sessions(self) -> list:
+        """Session info for every tab, one round trip per shard"""
+        infos = []
+        for index in set(self.placements.values()):
+            try:
+                infos.extend(info for info in self._call(index, 'list_active_sessions', timeout=5)
+                             if info and self.placements.get(info['tab_id']) == index)
+            except Exception as e:
+                log.warning("Shard %d did not report its sessions: %s", index, e)
+        return infos
+
+    def get_shard_stats(self) -> Dict[int, dict]:
+        """Per-worker placement counts and liveness"""
+        counts: Dict[int, int] = {}
+        for index in self.placements.values():
+            counts[index] = counts.get(index, 0) + 1
+        return {index: {'pid': shard.process.pid, 'alive': shard.alive and shard.process.poll() is None,
+                        'tabs': counts.get(index, 0)}
+                for index, shard in self.shards.items()}
+
+
+# ----------------------------------------------------------------------
+# Worker process
+# ----------------------------------------------------------------------
+
+def _portable(error: BaseException) -> BaseException:
+    """An exception that survives pickling back to the parent"""
+    if isinstance(error, (CancelledError, TimeoutError)):
+        return type(error)(str(error))
+    return error if type(error).__module__ == 'builtins' else RuntimeError(str(error))
+
+
+def run_worker(fd: int, index: int):
+    """Serve one parent connection with a private SimpleOrchestrator"""
+    setup_logging()
+    from orchestrator_simple_v2 import orchestrator
+
+    conn = Connection(fd)
+    send_lock = threading.Lock()
+    turn_ids: Dict[int, int] = {}  # id(QueuedTurn) -> parent's turn id
+    forwarders: Dict[str, threading.Thread] = {}
+
+    def send(message: tuple):
+        with send_lock:
+            conn.send(message)
+
+    def forward_responses(tab_id: str):
+        while True:
+            response = orchestrator.wait_for_response(tab_id)
+            if response is None:
+                if tab_id in orchestrator.sessions:
+                    continue  # Recreated in place; follow the new channel
+                forwarders.pop(tab_id, None)
+                send(('closed', tab_id))
+                return
+            send(('response', tab_id, response))
+
+    def follow_turn(turn, turn_id: int):
+        turn.done.wait()
+        turn_ids.pop(id(turn), None)
+        send(('turn', turn_id, turn.status, turn.session_id,
+              _portable(turn.error) if turn.error is not None else None))
+
+    def submit(tab_id: str, message: str, turn_id: int, stream: bool, preempt: bool) -> int:
+        on_chunk = (lambda text: send(('chunk', turn_id, text))) if stream else None
+        on_reset = (lambda: send(('reset', turn_id))) if stream else None
+        turn = orchestrator.submit_message(tab_id, message, on_chunk=on_chunk, preempt=preempt, on_reset=on_reset)
+        if id(turn) in turn_ids:
+            return turn_ids[id(turn)]  # Merged into a turn that has not started yet
+        turn_ids[id(turn)] = turn_id
+        threading.Thread(target=follow_turn, args=(turn, turn_id), daemon=True).start()
+        return turn_id
+
+    def handle(request_id: int, method: str, args: tuple, kwargs: dict):
+        try:
+            if method == 'submit':
+                value = submit(*args)
+            elif method == 'create_session':
+                # Plain data only: unpickling a BotSession would import orchestrator_simple_v2 in the parent
+                session = orchestrator.create_session(*args, **kwargs)
+                value = {'session_id': session.session_id, 'tab_id': session.tab_id,
+                         'project_name': session.project_name}
+                if args[0] not in forwarders:
+                    forwarders[args[0]] = threading.Thread(target=forward_responses, args=(args[0],), daemon=True)
+                    forwarders[args[0]].start()
+            elif method in REMOTE_METHODS:
+                value = getattr(orchestrator, method)(*args, **kwargs)
+            else:
+                raise ValueError(f"Unknown method {method}")
+            send(('result', request_id, value, None))
+        except Exception as e:
+            send(('result', request_id, None, _portable(e)))
+
+    send(('ready', orchestrator.max_sessions))
+    log.info("Shard %d ready (pid %d)", index, os.getpid())
+    try:
+        while True:
+            _, request_id, method, args, kwargs = conn.recv()
+            if method == 'submit':
+                # Only queues the turn; handled in arrival order to keep each tab's turns FIFO
+                handle(request_id, method, args, kwargs)
+                continue
+            # Calls such as create_session can take seconds; keep reading meanwhile
+            threading.Thread(target=handle, args=(request_id, method, args, kwargs), daemon=True).start()
+    except (EOFError, OSError):
+        log.info("Shard %d: parent went away, exiting", index)
+
+
+if __name__ == '__main__' and len(sys.argv) == 4 and sys.argv[1] == 'worker':
+    run_worker(int(sys.argv[2]), int(sys.argv[3]))
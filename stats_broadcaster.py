@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Realtime stats broadcaster - one thread publishing batched, change-only tab stats to subscribed clients
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set
+from voice_logging import get_logger, LogSampler, HOT_PATH_DEBUG
+
+log = get_logger('stats')
+
+ALL_TABS = '*'
+
+
+class StatsBroadcaster:
+    """
+    Publishes per-tab request stats for every tab from a single thread.
+
+    Each tick reads all tabs through read_stats(), keeps only the tabs whose
+    stats changed since the last emit, and sends one batched payload
+    ({'tabs': {tab_id: stats}, 'timestamp': ...}) to each subscriber,
+    filtered to the tabs it subscribed to. A full snapshot goes out every
+    idle_interval regardless, so clients resync after a missed event. With
+    no subscribers the thread sleeps.
+    """
+
+    def __init__(self, read_stats: Callable[[], Dict[str, dict]],
+                 emit: Callable[[dict, str], None],
+                 interval: float = 0.5, idle_interval: float = 10.0):
+        self.read_stats = read_stats  # () -> {tab_id: stats}
+        self.emit = emit  # emit(payload, sid)
+        self.interval = interval
+        self.idle_interval = idle_interval
+
+        self.subscribers: Dict[str, Set[str]] = {}  # sid -> tab_ids (or {ALL_TABS})
+        self.last_sent: Dict[str, tuple] = {}  # tab_id -> last emitted stats
+        self.last_full = 0.0
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.stats = {'ticks': 0, 'emits': 0, 'skipped': 0}
+        self.sampler = LogSampler()  # Errors inside the tick loop log at most every 10s
+
+    def start(self):
+        """Start the broadcaster thread if it is not running"""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._loop, name='stats-broadcaster', daemon=True)
+            self.thread.start()
+        log.info("Broadcaster started (interval=%ss, idle_interval=%ss)", self.interval, self.idle_interval)
+
+    def subscribe(self, sid: str, tab_ids: Optional[Iterable[str]] = None):
+        """Send a client stats for tab_ids (all tabs if None), starting with a snapshot"""
+        tabs = set(tab_ids) if tab_ids is not None else {ALL_TABS}
+        with self.lock:
+            self.subscribers[sid] = tabs
+        self.start()
+
+        snapshot = self._filter(self._read(), tabs)
+        if snapshot:
+            self._send(snapshot, sid)
+        self.wake.set()
+
+    def unsubscribe(self, sid: str):
+        with self.lock:
+            self.subscribers.pop(sid, None)
+
+    @staticmethod
+    def _fingerprint(stats: dict) -> tuple:
+        # Rounded so sub-display jitter does not count as a change
+        return (round(stats.get('duration', 0), 1), stats.get('tokens', 0), stats.get('is_processing', False))
+
+    def _read(self) -> Dict[str, dict]:
+        tabs = {}
+        for tab_id, info in self.read_stats().items():
+            if info:
+                tabs[tab_id] = {
+                    'duration': info.get('duration', 0),
+                    'tokens': info.get('tokens', 0),
+                    'is_processing': info.get('is_processing', False)
+                }
+        return tabs
+
+    @staticmethod
+    def _filter(tabs: Dict[str, dict], wanted: Set[str]) -> Dict[str, dict]:
+        if ALL_TABS in wanted:
+            return tabs
+        return {tab_id: stats for tab_id, stats in tabs.items() if tab_id in wanted}
+
+    def _send(self, tabs: Dict[str, dict], sid: str):
+        try:
+            self.emit({'tabs': tabs, 'timestamp': time.time()}, sid)
+            self.stats['emits'] += 1
+        except Exception as e:
+            self.sampler.log(log, logging.ERROR, f'emit:{sid}', "Emit to %s failed: %s", sid, e)
+
+    def _tick(self):
+        self.stats['ticks'] += 1
+        with self.lock:
+            subscribers = {sid: set(tabs) for sid, tabs in self.subscribers.items()}
+        if not subscribers:
+            return
+
+        tabs = self._read()
+        now = time.time()
+        if now - self.last_full >= self.idle_interval:
+            changed = tabs
+            self.last_full = now
+        else:
+            changed = {tab_id: stats for tab_id, stats in tabs.items()
+                       if self.last_sent.get(tab_id) != self._fingerprint(stats)}
+        self.last_sent = {tab_id: self._fingerprint(stats) for tab_id, stats in tabs.items()}
+
+        if not changed:
+            self.stats['skipped'] += 1
+            return
+        if HOT_PATH_DEBUG:
+            log.debug("Tick: %d changed tab(s) for %d subscriber(s)", len(changed), len(subscribers))
+        for sid, wanted in subscribers.items():
+            payload = self._filter(changed, wanted)
+            if payload:
+                self._send(payload, sid)
+
+    def _loop(self):
+        while True:
+            with self.lock:
+                idle = not self.subscribers
+            if idle:
+                # Nobody is listening - sleep until someone subscribes
+                self.wake.wait()
+            self.wake.clear()
+            try:
+                self._tick()
+            except Exception as e:
+                self.sampler.log(log, logging.ERROR, 'tick', "Broadcast error: %s", e)
+            self.wake.wait(self.interval)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {**self.stats, 'subscribers': len(self.subscribers)}
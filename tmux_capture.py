@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Incremental tmux pane capture - returns only the lines added since the last read
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+from tmux_client import tmux_client
+
+
+@dataclass
+class PaneCursor:
+    """Read position for one tmux target"""
+    target: str
+    next_line: int = 0  # Absolute line index (history + screen) of the next unread line
+    history_limit: int = 0
+    history_size: int = 0  # At the previous read; it only shrinks when tmux drops lines
+    tail: Deque[str] = field(default_factory=lambda: deque(maxlen=8))  # Last lines returned, used as a resync anchor
+    lines_read: int = 0
+    resyncs: int = 0
+
+
+class IncrementalPaneCapture:
+    """
+    Tracks a per-target cursor into tmux scrollback.
+
+    The absolute position of a line is history_size + its screen row, so
+    everything between the previous cursor and the current cursor row is new
+    output. Only that range is passed to capture-pane, which keeps subprocess
+    output and caller CPU proportional to new output rather than scrollback.
+    """
+
+    def __init__(self, live_lines: int = 0, backlog: int = 500):
+        # Lines directly above the cursor that a TUI may still redraw (spinner,
+        # input box border). They are held back until they scroll further up.
+        self.live_lines = live_lines
+        # How much existing scrollback the first read of a target returns
+        self.backlog = backlog
+        self.cursors: Dict[str, PaneCursor] = {}
+        self.lock = threading.Lock()
+
+    def _tmux(self, *args: str) -> Optional[str]:
+        """Run a tmux command and return its stdout, or None on failure"""
+        return tmux_client.run(*args)
+
+    def _pane_state(self, target: str) -> Optional[Tuple[int, int, int]]:
+        """Return (history_size, history_limit, committed_row) for a target"""
+        output = self._tmux('display-message', '-p', '-t', target,
+                            '#{history_size} #{history_limit} #{cursor_y}')
+        if not output:
+            return None
+
+        try:
+            history_size, history_limit, cursor_y = (int(v) for v in output.split())
+        except ValueError:
+            return None
+
+        # Rows above the cursor (minus the live window) are complete
+        return history_size, history_limit, cursor_y - self.live_lines
+
+    def _capture(self, target: str, start: int, end: int) -> List[str]:
+        """Capture screen-relative rows start..end inclusive"""
+        if end < start:
+            # tmux swaps a reversed range instead of returning nothing
+            return []
+        output = self._tmux('capture-pane', '-p', '-t', target, '-S', str(start), '-E', str(end))
+        if output is None:
+            return []
+        lines = output.split('\n')
+        if lines and lines[-1] == '':
+            lines.pop()
+        return lines
+
+    def _resync(self, cursor: PaneCursor, history_size: int, row: int) -> List[str]:
+        """Recover the read position after scrollback was trimmed or cleared.
+
+        Once history is trimmed the absolute index no longer lines up, so the
+        last returned lines are searched for in a window above the cursor.
+        Without a match, only lines past where the cursor can be at the
+        earliest are returned: some output may be skipped, none repeated.
+        """
+        cursor.resyncs += 1
+        anchor = list(cursor.tail)
+        window: List[str] = []
+        start = row
+
+        # Try a small window first; busy panes rarely move more than a screen between reads
+        for size in (64, self.backlog):
+            start = max(-history_size, row - size)
+            window = self._capture(cursor.target, start, row - 1)
+            if not anchor:
+                break
+            for i in range(len(window) - len(anchor), -1, -1):
+                if window[i:i + len(anchor)] == anchor:
+                    return window[i + len(anchor):]
+
+        # At least this many lines left history since the last read
+        dropped = max(0, cursor.history_size - history_size)
+        cursor.tail.clear()  # What follows is no longer contiguous with it
+        return window[max(0, cursor.next_line - dropped - history_size - start):]
+
+    def _read_verified(self, cursor: PaneCursor, history_size: int, row: int) -> Optional[List[str]]:
+        """New lines at the cursor's position, or None if the lines before it moved.
+
+        Captures the last returned lines along with the new ones: if they are
+        still where the cursor says, nothing was dropped from history.
+        """
+        anchor = list(cursor.tail)
+        start = cursor.next_line - history_size - len(anchor)
+        if start < -history_size:
+            return None  # The anchor itself has left history
+        lines = self._capture(cursor.target, start, row - 1)
+        if lines[:len(anchor)] != anchor:
+            return None
+        return lines[len(anchor):]
+
+    def read_new_lines(self, target: str) -> List[str]:
+        """Return the complete lines written to target since the previous call"""
+        state = self._pane_state(target)
+        if state is None:
+            return []
+        history_size, history_limit, row = state
+        current = history_size + row  # Absolute index of the first uncommitted line
+
+        with self.lock:
+            cursor = self.cursors.get(target)
+            if cursor is None:
+                cursor = PaneCursor(target=target,
+                                    next_line=max(0, current - self.backlog),
+                                    history_limit=history_limit)
+                self.cursors[target] = cursor
+
+            if current == cursor.next_line:
+                return []
+
+            # tmux drops the oldest 10% of history whenever it hits the limit,
+            # after which absolute indices shift. Below the limit they cannot
+            # have; at it, the lines before the cursor show whether they did.
+            lines = None
+            if current >= cursor.next_line and history_size >= cursor.history_size:
+                if history_size < history_limit - history_limit // 10 - 1:
+                    lines = self._capture(target, cursor.next_line - history_size, row - 1)
+                else:
+                    lines = self._read_verified(cursor, history_size, row)
+            if lines is None:
+                lines = self._resync(cursor, history_size, row)
+
+            cursor.next_line = current
+            cursor.history_limit = history_limit
+            cursor.history_size = history_size
+            cursor.lines_read += len(lines)
+            cursor.tail.extend(lines)
+            return lines
+
+    def iter_new_lines(self, target: str, poll_interval: float = 0.2,
+                       stop_event: Optional[threading.Event] = None) -> Iterator[str]:
+        """Yield new lines from target as they are committed.
+
+        Idle polls cost a single display-message call; capture-pane only runs
+        when the cursor has moved.
+        """
+        while stop_event is None or not stop_event.is_set():
+            lines = self.read_new_lines(target)
+            for line in lines:
+                yield line
+            if not lines:
+                time.sleep(poll_interval)
+
+    def skip_to_end(self, target: str):
+        """Mark everything currently in the pane as read"""
+        state = self._pane_state(target)
+        if state is None:
+            return
+        history_size, history_limit, row = state
+        with self.lock:
+            cursor = self.cursors.setdefault(target, PaneCursor(target=target))
+            cursor.next_line = history_size + row
+            cursor.history_limit = history_limit
+            cursor.history_size = history_size
+            cursor.tail.clear()
+            cursor.tail.extend(self._capture(target, row - cursor.tail.maxlen, row - 1))
+
+    def forget(self, target: str):
+        """Drop the cursor for a target (e.g. when its session is killed)"""
+        with self.lock:
+            self.cursors.pop(target, None)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """Per-target read counters"""
+        with self.lock:
+            return {
+                target: {
+                    'next_line': c.next_line,
+                    'lines_read': c.lines_read,
+                    'resyncs': c.resyncs
+                }
+                for target, c in self.cursors.items()
+            }
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Shared tmux client - one persistent control-mode (tmux -C) connection for all
+send-keys / capture-pane traffic instead of a fork+exec per command
+"""
+import re
+import subprocess
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+CONTROL_SESSION = '_tmux_client'
+
+# %output payloads escape control characters and backslashes as \ooo
+OCTAL_ESCAPE = re.compile(rb'\\([0-7]{3})')
+
+
+class TmuxError(Exception):
+    """Raised when tmux reports %error for a command"""
+
+
+class _PendingCommand:
+    """A command written to the control connection, waiting for its %end/%error"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.lines: List[str] = []
+        self.error = False
+
+
+def quote(arg: str) -> str:
+    """Quote an argument for the tmux command parser"""
+    if arg and re.fullmatch(r'[A-Za-z0-9_@%:.,+=/-]+', arg):
+        return arg
+    escaped = (arg.replace('\\', '\\\\')
+                  .replace('"', '\\"')
+                  .replace('$', '\\$')
+                  .replace('\n', '\\n')
+                  .replace('\r', '\\r')
+                  .replace('\t', '\\t'))
+    return f'"{escaped}"'
+
+
+class TmuxClient:
+    """
+    Multiplexes tmux commands over a single `tmux -C` connection.
+
+    Commands are written as lines and answered in order with
+    %begin/%end (or %error) blocks, so a FIFO of pending commands is enough to
+    match replies. Panes whose window is linked into the control session also
+    deliver %output notifications, which subscribers receive as they arrive.
+    If the control connection cannot be started, commands fall back to
+    spawning tmux directly.
+    """
+
+    def __init__(self, control_session: str = CONTROL_SESSION):
+        self.control_session = control_session
+        self.process: Optional[subprocess.Popen] = None
+        self.reader_thread: Optional[threading.Thread] = None
+        self.pending: Deque[_PendingCommand] = deque()
+        self.write_lock = threading.Lock()  # Keeps write order == pending order
+        self.pending_lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.subscribers: Dict[str, List[Callable[[str, str], None]]] = {}  # pane_id -> callbacks
+        self.linked_windows: Dict[str, str] = {}  # pane_id -> window_id
+        self.control_failed = False
+        self.session_ready = threading.Event()  # Set once tmux answers the implicit new-session
+        self.stats = {'control_commands': 0, 'fallback_commands': 0, 'output_events': 0}
+
+    # ------------------------------------------------------------------
+    # Connection management
+    # ------------------------------------------------------------------
+
+    def is_connected(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> bool:
+        """Open the control-mode connection if it is not already open"""
+        with self.start_lock:
+            if self.is_connected():
+                return True
+            if self.control_failed:
+                return False
+
+            try:
+                # ignore-size keeps the control client from resizing linked windows
+                self.process = subprocess.Popen(
+                    ['tmux', '-C', 'new-session', '-A', '-s', self.control_session, '-f', 'ignore-size'],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL
+                )
+            except (FileNotFoundError, OSError) as e:
+                print(f"[TMUX CLIENT] Control mode unavailable, using subprocess fallback: {e}")
+                self.control_failed = True
+                return False
+
+            # The implicit new-session reply arrives before any of ours; it is
+            # flagged 0 and skipped by the reader
+            self.session_ready.clear()
+            self.reader_thread = threading.Thread(target=self._read_loop, daemon=True)
+            self.reader_thread.start()
+            # Commands sent before that reply can run before the control
+            # session exists, and link-window into it would fail
+            self.session_ready.wait(2.0)
+            print(f"[TMUX CLIENT] Control connection open (session {self.control_session})")
+
+        try:
+            # Remove the helper session once nothing is attached to it
+            self.command('set-option', '-t', self.control_session, 'destroy-unattached', 'on')
+        except TmuxError:
+            pass
+        return True
+
+    def close(self):
+        """Close the control connection"""
+        process = self.process
+        if not process:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=2)
+        except Exception:
+            process.kill()
+        self.process = None
+
+    def _read_loop(self):
+        """Parse control-mode output: command replies and notifications"""
+        current: Optional[_PendingCommand] = None
+        in_block = False
+        saw_reply = False
+        stdout = self.process.stdout
+
+        for raw in iter(stdout.readline, b''):
+            line = raw.rstrip(b'\n')
+
+            if in_block:
+                if line.startswith(b'%end ') or line.startswith(b'%error '):
+                    in_block = False
+                    if current is None:
+                        self.session_ready.set()
+                    else:
+                        current.error = line.startswith(b'%error ')
+                        current.done.set()
+                        current = None
+                elif current is not None:
+                    current.lines.append(line.decode('utf-8', errors='replace'))
+                continue
+
+            if line.startswith(b'%begin '):
+                in_block = True
+                saw_reply = True
+                # Only blocks flagged 1 answer commands written by this client
+                parts = line.split()
+                if len(parts) >= 4 and parts[3] == b'1':
+                    with self.pending_lock:
+                        current = self.pending.popleft() if self.pending else None
+                continue
+
+            if line.startswith(b'%output '):
+                self._dispatch_output(line)
+
+        if not saw_reply:
+            # tmux exited before answering anything (e.g. too old for -C flags)
+            print("[TMUX CLIENT] Control connection failed, using subprocess fallback")
+            self.control_failed = True
+
+        # Connection closed - release anyone still waiting
+        self.session_ready.set()
+        with self.pending_lock:
+            while self.pending:
+                cmd = self.pending.popleft()
+                cmd.error = True
+                cmd.lines = ['tmux control connection closed']
+                cmd.done.set()
+
+    def _dispatch_output(self, line: bytes):
+        """Deliver a %output notification to the pane's subscribers"""
+        try:
+            _, pane_id, payload = line.split(b' ', 2)
+        except ValueError:
+            return
+        callbacks = self.subscribers.get(pane_id.decode())
+        if not callbacks:
+            return
+
+        self.stats['output_events'] += 1
+        text = OCTAL_ESCAPE.sub(lambda m: bytes([int(m.group(1), 8)]), payload)
+        text = text.decode('utf-8', errors='replace')
+        for callback in list(callbacks):
+            try:
+                callback(pane_id.decode(), text)
+            except Exception as e:
+                print(f"[TMUX CLIENT] Output subscriber error: {e}")
+
+    # ------------------------------------------------------------------
+    # Commands
+    # ------------------------------------------------------------------
+
+    def _fallback(self, *args: str) -> List[str]:
+        """Run a command by spawning tmux (control mode unavailable)"""
+        self.stats['fallback_commands'] += 1
+        result = subprocess.run(['tmux', *args], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise TmuxError(result.stderr.strip() or f"tmux {args[0]} failed")
+        output = result.stdout
+        if output.endswith('\n'):
+            output = output[:-1]
+        return output.split('\n') if output else []
+
+    def commands(self, *command_lists: List[str], timeout: float = 5.0) -> List[List[str]]:
+        """Send several commands in a single write and wait for all replies"""
+        if not self.start():
+            return [self._fallback(*args) for args in command_lists]
+
+        pending = [_PendingCommand() for _ in command_lists]
+        payload = ''.join(' '.join(quote(a) for a in args) + '\n' for args in command_lists)
+
+        with self.write_lock:
+            with self.pending_lock:
+                self.pending.extend(pending)
+            try:
+                self.process.stdin.write(payload.encode('utf-8'))
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError, AttributeError):
+                with self.pending_lock:
+                    for cmd in pending:
+                        if cmd in self.pending:
+                            self.pending.remove(cmd)
+                self.process = None
+                return [self._fallback(*args) for args in command_lists]
+
+        self.stats['control_commands'] += len(pending)
+        results = []
+        for args, cmd in zip(command_lists, pending):
+            if not cmd.done.wait(timeout):
+                raise TmuxError(f"Timed out waiting for tmux {args[0]}")
+            if cmd.error:
+                raise TmuxError('\n'.join(cmd.lines) or f"tmux {args[0]} failed")
+            results.append(cmd.lines)
+        return results
+
+    def command(self, *args: str, timeout: float = 5.0) -> List[str]:
+        """Run one tmux command and return its output lines"""
+        return self.commands(list(args), timeout=timeout)[0]
+
+    def run(self, *args: str) -> Optional[str]:
+        """Drop-in for subprocess.run(['tmux', ...]).stdout - None on error"""
+        try:
+            lines = self.command(*args)
+        except TmuxError:
+            return None
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def send_keys(self, target: str, *keys: str, literal: bool = False):
+        """send-keys to a target"""
+        args = ['send-keys', '-t', target]
+        if literal:
+            args.append('-l')
+        self.command(*args, *keys)
+
+    def send_text(self, target: str, text: str, enter: bool = True, clear_line: bool = False):
+        """Type text into a pane, optionally clearing the line first and pressing Enter.
+
+        All keystrokes go out in one write rather than one tmux process each.
+        """
+        batch = []
+        if clear_line:
+            batch.append(['send-keys', '-t', target, 'C-u'])
+        batch.append(['send-keys', '-t', target, '-l', text])
+        if enter:
+            batch.append(['send-keys', '-t', target, 'Enter'])
+        self.commands(*batch)
+
+    def capture_pane(self, target: str, start: Optional[int] = None, end: Optional[int] = None) -> Optional[str]:
+        """capture-pane -p for a target, None if the target does not exist"""
+        args = ['capture-pane', '-p', '-t', target]
+        if start is not None:
+            args += ['-S', str(start)]
+        if end is not None:
+            args += ['-E', str(end)]
+        return self.run(*args)
+
+    def has_session(self, session: str) -> bool:
+        try:
+            self.command('has-session', '-t', session)
+            return True
+        except TmuxError:
+            return False
+
+    # ------------------------------------------------------------------
+    # %output subscriptions
+    # ------------------------------------------------------------------
+
+    def subscribe(self, target: str, callback: Callable[[str, str], None]) -> Optional[str]:
+        """Receive raw output of target's pane as callback(pane_id, text).
+
+        tmux only sends %output for windows in the attached session, so the
+        target window is linked into the control session. Call unsubscribe
+        before killing the target session, otherwise the linked window keeps
+        it alive.
+        """
+        if not self.start():
+            return None
+
+        pane_id, window_id = self.command('display-message', '-p', '-t', target, '#{pane_id} #{window_id}')[0].split()
+        if pane_id not in self.linked_windows:
+            try:
+                self.command('link-window', '-d', '-s', window_id, '-t', f'{self.control_session}:')
+            except TmuxError as e:
+                # Already linked (e.g. by an earlier client process)
+                print(f"[TMUX CLIENT] link-window {window_id}: {e}")
+            self.linked_windows[pane_id] = window_id
+
+        self.subscribers.setdefault(pane_id, []).append(callback)
+        return pane_id
+
+    def unsubscribe(self, pane_id: str, callback: Optional[Callable[[str, str], None]] = None):
+        """Stop delivering output for a pane and unlink its window"""
+        callbacks = self.subscribers.get(pane_id, [])
+        if callback is not None and callback in callbacks:
+            callbacks.remove(callback)
+        if callback is None or not callbacks:
+            self.subscribers.pop(pane_id, None)
+            window_id = self.linked_windows.pop(pane_id, None)
+            if window_id and self.is_connected():
+                try:
+                    # -k kills the window if this was its last link (its own session is gone)
+                    self.command('unlink-window', '-k', '-t', f'{self.control_session}:{window_id}')
+                except TmuxError:
+                    pass
+
+
+# Shared instance - connects lazily on first command
+tmux_client = TmuxClient()
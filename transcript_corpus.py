@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Terminal transcript corpus - recorded and synthetic Claude TUI output for offline replay
+
+Recorded transcripts are raw terminal bytes (ANSI and all) in transcripts/*.raw.
+Record one from a live tmux pane with:
+    python3 transcript_corpus.py record claude:0 transcripts/session.raw [seconds]
+List the corpus with:
+    python3 transcript_corpus.py list
+"""
+import codecs
+import glob
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterator, List, Optional
+from claude_output_parser import ANSI_ESCAPE
+
+CORPUS_DIR = 'transcripts'
+PROMPT_MARKER = b'Do you want to '
+
+# Response text that looks like a prompt but is not; detectors must not fire on any of it
+NEGATIVE_SNIPPETS = (
+    '● Here is what changed:\n  1. Yes, the handler now retries twice.\n'
+    '  2. No worries, the config is reloaded on save.\n\n',
+    '2. No worries, the cache is warm.\n\n',
+    '● From the docs:\n  > Keep the server running while you edit.\n  and that still holds.\n\n',
+    '● Quoting the error:\n> permission denied for /tmp/notes.txt\n\n',
+)
+
+
+@dataclass
+class Transcript:
+    """One replayable stream of terminal output"""
+    name: str
+    data: bytes
+
+    @property
+    def prompt_offsets(self) -> List[int]:
+        """Byte offsets of the lines where permission prompts start (ground truth for detectors)"""
+        offsets = []
+        start = self.data.find(PROMPT_MARKER)
+        while start != -1:
+            offsets.append(self.data.rfind(b'\n', 0, start) + 1)
+            start = self.data.find(PROMPT_MARKER, start + 1)
+        return offsets
+
+    @property
+    def line_count(self) -> int:
+        return self.data.count(b'\n') + self.data.count(b'\r')
+
+    def chunks(self, size: int = 512) -> Iterator[bytes]:
+        """The stream as a reader would see it, size bytes at a time"""
+        for start in range(0, len(self.data), size):
+            yield self.data[start:start + size]
+
+
+class PaneSimulator:
+    """
+    Approximates what `tmux capture-pane` shows while a transcript plays:
+    the last rows lines, ANSI-free, with a bare \\r overwriting the current
+    line the way spinner redraws do. Cursor addressing is not emulated.
+    """
+
+    def __init__(self, rows: int = 50):
+        self.lines: Deque[str] = deque(maxlen=rows)
+        self.partial = ''
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def feed(self, data: bytes):
+        parts = (self.partial + self.decoder.decode(data)).replace('\r\n', '\n').split('\n')
+        self.partial = parts.pop()
+        for raw in parts:
+            self.lines.append(self._render(raw))
+        if '\r' in self.partial:
+            # Only the latest redraw (and the one it is replacing) can still be visible
+            self.partial = '\r'.join(self.partial.split('\r')[-2:])
+
+    @staticmethod
+    def _render(raw: str) -> str:
+        text = ANSI_ESCAPE.sub('', raw) if '\x1b' in raw else raw
+        if '\r' in text:
+            redraws = [segment for segment in text.split('\r') if segment]
+            text = redraws[-1] if redraws else ''
+        return text
+
+    def screen(self) -> str:
+        return '\n'.join(list(self.lines) + [self._render(self.partial)])
+
+
+def synthetic_transcript(turns: int = 2000, seed: int = 7) -> bytes:
+    """Claude TUI-like output: input lines, spinners, tool calls, permission prompts and responses
+
+    Some responses are followed by a NEGATIVE_SNIPPETS entry, so detectors
+    that fire on numbered lists or quotes show up as false positives.
+    """
+    rng = random.Random(seed)
+    words = ('the', 'file', 'module', 'function', 'returns', 'config', 'server', 'a', 'and',
+             'test', 'value', 'update', 'path', 'request', 'handler', 'cache', 'to', 'of')
+    out = []
+    for turn in range(turns):
+        out.append(f'\x1b[2K\x1b[1G> command number {turn}\r\n\r\n')
+        for second in range(rng.randint(1, 4)):
+            out.append(f'\x1b[38;5;174m✻\x1b[0m Thinking… ({second}s · ↓ {rng.randint(10, 4000)} tokens · '
+                       f'esc to interrupt)\r')
+        out.append('\n')
+        if rng.random() < 0.5:
+            out.append(f'\x1b[1m●\x1b[0m Bash(ls -la /tmp/{turn})\n  ⎿  total {rng.randint(1, 99)}\n'
+                       '     -rw-r--r-- 1 user user 120 notes.txt\n\n')
+        if rng.random() < 0.2:
+            out.append('╭──────────────────────────────╮\n│ Bash command                 │\n'
+                       '│ Do you want to proceed?      │\n│ ❯ 1. Yes                     │\n'
+                       '│   2. No                      │\n╰──────────────────────────────╯\n')
+        sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(8, 40)))
+        lines = [sentence[i:i + 70] for i in range(0, len(sentence), 70)]
+        out.append('\x1b[38;5;246m●\x1b[0m ' + '\n  '.join(lines) + '\n\n')
+        if rng.random() < 0.1:
+            out.append(rng.choice(NEGATIVE_SNIPPETS))
+        out.append(f'  {rng.randint(1, 60)}s · ⚒ {rng.randint(10, 9000)} tokens\n? for shortcuts\n')
+    return ''.join(out).encode('utf-8')
+
+
+def load_corpus(directory: str = CORPUS_DIR, synthetic_turns: Optional[int] = 2000) -> List[Transcript]:
+    """Recorded transcripts from directory, plus a synthetic one unless synthetic_turns is None"""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.raw'))):
+        with open(path, 'rb') as f:
+            corpus.append(Transcript(os.path.basename(path), f.read()))
+    if synthetic_turns:
+        corpus.append(Transcript(f'synthetic-{synthetic_turns}', synthetic_transcript(synthetic_turns)))
+    return corpus
+
+
+def record(target: str, path: str, seconds: float = 60.0):
+    """Append a tmux pane's raw output to path for the given number of seconds"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    subprocess.run(['tmux', 'pipe-pane', '-o', '-t', target, f"cat >> '{path}'"], check=True)
+    print(f"[CORPUS] Recording {target} to {path} for {seconds:.0f}s")
+    try:
+        time.sleep(seconds)
+    finally:
+        subprocess.run(['tmux', 'pipe-pane', '-t', target])
+    print(f"[CORPUS] Saved {os.path.getsize(path) / 1024:.0f} KB")
+
+
+def main():
+    if len(sys.argv) >= 4 and sys.argv[1] == 'record':
+        record(sys.argv[2], sys.argv[3], float(sys.argv[4]) if len(sys.argv) > 4 else 60.0)
+    elif len(sys.argv) >= 2 and sys.argv[1] == 'list':
+        for transcript in load_corpus():
+            print(f"{transcript.name:<32} {len(transcript.data) / 1024:8.0f} KB  "
+                  f"{transcript.line_count:8} lines  {len(transcript.prompt_offsets):5} prompts")
+    else:
+        print(__doc__.strip())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Content-addressed TTS audio cache - in-memory LRU in front of a size-capped disk tier
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+CACHE_DIR = os.environ.get('TTS_CACHE_DIR', 'tts_cache')
+
+
+def make_key(text: str, voice: str, rate: str = '+0%', pitch: str = '+0Hz', volume: str = '+0%') -> str:
+    """Cache key for one utterance - every parameter that changes the audio is part of it"""
+    payload = json.dumps([text, voice, rate, pitch, volume], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    """
+    Two-tier cache of synthesized audio keyed by make_key().
+
+    Hot entries live in an OrderedDict bounded by total bytes. Every entry
+    is also written to cache_dir, whose total size is capped by evicting the
+    least recently used files (by mtime, refreshed on every disk hit), so
+    repeat phrases survive restarts.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_memory_bytes: int = 32 * 1024 * 1024,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self.memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes: Optional[int] = None  # Computed on first disk write
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                      'memory_evictions': 0, 'disk_evictions': 0, 'disk_errors': 0}
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, data: bytes):
+        """Insert into the memory tier and evict down to max_memory_bytes (lock held)"""
+        if len(data) > self.max_memory_bytes:
+            return
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= len(old)
+        self.memory[key] = data
+        self.memory_bytes += len(data)
+
+        while self.memory_bytes > self.max_memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+            self.stats['memory_evictions'] += 1
+
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}.mp3')
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used for disk eviction
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            self.stats['disk_errors'] += 1
+            print(f"[TTS CACHE] Disk read failed for {key[:12]}: {e}")
+            return None
+
+    def _scan_disk(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _write_disk(self, key: str, data: bytes):
+        """Write an entry atomically and enforce max_disk_bytes"""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            existed = os.path.exists(path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.stats['disk_errors'] += 1
+            print(f"[TTS CACHE] Disk write failed for {key[:12]}: {e}")
+            return
+
+        # The first write walks the whole cache dir; readers must not wait on it
+        scanned = self._scan_disk() if self.disk_bytes is None else None
+        with self.lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = scanned
+            elif not existed:
+                self.disk_bytes += len(data)
+            over_limit = self.disk_bytes > self.max_disk_bytes
+
+        if over_limit:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete least recently used files until the disk tier is 90% of its cap"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.mp3'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.stats['disk_evictions'] += 1
+            except OSError:
+                pass
+
+        with self.lock:
+            self.disk_bytes = total
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def _get_memory(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+            return data
+
+    def _get_disk(self, key: str) -> Optional[bytes]:
+        """Disk tier lookup for a memory miss, promoting a hit into memory"""
+        data = self._read_disk(key)
+        with self.lock:
+            if data is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['disk_hits'] += 1
+            self._remember(key, data)
+        return data
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached audio for a key, or None"""
+        data = self._get_memory(key)
+        return data if data is not None else self._get_disk(key)
+
+    def put(self, key: str, data: bytes):
+        """Store audio in both tiers (empty audio is never cached)"""
+        if not data:
+            return
+        with self.lock:
+            self._remember(key, data)
+        self._write_disk(key, data)
+
+    def get_or_create(self, text: str, voice: str, synthesize: Callable[[], bytes],
+                      rate: str = '+0%', pitch: str = '+0Hz', volume: str = '+0%') -> bytes:
+        """Return cached audio, calling synthesize() and caching the result on a miss"""
+        key = make_key(text, voice, rate, pitch, volume)
+        data = self.get(key)
+        if data is None:
+            data = synthesize()
+            self.put(key, data)
+        return data
+
+    async def aget_or_create(self, text: str, voice: str, synthesize: Callable[[], Awaitable[bytes]],
+                             rate: str = '+0%', pitch: str = '+0Hz', volume: str = '+0%') -> bytes:
+        """Async version of get_or_create for callers already on an event loop.
+
+        Disk reads and writes run in the loop's executor, so a slow disk does
+        not stall other synthesis sharing the loop. The write is not awaited.
+        """
+        key = make_key(text, voice, rate, pitch, volume)
+        data = self._get_memory(key)
+        if data is not None:
+            return data
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, self._get_disk, key)
+        if data is None:
+            data = await synthesize()
+            if data:
+                with self.lock:
+                    self._remember(key, data)
+                loop.run_in_executor(None, self._write_disk, key, data)
+        return data
+
+    def clear_memory(self):
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+
+    def get_stats(self) -> Dict[str, float]:
+        """Hit/miss counters plus current tier sizes"""
+        with self.lock:
+            lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+            hits = self.stats['memory_hits'] + self.stats['disk_hits']
+            return {
+                **self.stats,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self.memory),
+                'memory_bytes': self.memory_bytes,
+                'disk_bytes': self.disk_bytes if self.disk_bytes is not None else -1
+            }
+
+
+# Shared cache used by all TTS endpoints in this process
+tts_cache = TTSCache()
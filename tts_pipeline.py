@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Sentence-pipelined TTS - synthesizes sentences concurrently and streams them in order
+"""
+import asyncio
+import concurrent.futures
+import re
+import time
+from collections import deque
+from typing import Deque, Iterator, List, Tuple
+from tts_cache import tts_cache, make_key
+from tts_worker import tts_worker, synthesize_edge_tts, TTSBusyError
+
+# Sentence end: whitespace after terminal punctuation, or after one closing quote/bracket
+# following it; the closer stays with its sentence
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+|(?<=[.!?…]["\')\]])\s+|\n+')
+
+
+def split_sentences(text: str, min_chars: int = 40, max_chars: int = 400) -> List[str]:
+    """Split text into speakable segments.
+
+    Very short sentences are merged into the next one so each request to the
+    TTS backend carries a useful amount of audio; overlong ones are cut at the
+    last space before max_chars.
+    """
+    segments: List[str] = []
+    pending = ''
+
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        pending = f'{pending} {sentence}' if pending else sentence
+
+        while len(pending) > max_chars:
+            cut = pending.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            segments.append(pending[:cut].strip())
+            pending = pending[cut:].strip()
+
+        # The first segment is emitted as soon as possible to minimise time-to-first-audio
+        if len(pending) >= min_chars or (pending and not segments):
+            segments.append(pending)
+            pending = ''
+
+    if pending:
+        segments.append(pending)
+    return segments
+
+
+class PipelinedTTS:
+    """
+    Streams speech for long text segment by segment.
+
+    Up to max_parallel segments are synthesized ahead of the one being sent,
+    on the shared TTS worker, and yielded strictly in order, so the first
+    sentence can play while later ones are still being generated. edge-tts
+    emits constant-bitrate MP3 frames, so the segments concatenate into one
+    playable stream.
+    """
+
+    def __init__(self, max_parallel: int = 3, segment_timeout: float = 60.0):
+        self.max_parallel = max_parallel
+        self.segment_timeout = segment_timeout
+
+    def stream(self, text: str, voice: str, rate: str = '+0%', pitch: str = '+0Hz',
+               volume: str = '+0%', label: str = 'TTS') -> Iterator[bytes]:
+        """Yield MP3 audio for text, one segment at a time, in order"""
+        segments = split_sentences(text)
+        window: Deque[Tuple[int, concurrent.futures.Future]] = deque()
+        next_index = 0
+        start = time.time()
+
+        try:
+            while window or next_index < len(segments):
+                # Keep max_parallel segments in flight ahead of the consumer
+                while next_index < len(segments) and len(window) < self.max_parallel:
+                    try:
+                        # With segments in flight, don't wait for a queue slot: play those first
+                        future = tts_worker.submit_synthesis(segments[next_index], voice, rate, pitch, volume,
+                                                             timeout=0 if window else None)
+                    except TTSBusyError:
+                        if window:
+                            break  # Worker saturated: play what we have in flight, then try again
+                        print(f"[{label}] TTS worker busy, synthesizing segment {next_index + 1} directly")
+                        future = self._synthesize_directly(segments[next_index], voice, rate, pitch, volume)
+                    window.append((next_index, future))
+                    next_index += 1
+
+                index, future = window.popleft()
+                try:
+                    audio = future.result(self.segment_timeout)
+                except Exception as e:
+                    # Skip a failed segment rather than cutting the whole reply short
+                    print(f"[{label}] Segment {index + 1}/{len(segments)} failed: {e}")
+                    continue
+                if index == 0:
+                    print(f"[{label}] First audio after {(time.time() - start) * 1000:.0f}ms "
+                          f"({len(segments)} segments)")
+                yield audio
+        finally:
+            # Client disconnected - drop segments nobody will hear
+            for _, future in window:
+                future.cancel()
+
+    @staticmethod
+    def _synthesize_directly(text: str, voice: str, rate: str, pitch: str,
+                             volume: str) -> concurrent.futures.Future:
+        """Synthesize on the calling thread, for when the shared worker turns away a stream with nothing in flight"""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        try:
+            audio = asyncio.run(synthesize_edge_tts(text, voice, rate, pitch, volume))
+            tts_cache.put(make_key(text, voice, rate, pitch, volume), audio)
+            future.set_result(audio)
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+# Shared instance used by the TTS endpoints
+pipelined_tts = PipelinedTTS()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Shared TTS worker - one long-lived asyncio loop running edge-tts jobs for every Flask thread
+"""
+import asyncio
+import concurrent.futures
+import queue
+import threading
+from typing import Awaitable, Iterator, Optional
+import edge_tts
+from tts_cache import tts_cache, make_key
+
+
+class TTSBusyError(Exception):
+    """Raised when the worker's job queue is full"""
+
+
+_STREAM_END = object()  # Queued after the last chunk of a streamed synthesis
+
+
+async def synthesize_edge_tts(text: str, voice: str, rate: str = '+0%', pitch: str = '+0Hz',
+                              volume: str = '+0%') -> bytes:
+    """Synthesize text to MP3 bytes with edge-tts (no caching)"""
+    communicate = edge_tts.Communicate(text=text, voice=voice, rate=rate, pitch=pitch, volume=volume)
+    audio = bytearray()
+    async for chunk in communicate.stream():
+        if chunk['type'] == 'audio':
+            audio.extend(chunk['data'])
+    return bytes(audio)
+
+
+class TTSWorker:
+    """
+    Owns a single event loop in a background thread.
+
+    Request threads hand coroutines to the loop through its thread-safe call
+    queue and block on a concurrent Future, so syntheses from many tabs run
+    concurrently instead of each Flask thread building (and leaking) its own
+    loop. At most max_in_flight jobs talk to the backend at once; beyond
+    max_pending queued jobs, submit() waits up to queue_timeout and then
+    raises TTSBusyError so callers can shed load.
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_pending: int = 64, queue_timeout: float = 5.0):
+        self.max_in_flight = max_in_flight
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.start_lock = threading.Lock()
+        self.pending = threading.BoundedSemaphore(max_pending)  # Backpressure on submitters
+        self.in_flight: Optional[asyncio.Semaphore] = None  # Created on the worker loop
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'cache_hits': 0}
+
+    def start(self):
+        """Start the loop thread if it is not running"""
+        with self.start_lock:
+            if self.thread and self.thread.is_alive():
+                return
+            ready = threading.Event()
+
+            def run_loop():
+                self.loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self.loop)
+                self.in_flight = asyncio.Semaphore(self.max_in_flight)
+                ready.set()
+                self.loop.run_forever()
+
+            self.thread = threading.Thread(target=run_loop, name='tts-worker', daemon=True)
+            self.thread.start()
+            ready.wait()
+            print(f"[TTS WORKER] Event loop started (max_in_flight={self.max_in_flight}, "
+                  f"max_pending={self.max_pending})")
+
+    def stop(self):
+        """Stop the loop thread"""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    async def _run_job(self, coro: Awaitable):
+        async with self.in_flight:
+            return await coro
+
+    def submit(self, coro: Awaitable, timeout: Optional[float] = None) -> concurrent.futures.Future:
+        """Schedule a coroutine on the worker loop, waiting if too many are queued.
+
+        timeout overrides queue_timeout for this call; 0 fails fast.
+        """
+        self.start()
+        if not self.pending.acquire(timeout=self.queue_timeout if timeout is None else timeout):
+            self.stats['rejected'] += 1
+            if asyncio.iscoroutine(coro):
+                coro.close()
+            raise TTSBusyError(f"TTS worker busy ({self.max_pending} jobs pending)")
+
+        self.stats['submitted'] += 1
+        future = asyncio.run_coroutine_threadsafe(self._run_job(coro), self.loop)
+
+        def done(f: concurrent.futures.Future):
+            self.pending.release()
+            if f.cancelled() or f.exception() is not None:
+                self.stats['failed'] += 1
+            else:
+                self.stats['completed'] += 1
+
+        future.add_done_callback(done)
+        return future
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = 60.0):
+        """Run a coroutine on the worker loop and return its result (blocking)"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def submit_synthesis(self, text: str, voice: str, rate: str = '+0%', pitch: str = '+0Hz',
+                         volume: str = '+0%', timeout: Optional[float] = None) -> concurrent.futures.Future:
+        """Start synthesizing text; cached audio resolves immediately without using the loop"""
+        key = make_key(text, voice, rate, pitch, volume)
+        audio = tts_cache.get(key)
+        if audio is not None:
+            self.stats['cache_hits'] += 1
+            future = concurrent.futures.Future()
+            future.set_result(audio)
+            return future
+
+        return self.submit(self._synthesize_and_cache(key, text, voice, rate, pitch, volume), timeout)
+
+    async def _synthesize_and_cache(self, key: str, text: str, voice: str, rate: str, pitch: str,
+                                    volume: str) -> bytes:
+        audio = await synthesize_edge_tts(text, voice, rate, pitch, volume)
+        # Disk write happens off the loop; the caller gets its audio right away
+        asyncio.get_running_loop().run_in_executor(None, tts_cache.put, key, audio)
+        return audio
+
+    def synthesize(self, text: str, voice: str, rate: str = '+0%', pitch: str = '+0Hz',
+                   volume: str = '+0%', timeout: Optional[float] = 60.0) -> bytes:
+        """Synthesize text to MP3 bytes (blocking), using the shared TTS cache"""
+        future = self.submit_synthesis(text, voice, rate, pitch, volume)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stream_synthesis(self, text: str, voice: str, rate: str = '+0%', pitch: str = '+0Hz',
+                         volume: str = '+0%', check_cache: bool = True,
+                         chunk_timeout: float = 30.0) -> Iterator[bytes]:
+        """Start synthesizing text and return an iterator of MP3 chunks as edge-tts produces them.
+
+        The job is submitted before this returns, so TTSBusyError is raised
+        here rather than from the first next(). The coroutine runs on the
+        worker loop and hands chunks over through a thread-safe queue.
+        Complete audio is cached when the stream finishes; closing the
+        iterator early cancels the synthesis.
+        """
+        key = make_key(text, voice, rate, pitch, volume)
+        if check_cache:
+            audio = tts_cache.get(key)
+            if audio is not None:
+                self.stats['cache_hits'] += 1
+                return iter([audio])
+
+        chunks: queue.Queue = queue.Queue()
+
+        async def pump():
+            communicate = edge_tts.Communicate(text=text, voice=voice, rate=rate, pitch=pitch, volume=volume)
+            async for chunk in communicate.stream():
+                if chunk['type'] == 'audio':
+                    chunks.put(chunk['data'])
+
+        future = self.submit(pump())
+        future.add_done_callback(lambda f: chunks.put(_STREAM_END))
+        return self._stream_chunks(key, future, chunks, chunk_timeout)
+
+    @staticmethod
+    def _stream_chunks(key: str, future: concurrent.futures.Future, chunks: queue.Queue,
+                       chunk_timeout: float) -> Iterator[bytes]:
+        received = []
+        try:
+            while True:
+                try:
+                    data = chunks.get(timeout=chunk_timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No TTS audio for {chunk_timeout:.0f}s")
+                if data is _STREAM_END:
+                    break
+                received.append(data)
+                yield data
+            future.result()  # Surface synthesis errors
+        finally:
+            future.cancel()
+
+        tts_cache.put(key, b''.join(received))
+
+    def get_stats(self) -> dict:
+        return {**self.stats, 'max_in_flight': self.max_in_flight, 'max_pending': self.max_pending}
+
+
+# Shared worker - the loop thread starts on first use
+tts_worker = TTSWorker()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Voice bot logging - leveled per-module loggers written by a background queue listener
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+ROOT_LOGGER = 'voice'
+
+# Checked once at import. Hot loops guard their debug calls with
+# `if HOT_PATH_DEBUG:`, so when it is off neither the logging call nor the
+# formatting of its arguments ever runs.
+HOT_PATH_DEBUG = os.environ.get('VOICE_HOT_PATH_DEBUG', '') == '1'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """'capture=WARNING,orchestrator=DEBUG' -> {'capture': 'WARNING', 'orchestrator': 'DEBUG'}"""
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: Optional[str] = None, module_levels: Optional[Dict[str, str]] = None):
+    """Route all voice.* loggers through a queue to one stderr writer thread.
+
+    level defaults to $VOICE_LOG_LEVEL (INFO); module_levels, e.g.
+    {'capture': 'WARNING'}, default to $VOICE_LOG_LEVELS in the same
+    'name=LEVEL,...' form. Safe to call more than once.
+    """
+    global _listener
+    with _setup_lock:
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel((level or os.environ.get('VOICE_LOG_LEVEL', 'INFO')).upper())
+        levels = module_levels if module_levels is not None else _parse_levels(os.environ.get('VOICE_LOG_LEVELS', ''))
+        for name, module_level in levels.items():
+            logging.getLogger(f'{ROOT_LOGGER}.{name}').setLevel(module_level.upper())
+
+        if _listener is not None:
+            return
+
+        # Request threads only enqueue records; the listener thread does the I/O
+        records: queue.Queue = queue.Queue(-1)
+        writer = logging.StreamHandler(sys.stderr)
+        writer.setFormatter(logging.Formatter('%(asctime)s %(levelname)-7s [%(name)s] %(message)s'))
+        root.addHandler(logging.handlers.QueueHandler(records))
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(records, writer, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for one component, e.g. get_logger('capture') -> 'voice.capture'"""
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+class LogSampler:
+    """
+    Rate-limits per-tick messages: each key logs at most once per interval,
+    and the next message that gets through reports how many were dropped.
+    """
+
+    def __init__(self, interval: float = 10.0):
+        self.interval = interval
+        self.last: Dict[str, float] = {}
+        self.suppressed: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def log(self, logger: logging.Logger, level: int, key: str, msg: str, *args):
+        if not logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last.get(key, 0.0) < self.interval:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return
+            self.last[key] = now
+            dropped = self.suppressed.pop(key, 0)
+        if dropped:
+            msg = f'{msg} (+{dropped} similar suppressed)'
+        logger.log(level, msg, *args)
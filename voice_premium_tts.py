@@ -6,7 +6,6 @@ Claude Voice Bot with Premium TTS Options
 - Immediate stop functionality
 """
 from flask import Flask, render_template_string, request, jsonify
-import subprocess
 import ssl
 import time
 from datetime import datetime
@@ -20,6 +19,8 @@ import base64
 import io
 import pyttsx3
 import pygame
+from tmux_client import tmux_client
+from tts_cache import tts_cache
 
 app = Flask(__name__)
 
@@ -68,13 +69,7 @@ def capture_tmux_output():
                 continue
                 
             # Capture entire pane to ensure we get the full response
-            result = subprocess.run(
-                ['tmux', 'capture-pane', '-t', 'claude:0', '-p'],
-                capture_output=True,
-                text=True
-            )
-            
-            output = result.stdout
+            output = tmux_client.capture_pane('claude:0') or ''
             
             # Update stats
             current_stats = extract_stats_from_output(output)
@@ -967,10 +962,8 @@ def send_to_tmux():
         timestamp = datetime.now().strftime('%H:%M:%S')
         print(f"[{timestamp}] VOICE: {command}")
         
-        # Send to tmux
-        subprocess.run(['tmux', 'send-keys', '-t', 'claude:0', 'C-u'], check=True)
-        subprocess.run(['tmux', 'send-keys', '-t', 'claude:0', command], check=True)
-        subprocess.run(['tmux', 'send-keys', '-t', 'claude:0', 'Enter'], check=True)
+        # Send to tmux (clear line, text and Enter in one round trip)
+        tmux_client.send_text('claude:0', command, clear_line=True)
         
         return jsonify({'success': True})
         
@@ -1005,16 +998,20 @@ def get_tts_audio():
         if not text:
             return jsonify({'success': False, 'error': 'No text provided'})
         
-        # Create gTTS instance with specific accent
-        tts = gTTS(text=text, lang=lang, tld=accent, slow=False)
+        def synthesize():
+            # Create gTTS instance with specific accent
+            tts = gTTS(text=text, lang=lang, tld=accent, slow=False)
+            
+            # Save to bytes buffer
+            audio_buffer = io.BytesIO()
+            tts.write_to_fp(audio_buffer)
+            return audio_buffer.getvalue()
         
-        # Save to bytes buffer
-        audio_buffer = io.BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
+        # gTTS has no rate/pitch controls; language and accent select the voice
+        audio_bytes = tts_cache.get_or_create(text, f'gtts:{lang}:{accent}', synthesize)
         
         # Convert to base64 for sending
-        audio_base64 = base64.b64encode(audio_buffer.read()).decode('utf-8')
+        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
         
         return jsonify({
             'success': True,